@@ -0,0 +1,418 @@
+"""Async HTTP inference API for systems that can't drive the Streamlit UI.
+
+    python api.py --host 0.0.0.0 --port 8502 [--model weights/best.pt]
+
+Endpoints:
+
+    GET  /health   model and queue status (503 until a model is loaded)
+    GET  /metrics  Prometheus text from metrics.py
+    POST /detect   multipart upload with one or more image files, or a raw
+                   image body (Content-Type: image/*). Query parameters:
+                   conf=0.4, save=1 to store the results in history.db.
+                   With save=1 an image already stored under the same model
+                   and settings is answered from history.db without inference
+                   ("reused": true), and an Idempotency-Key header makes
+                   client retries safe (see ingest.py)
+
+Images from concurrent requests are micro-batched: the batcher waits up to
+API_BATCH_WAIT_MS for more work (at most API_MAX_BATCH images), then runs
+them as one predict call in a worker thread, so the event loop keeps
+accepting requests meanwhile. Requests beyond the queue/concurrency limits
+are shed with 503 and a Retry-After header instead of piling up.
+"""
+import argparse
+import asyncio
+import json
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+import cv2
+import numpy as np
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+
+import class_config
+import helper
+import ingest
+import metrics
+import postprocess
+import settings
+from model_registry import registry
+
+SOURCE_TYPE = "API"
+
+
+class Overloaded(Exception):
+    pass
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class _Job:
+    __slots__ = ("image", "conf", "save", "future")
+
+    def __init__(self, image, conf, save, future):
+        self.image = image
+        self.conf = conf
+        self.save = save
+        self.future = future
+
+
+def _detections(dets):
+    """JSON-ready detections from postprocess arrays"""
+    categories = [postprocess.CATEGORIES[i] for i in dets.categories().tolist()]
+    return [
+        {"name": name, "category": category, "confidence": round(conf, 4), "box": box}
+        for (name, conf), category, box in zip(dets.rows(), categories, dets.xyxy.round(1).tolist())
+    ]
+
+
+def _predict_batch(jobs):
+    """Runs in the predict thread: one predict call for the whole batch"""
+    model = helper.load_model()
+    if model is None:
+        raise RuntimeError("Model is not loaded")
+    # One call at the lowest requested confidence; each job is filtered to its own
+    conf = min(job.conf for job in jobs)
+    config = class_config.current()
+    with registry.lease(model), metrics.stage("api.predict"):
+        results = model.predict([job.image for job in jobs], conf=conf, verbose=False,
+                                **config.predict_kwargs(model.names))
+    outputs = []
+    for job, result in zip(jobs, results):
+        dets = postprocess.process(result, job.conf, config)
+        plotted = None
+        if job.save:
+            plotted = postprocess.plot(result, dets)
+        outputs.append((_detections(dets), plotted))
+    return outputs
+
+
+class MicroBatcher:
+    def __init__(self, max_batch=settings.API_MAX_BATCH, max_wait_ms=settings.API_BATCH_WAIT_MS,
+                 max_queue=settings.API_MAX_QUEUE):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        # A single predict thread: batches run back to back, never concurrently
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="api-predict")
+        self.batches = 0
+        self.images = 0
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self.executor.shutdown(wait=False)
+
+    async def submit(self, image, conf, save=False):
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait(_Job(image, conf, save, future))
+        except asyncio.QueueFull:
+            raise Overloaded("Inference queue is full")
+        return await future
+
+    async def _collect(self):
+        batch = [await self.queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        # Callers that timed out or disconnected meanwhile are dropped
+        return [job for job in batch if not job.future.done()]
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            if not batch:
+                continue
+            try:
+                outputs = await loop.run_in_executor(self.executor, _predict_batch, batch)
+            except Exception as e:
+                if len(batch) == 1:
+                    if not batch[0].future.done():
+                        batch[0].future.set_exception(e)
+                    continue
+                # Find the failing job(s): rerun one by one so only those fail
+                outputs = []
+                for job in batch:
+                    try:
+                        outputs.append((await loop.run_in_executor(self.executor, _predict_batch, [job]))[0])
+                    except Exception as job_error:
+                        outputs.append(job_error)
+            self.batches += 1
+            self.images += len(batch)
+            metrics.incr("api.batches")
+            metrics.incr("api.batched_images", len(batch))
+            for job, output in zip(batch, outputs):
+                if job.future.done():
+                    continue
+                if isinstance(output, Exception):
+                    job.future.set_exception(output)
+                else:
+                    job.future.set_result(output)
+
+
+class InferenceService:
+    def __init__(self, model_path=None):
+        self.model_path = model_path
+        self.batcher = None
+        self.inflight = 0
+        self.started_at = time.time()
+        self.model_error = None
+
+    async def startup(self):
+        self.batcher = MicroBatcher()
+        self.batcher.start()
+        model = await asyncio.to_thread(helper.load_model, self.model_path)
+        if model is None:
+            self.model_error = f"Could not load model {self.model_path or settings.DETECTION_MODEL}"
+        elif self.model_path is not None:
+            registry.activate(self.model_path)
+
+    async def shutdown(self):
+        if self.batcher is not None:
+            await self.batcher.stop()
+
+    async def health(self, request):
+        info = registry.active_info()
+        body = {
+            "status": "ok" if info is not None else "unavailable",
+            "model": {"path": info["path"], "sha256": info["sha256"]} if info else None,
+            "error": self.model_error,
+            "inflight": self.inflight,
+            "queue_depth": self.batcher.queue.qsize() if self.batcher else 0,
+            "batches": self.batcher.batches if self.batcher else 0,
+            "images": self.batcher.images if self.batcher else 0,
+            "uptime_s": round(time.time() - self.started_at, 1),
+        }
+        return JSONResponse(body, status_code=200 if info is not None else 503)
+
+    async def metrics_text(self, request):
+        return PlainTextResponse(metrics.to_prometheus(), media_type="text/plain; version=0.0.4")
+
+    async def _read_images(self, request):
+        """[(filename, bytes)] from a multipart form or a raw image body"""
+        # Content-Length may be absent (chunked) or understated: count what's actually read
+        request = _capped(request, settings.API_MAX_UPLOAD_BYTES)
+        content_type = request.headers.get("content-type", "")
+        if content_type.startswith("multipart/form-data"):
+            form = await request.form(max_files=settings.API_MAX_IMAGES_PER_REQUEST)
+            uploads = [value for _, value in form.multi_items() if hasattr(value, "read")]
+            files = [(u.filename or "upload", await u.read()) for u in uploads]
+            await form.close()
+            return files
+        if content_type.startswith("image/"):
+            return [(request.query_params.get("filename", "upload"), await request.body())]
+        return []
+
+    async def detect(self, request):
+        if self.inflight >= settings.API_MAX_CONCURRENT:
+            metrics.incr("api.rejected")
+            return _error("Too many concurrent requests", 503, retry_after=1)
+        try:
+            length = int(request.headers.get("content-length", 0))
+        except ValueError:
+            return _error("Invalid Content-Length", 400)
+        if length > settings.API_MAX_UPLOAD_BYTES:
+            return _error("Upload too large", 413)
+        try:
+            conf = float(request.query_params.get("conf", settings.API_DEFAULT_CONFIDENCE))
+        except ValueError:
+            return _error("conf must be a number", 400)
+        # Checked here: the batch runs at its lowest conf, so one bad value would fail every request in it
+        if not (math.isfinite(conf) and 0.0 <= conf <= 1.0):
+            return _error("conf must be between 0 and 1", 400)
+        save = request.query_params.get("save", "0").lower() in ("1", "true", "yes")
+
+        self.inflight += 1
+        metrics.incr("api.requests")
+        started = time.perf_counter()
+        try:
+            files = await self._read_images(request)
+            if not files:
+                return _error("No image uploaded", 400)
+            if len(files) > settings.API_MAX_IMAGES_PER_REQUEST:
+                return _error(f"At most {settings.API_MAX_IMAGES_PER_REQUEST} images per request", 400)
+            keys, previous = [(None, None, None)] * len(files), [None] * len(files)
+            if save:
+                keys, previous = await asyncio.to_thread(
+                    _lookup_all, files, conf, request.headers.get("idempotency-key")
+                )
+            pending = [i for i, record in enumerate(previous) if record is None]
+            # Reused files are decoded too, so both paths validate and measure images the same way
+            try:
+                images = await asyncio.to_thread(_decode_all, files)
+            except Exception as e:
+                return _error(f"Invalid image: {e}", 400)
+
+            outputs = await asyncio.wait_for(
+                asyncio.gather(*(self.batcher.submit(images[i], conf, save) for i in pending)),
+                settings.API_REQUEST_TIMEOUT,
+            )
+            fresh = dict(zip(pending, outputs))
+            results = []
+            for i, (filename, data) in enumerate(files):
+                height, width = images[i].shape[:2]
+                if previous[i] is not None:
+                    metrics.incr("api.reused")
+                    results.append(_reused_item(filename, width, height, previous[i]))
+                    continue
+                detections, plotted = fresh[i]
+                item = {"filename": filename, "width": width, "height": height, "detections": detections}
+                if save:
+                    item["record_id"] = await asyncio.to_thread(_save, filename, plotted, detections, *keys[i])
+                    item["reused"] = False
+                results.append(item)
+            info = registry.active_info()
+            return JSONResponse({
+                "model": info["path"] if info else None,
+                "results": results,
+                "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+            })
+        except UploadTooLarge:
+            return _error("Upload too large", 413)
+        except Overloaded as e:
+            metrics.incr("api.rejected")
+            return _error(str(e), 503, retry_after=1)
+        except asyncio.TimeoutError:
+            metrics.incr("api.timeouts")
+            return _error("Inference timed out", 504)
+        except Exception as e:
+            metrics.incr("api.errors")
+            print(f"Error handling API request: {e}")
+            return _error(f"Detection failed: {e}", 500)
+        finally:
+            self.inflight -= 1
+            metrics.observe("api.request", time.perf_counter() - started)
+
+
+def _capped(request, limit):
+    """The same request, with a receive channel that raises UploadTooLarge once
+    more than `limit` body bytes have arrived"""
+    received = 0
+
+    async def receive():
+        nonlocal received
+        message = await request.receive()
+        if message["type"] == "http.request":
+            received += len(message.get("body", b""))
+            if received > limit:
+                raise UploadTooLarge()
+        return message
+
+    return Request(request.scope, receive)
+
+
+def _decode_all(files):
+    """BGR arrays, as ultralytics expects; OpenCV also avoids ultralytics' patched
+    PIL.Image.open, which tries to pip-install a HEIF decoder for unknown data"""
+    images = []
+    for filename, data in files:
+        image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError(f"cannot decode {filename}")
+        images.append(image)
+    return images
+
+
+def _lookup_all(files, conf, idempotency):
+    """Ingestion keys per file and the stored row each one maps to (None when new)"""
+    model = helper.load_model()
+    keys, previous = [], []
+    for i, (filename, data) in enumerate(files):
+        digest = ingest.content_hash(data)
+        key = ingest.result_key(digest, model, confidence=conf, tiles=None)
+        idempotency_key = None
+        if idempotency:
+            idempotency_key = ingest.idempotency_key(
+                idempotency, i, ingest.inputs_digest(digest, model, confidence=conf, tiles=None))
+        keys.append((digest, key, idempotency_key))
+        previous.append(ingest.lookup(key, idempotency_key))
+    return keys, previous
+
+
+def _reused_item(filename, width, height, record):
+    """Response item from a stored row; boxes are only stored by the API, not the UI"""
+    config = class_config.current()
+    detections = [
+        {"name": d["name"], "category": config.category(d["name"]), "confidence": round(d["confidence"], 4),
+         "box": d.get("box")}
+        for d in (json.loads(record.detections) if record.detections else [])
+    ]
+    return {"filename": filename, "width": width, "height": height, "detections": detections,
+            "record_id": record.id, "reused": True}
+
+
+def _save(filename, plotted, detections, content_hash=None, result_key=None, idempotency_key=None):
+    ok, encoded = cv2.imencode(".png", plotted)
+    if not ok:
+        raise RuntimeError("Could not encode detection image")
+    return helper.save_detection(
+        SOURCE_TYPE, filename, encoded.tobytes(),
+        [{"name": d["name"], "confidence": d["confidence"], "box": d["box"]} for d in detections],
+        content_hash=content_hash, result_key=result_key, idempotency_key=idempotency_key,
+    )
+
+
+def _error(message, status, retry_after=None):
+    headers = {"Retry-After": str(retry_after)} if retry_after else None
+    return JSONResponse({"error": message}, status_code=status, headers=headers)
+
+
+def create_app(model_path=None):
+    service = InferenceService(model_path)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        await service.startup()
+        yield
+        await service.shutdown()
+
+    routes = [
+        Route("/health", service.health, methods=["GET"]),
+        Route("/metrics", service.metrics_text, methods=["GET"]),
+        Route("/detect", service.detect, methods=["POST"]),
+    ]
+    app = Starlette(routes=routes, lifespan=lifespan)
+    app.state.service = service
+    return app
+
+
+def main(argv=None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="EcoDetect HTTP inference API")
+    parser.add_argument("--host", default=settings.API_HOST)
+    parser.add_argument("--port", type=int, default=settings.API_PORT)
+    parser.add_argument("--model", default=None, help="weights to serve (default: the registry's active model)")
+    args = parser.parse_args(argv)
+
+    # The API always records its own latency histograms
+    metrics.set_enabled(True)
+    uvicorn.run(create_app(args.model), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
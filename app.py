@@ -5,12 +5,27 @@ import tempfile
 import cv2
 import base64
 import streamlit as st
-from datetime import datetime
+from datetime import datetime, timedelta
 import io
+import time
+import pandas as pd
+import json
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 
 # Local Modules
 import settings
 import helper
+import metrics
+import profiling
+import model_registry
+import retention
+import export
+import assets
+import tiling
+import postprocess
+import class_config
+import ingest
+import cascade
 
 # Setting page layout
 st.set_page_config(
@@ -144,16 +159,24 @@ st.markdown("""
     </style>
     """, unsafe_allow_html=True)
 
+# Optional metrics file dump for scraping
+if settings.METRICS_DUMP_PATH:
+    metrics.start_file_dump(settings.METRICS_DUMP_PATH, settings.METRICS_DUMP_INTERVAL)
+
+# Background history retention/compaction
+if settings.RETENTION_ENABLED:
+    retention.start_retention_worker()
+
+# Decode/resize the page images once per process (cheap no-op on reruns)
+assets.prepare(
+    [(settings.DEFAULT_IMAGE, None), (settings.DEFAULT_DETECT_IMAGE, None)]
+    + [(settings.IMAGES_DIR / name, settings.HOME_EXAMPLE_HEIGHT) for name in settings.HOME_EXAMPLE_IMAGES]
+)
+
 # Enhanced sidebar with custom header
 st.sidebar.markdown('<div class="custom-header"><h2>♻️ EcoDetect</h2></div>', unsafe_allow_html=True)
 
-page = st.sidebar.selectbox("Pilih Halaman", ["🏠 Beranda", "🔍 Deteksi", "📚 Riwayat"], index=0, key='page_selector')
-
-def resize_to_fixed_height(image, height):
-    """Resize image to fixed height while maintaining aspect ratio"""
-    aspect_ratio = image.width / image.height
-    width = int(height * aspect_ratio)
-    return image.resize((width, height))
+page = st.sidebar.selectbox("Pilih Halaman", ["🏠 Beranda", "🔍 Deteksi", "📚 Riwayat", "📊 Analitik"], index=0, key='page_selector')
 
 # Home Page
 if page == "🏠 Beranda":
@@ -188,14 +211,11 @@ if page == "🏠 Beranda":
         try:
             # Use images from your folder
             default_image_path = "images/sebelumdeteksi.jpg"
-            default_image = PIL.Image.open(default_image_path)
-            st.image(default_image_path, caption="📷 Gambar Asli", use_container_width=True)
+            st.image(assets.image(default_image_path), caption="📷 Gambar Asli", use_container_width=True)
         except:
             # Fallback to settings default image if available
             try:
-                default_image_path = str(settings.DEFAULT_IMAGE)
-                default_image = PIL.Image.open(default_image_path)
-                st.image(default_image_path, caption="📷 Gambar Asli", use_container_width=True)
+                st.image(assets.image(settings.DEFAULT_IMAGE), caption="📷 Gambar Asli", use_container_width=True)
             except:
                 st.info("Gambar contoh tidak tersedia")
     
@@ -203,14 +223,11 @@ if page == "🏠 Beranda":
         try:
             # Use images from your folder
             default_detected_image_path = "images/hasildeteksi.jpg"
-            default_detected_image = PIL.Image.open(default_detected_image_path)
-            st.image(default_detected_image_path, caption="🎯 Hasil Deteksi YOLOv11", use_container_width=True)
+            st.image(assets.image(default_detected_image_path), caption="🎯 Hasil Deteksi YOLOv11", use_container_width=True)
         except:
             # Fallback to settings default detected image if available
             try:
-                default_detected_image_path = str(settings.DEFAULT_DETECT_IMAGE)
-                default_detected_image = PIL.Image.open(default_detected_image_path)
-                st.image(default_detected_image_path, caption="🎯 Hasil Deteksi YOLOv11", use_container_width=True)
+                st.image(assets.image(settings.DEFAULT_DETECT_IMAGE), caption="🎯 Hasil Deteksi YOLOv11", use_container_width=True)
             except:
                 st.info("Gambar hasil deteksi tidak tersedia")
 
@@ -230,9 +247,7 @@ if page == "🏠 Beranda":
     
     # Display example image if available
     try:
-        biodegradable_image = PIL.Image.open("images/biodegradable.jpg")
-        resized_bio = resize_to_fixed_height(biodegradable_image, 200)
-        st.image(resized_bio, caption="Contoh Sampah Biodegradable", use_container_width=False)
+        st.image(assets.image(settings.IMAGES_DIR / "biodegradable.jpg", settings.HOME_EXAMPLE_HEIGHT), caption="Contoh Sampah Biodegradable", use_container_width=False)
     except Exception as e:
         st.info("📷 Gambar contoh tidak tersedia")
 
@@ -251,9 +266,7 @@ if page == "🏠 Beranda":
     st.markdown("#### 📄 Kertas")
     
     try:
-        paper_image = PIL.Image.open("images/kertas.jpg")
-        resized_paper = resize_to_fixed_height(paper_image, 200)
-        st.image(resized_paper, caption="Contoh Sampah Kertas", use_container_width=False)
+        st.image(assets.image(settings.IMAGES_DIR / "kertas.jpg", settings.HOME_EXAMPLE_HEIGHT), caption="Contoh Sampah Kertas", use_container_width=False)
     except Exception as e:
         st.info("📷 Gambar contoh tidak tersedia")
 
@@ -279,9 +292,7 @@ if page == "🏠 Beranda":
     st.markdown("#### 🥤 Kaleng Minuman")
     
     try:
-        can_image = PIL.Image.open("images/kaleng.jpeg")
-        resized_can = resize_to_fixed_height(can_image, 200)
-        st.image(resized_can, caption="Contoh Kaleng Minuman Anorganik", use_container_width=False)
+        st.image(assets.image(settings.IMAGES_DIR / "kaleng.jpeg", settings.HOME_EXAMPLE_HEIGHT), caption="Contoh Kaleng Minuman Anorganik", use_container_width=False)
     except Exception as e:
         st.info("📷 Gambar contoh tidak tersedia")
 
@@ -300,9 +311,7 @@ if page == "🏠 Beranda":
     st.markdown("#### 🥛 Kaca (Botol / Pecahan Kaca)")
     
     try:
-        glass_image = PIL.Image.open("images/kaca.jpg")
-        resized_glass = resize_to_fixed_height(glass_image, 200)
-        st.image(resized_glass, caption="Contoh Sampah Kaca", use_container_width=False)
+        st.image(assets.image(settings.IMAGES_DIR / "kaca.jpg", settings.HOME_EXAMPLE_HEIGHT), caption="Contoh Sampah Kaca", use_container_width=False)
     except Exception as e:
         st.info("📷 Gambar contoh tidak tersedia")
 
@@ -321,9 +330,7 @@ if page == "🏠 Beranda":
     st.markdown("#### 🧴 Botol Plastik")
     
     try:
-        bottle_image = PIL.Image.open("images/botol.jpg")
-        resized_bottle = resize_to_fixed_height(bottle_image, 200)
-        st.image(resized_bottle, caption="Contoh Botol Plastik", use_container_width=False)
+        st.image(assets.image(settings.IMAGES_DIR / "botol.jpg", settings.HOME_EXAMPLE_HEIGHT), caption="Contoh Botol Plastik", use_container_width=False)
     except Exception as e:
         st.info("📷 Gambar contoh tidak tersedia")
 
@@ -345,13 +352,19 @@ elif page == "🔍 Deteksi":
     st.sidebar.header("Konfigurasi Model ML")
     confidence = float(st.sidebar.slider("Pilih Kepercayaan Model (%)", 25, 100, 40)) / 100
 
+    helper.display_model_registry_panel()
     model_path = Path(settings.DETECTION_MODEL)
     try:
-        model = helper.load_model(model_path)
+        model = helper.load_model()
     except Exception as ex:
         st.error(f"Tidak dapat memuat model. Periksa path yang ditentukan: {model_path}")
         st.error(ex)
 
+    helper.display_class_config_panel(model)
+    cascade_config = helper.display_cascade_panel()
+    helper.display_metrics_panel()
+    helper.display_profiling_panel()
+
     st.sidebar.subheader("Konfigurasi Gambar/Webcam")
     source_radio = st.sidebar.radio("Pilih Sumber", settings.SOURCES_LIST)
 
@@ -361,16 +374,25 @@ elif page == "🔍 Deteksi":
     if source_radio == settings.IMAGE:
         source_img = st.sidebar.file_uploader("Pilih gambar...", type=("jpg", "jpeg", "png", 'bmp', 'webp'))
 
+        with st.sidebar.expander("🧩 Mode Tile (gambar resolusi tinggi)"):
+            tile_mode_labels = {tiling.AUTO: "Otomatis", tiling.ON: "Selalu", tiling.OFF: "Nonaktif"}
+            tile_mode = st.selectbox(
+                "Mode", tiling.MODES, format_func=tile_mode_labels.get, key="tile_mode",
+                help=f"Otomatis: aktif jika sisi terpanjang gambar ≥ {settings.TILE_AUTO_MIN_SIDE}px",
+            )
+            tile_size = st.select_slider("Ukuran tile (px)", [320, 480, 640, 800, 960, 1280], value=settings.TILE_SIZE, key="tile_size")
+            tile_overlap = st.slider("Overlap", 0.0, 0.5, settings.TILE_OVERLAP, 0.05, key="tile_overlap")
+            tile_merge = st.selectbox("Penggabungan box", tiling.MERGE_METHODS, format_func=str.upper, key="tile_merge")
+
         col1, col2 = st.columns(2)
 
         with col1:
             try:
                 if source_img is None:
-                    default_image_path = str(settings.DEFAULT_IMAGE)
-                    default_image = PIL.Image.open(default_image_path)
-                    st.image(default_image_path, caption="Gambar Default", use_container_width=True)
+                    st.image(assets.image(settings.DEFAULT_IMAGE), caption="Gambar Default", use_container_width=True)
                 else:
-                    uploaded_image = PIL.Image.open(source_img)
+                    with metrics.stage("image.open"):
+                        uploaded_image = PIL.Image.open(source_img)
                     st.image(source_img, caption="Gambar yang Diupload", use_container_width=True)
             except Exception as ex:
                 st.error("Error terjadi saat membuka gambar.")
@@ -378,66 +400,112 @@ elif page == "🔍 Deteksi":
 
         with col2:
             if source_img is None:
-                default_detected_image_path = str(settings.DEFAULT_DETECT_IMAGE)
-                default_detected_image = PIL.Image.open(default_detected_image_path)
-                st.image(default_detected_image_path, caption='Gambar Terdeteksi', use_container_width=True)
+                st.image(assets.image(settings.DEFAULT_DETECT_IMAGE), caption='Gambar Terdeteksi', use_container_width=True)
             else:
                 if st.sidebar.button('Deteksi Objek'):
                     try:
-                        res = model.predict(uploaded_image, conf=confidence)
-                        boxes = res[0].boxes
-                        res_plotted = res[0].plot()[:, :, ::-1]
-                        st.image(res_plotted, caption='Gambar Terdeteksi', use_container_width=True)
+                        metrics.incr("image.detections")
+                        use_tiles = tiling.should_tile(*uploaded_image.size, mode=tile_mode)
+                        class_cfg = class_config.current()
+                        predict_kwargs = class_cfg.predict_kwargs(model.names)
+                        # Same bytes + model + settings as an earlier upload: reuse that result
+                        with metrics.stage("image.ingest"):
+                            content_digest = ingest.content_hash(source_img.getvalue())
+                            # Tiled inference always uses the full model; the cascade only applies to single passes
+                            image_cascade = cascade.for_images(cascade_config) if cascade_config and not use_tiles else None
+                            result_params = dict(
+                                confidence=confidence,
+                                tiles=[tile_size, tile_overlap, tile_merge] if use_tiles else None,
+                                cascade=cascade_config.key() if image_cascade else None,
+                            )
+                            key = ingest.result_key(content_digest, model, **result_params)
+                            run_ctx = get_script_run_ctx()
+                            idempotency_key = ingest.idempotency_key(
+                                run_ctx.session_id if run_ctx else None, source_img.file_id,
+                                ingest.inputs_digest(content_digest, model, **result_params),
+                            )
+                            previous = ingest.lookup(key, idempotency_key)
+                        if previous is not None:
+                            metrics.incr("image.reused")
+                            st.image(previous.detected_image, caption='Gambar Terdeteksi', use_container_width=True)
+                            st.caption(f"♻️ Gambar ini sudah pernah dideteksi dengan pengaturan yang sama: "
+                                       f"hasil Deteksi #{previous.id} ditampilkan tanpa inferensi ulang.")
+                            detected_waste = json.loads(previous.detections) if previous.detections else []
+                        else:
+                            started = time.perf_counter()
+                            escalation = None
+                            with model_registry.registry.lease(model), profiling.profiled("image"):
+                                if use_tiles:
+                                    with metrics.stage("image.predict_tiled"):
+                                        res = tiling.predict_tiled(
+                                            model, uploaded_image, confidence,
+                                            tile_size=tile_size, overlap=tile_overlap, method=tile_merge,
+                                            **predict_kwargs,
+                                        )
+                                elif image_cascade is not None:
+                                    with metrics.stage("image.predict"):
+                                        result, escalation = image_cascade.predict(uploaded_image, confidence, model)
+                                        res = [result]
+                                else:
+                                    with metrics.stage("image.predict"):
+                                        res = model.predict(uploaded_image, conf=confidence, **predict_kwargs)
+                                with metrics.stage("image.postprocess"):
+                                    dets = postprocess.process(res[0], confidence, class_cfg)
+                                with metrics.stage("image.plot"):
+                                    res_plotted = postprocess.plot(res[0], dets)[:, :, ::-1]
+                            st.image(res_plotted, caption='Gambar Terdeteksi', use_container_width=True)
+                            if image_cascade is not None:
+                                cascade.record(escalation, time.perf_counter() - started)
+                                if escalation is None:
+                                    st.caption("⚡ Kaskade: hasil model cepat (tanpa eskalasi)")
+                                else:
+                                    st.caption(f"🎯 Kaskade: dieskalasi ke model penuh ({escalation})")
+                            if use_tiles:
+                                n_tiles = len(tiling.tile_windows(*uploaded_image.size, tile_size, tile_overlap))
+                                st.caption(f"🧩 Deteksi per tile: {n_tiles} tile {tile_size}px, overlap {tile_overlap:.0%}, {tile_merge.upper()}")
+                            # Already sorted by confidence (highest first)
+                            detected_waste = dets.to_dicts()
 
                         # Display detected waste types prominently
                         st.markdown("---")
                         st.markdown("### ♻️ Jenis Sampah yang Terdeteksi:")
                         
-                        if boxes:
-                            detected_waste = []
-                            for box in boxes:
-                                class_id = int(box.cls)
-                                class_name = model.names[class_id]
-                                conf_value = float(box.conf)
-                                detected_waste.append({
-                                    'name': class_name,
-                                    'confidence': conf_value
-                                })
-                            
-                            # Sort by confidence (highest first)
-                            detected_waste.sort(key=lambda x: x['confidence'], reverse=True)
-                            
+                        if detected_waste:
                             # Display each detected waste with color coding
                             for waste in detected_waste:
+                                category = class_cfg.category(waste['name'])
                                 if waste['confidence'] > 0.8:
-                                    st.success(f"🟢 **{waste['name'].upper()}** - Kepercayaan: {waste['confidence']:.2f}")
+                                    st.success(f"🟢 **{waste['name'].upper()}** ({category}) - Kepercayaan: {waste['confidence']:.2f}")
                                 elif waste['confidence'] > 0.6:
-                                    st.warning(f"🟡 **{waste['name'].upper()}** - Kepercayaan: {waste['confidence']:.2f}")
+                                    st.warning(f"🟡 **{waste['name'].upper()}** ({category}) - Kepercayaan: {waste['confidence']:.2f}")
                                 else:
-                                    st.info(f"🟠 **{waste['name'].upper()}** - Kepercayaan: {waste['confidence']:.2f}")
+                                    st.info(f"🟠 **{waste['name'].upper()}** ({category}) - Kepercayaan: {waste['confidence']:.2f}")
                             
                             # Create a sequence from detected waste
                             if len(detected_waste) > 0:
                                 sequence = " + ".join([waste['name'].upper() for waste in detected_waste])
                                 st.markdown(f"**Urutan Terdeteksi:** {sequence}")
+                            st.markdown(helper.format_category_counts(helper.count_detection_categories(detected_waste)), unsafe_allow_html=True)
                         else:
                             st.info("🗑️ Tidak ada sampah yang terdeteksi dalam gambar ini")
 
-                        # Save detection result
-                        with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmpfile:
-                            PIL.Image.fromarray(res_plotted).save(tmpfile.name)
-                            with open(tmpfile.name, "rb") as file:
-                                detected_image = file.read()
-                                helper.save_detection("Image", source_img.name, detected_image)
+                        # Save detection result (a lost race against a concurrent identical upload returns that row)
+                        if previous is None:
+                            with metrics.stage("image.save"):
+                                with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmpfile:
+                                    PIL.Image.fromarray(res_plotted).save(tmpfile.name)
+                                    with open(tmpfile.name, "rb") as file:
+                                        detected_image = file.read()
+                                        helper.save_detection(
+                                            "Image", source_img.name, detected_image, detected_waste,
+                                            content_hash=content_digest, result_key=key, idempotency_key=idempotency_key,
+                                        )
 
                         try:
                             with st.expander("📊 Hasil Deteksi Detail"):
-                                if boxes:
-                                    for i, box in enumerate(boxes):
-                                        class_id = int(box.cls)
-                                        class_name = model.names[class_id]
-                                        conf_value = float(box.conf)
-                                        st.write(f"Deteksi {i+1}: **{class_name}** - Kepercayaan: {conf_value:.4f}")
+                                if detected_waste:
+                                    for i, waste in enumerate(detected_waste):
+                                        st.write(f"Deteksi {i+1}: **{waste['name']}** - Kepercayaan: {waste['confidence']:.4f}")
                                 else:
                                     st.write("Tidak ada objek yang terdeteksi.")
                         except Exception as ex:
@@ -449,7 +517,7 @@ elif page == "🔍 Deteksi":
 
     elif source_radio == settings.WEBCAM:
         # Enhanced webcam with waste detection
-        helper.play_webcam_bisindo(confidence, model)
+        helper.play_webcam_bisindo(confidence, cascade_config=cascade_config)
 
     else:
         st.error("Silakan pilih tipe sumber yang valid!")
@@ -504,6 +572,85 @@ elif page == "📚 Riwayat":
             if st.button("❌ Batal", type="secondary"):
                 st.session_state['confirm_delete'] = False
                 st.rerun()
+
+    with col1:
+        with st.expander("📦 Ekspor Riwayat"):
+            export_col1, export_col2 = st.columns(2)
+            with export_col1:
+                export_range = st.date_input(
+                    "Rentang Tanggal",
+                    value=(datetime.now().date() - timedelta(days=30), datetime.now().date()),
+                    key="export_range"
+                )
+            with export_col2:
+                export_format = st.selectbox(
+                    "Format", export.available_formats(),
+                    format_func=lambda f: {"csv": "CSV (metadata)", "parquet": "Parquet (metadata)", "zip": "ZIP (gambar + metadata.csv)"}[f],
+                    key="export_format"
+                )
+            if isinstance(export_range, (list, tuple)) and len(export_range) == 2:
+                export_start = datetime.combine(export_range[0], datetime.min.time())
+                export_end = datetime.combine(export_range[1], datetime.min.time()) + timedelta(days=1)
+
+                def build_export(fmt=export_format, start=export_start, end=export_end):
+                    # Stream into a temporary file on disk instead of building the export in memory;
+                    # the download needs the bytes anyway, the file is closed (and removed) after reading
+                    with tempfile.TemporaryFile() as tmp:
+                        if fmt == "csv":
+                            text_stream = io.TextIOWrapper(tmp, encoding="utf-8", newline="")
+                            export.write_csv(text_stream, start, end)
+                            text_stream.flush()
+                            text_stream.detach()
+                        elif fmt == "parquet":
+                            export.write_parquet(tmp, start, end)
+                        else:
+                            export.write_zip(tmp, start, end)
+                        tmp.seek(0)
+                        return tmp.read()
+
+                st.download_button(
+                    "⬇️ Unduh Ekspor",
+                    data=build_export,
+                    file_name=f"riwayat_{export_range[0]}_{export_range[1]}.{export_format}",
+                    mime={"csv": "text/csv", "parquet": "application/octet-stream", "zip": "application/zip"}[export_format],
+                    key="export_download"
+                )
+                st.caption("Untuk ekspor besar gunakan CLI: `python export.py --format zip --output riwayat.zip`")
+
+        with st.expander("🧹 Retensi & Kompaksi Database"):
+            policy = retention.default_policy()
+            st.markdown(f"""
+            - **Umur maksimum:** {policy['max_age_days'] or '-'} hari
+            - **Jumlah maksimum:** {policy['max_rows'] or '-'} riwayat
+            - **Ukuran maksimum:** {f"{policy['max_bytes'] / (1024 * 1024):.0f} MB" if policy['max_bytes'] else '-'}
+            - **Hanya thumbnail setelah:** {policy['thumbnail_after_days'] or '-'} hari
+            - **Ukuran file saat ini:** {retention.file_size() / (1024 * 1024):.1f} MB
+            """)
+            if settings.RETENTION_ENABLED:
+                st.caption(f"Retensi otomatis aktif (setiap {settings.RETENTION_INTERVAL // 3600} jam)")
+            else:
+                st.caption("Retensi otomatis nonaktif; aktifkan dengan `ECODETECT_RETENTION=1`")
+            st.warning("⚠️ Riwayat yang dihapus atau diubah ke thumbnail tidak dapat dikembalikan")
+            if retention.database_file() and not retention.incremental_vacuum_enabled():
+                st.info("Kompaksi inkremental belum aktif: ruang kosong belum dikembalikan ke disk. "
+                        "Aktivasi menjalankan VACUUM penuh sekali dan mengunci database selama proses berlangsung.")
+                if st.button("🗜️ Aktifkan Kompaksi Inkremental", key="retention_enable_vacuum"):
+                    with st.spinner("Menjalankan VACUUM penuh..."):
+                        retention.enable_incremental_vacuum()
+                    st.rerun()
+            if st.button("▶️ Jalankan Sekarang", key="retention_run"):
+                with st.spinner("Menerapkan retensi..."):
+                    retention.apply_retention()
+            report = retention.last_report
+            if report:
+                st.markdown(f"""
+                **Terakhir dijalankan:** {report['started_at']}
+                - Dihapus (umur): {report['expired_rows']}
+                - Dihapus (batas jumlah/ukuran): {report['trimmed_rows']}
+                - Diubah ke thumbnail: {report['thumbnailed_rows']}
+                - Ruang dikembalikan: {report['bytes_reclaimed'] / (1024 * 1024):.1f} MB
+                - Waktu: {report['seconds']:.2f} detik
+                """)
     
     try:
         history = helper.get_detection_history()
@@ -518,7 +665,12 @@ elif page == "📚 Riwayat":
             """, unsafe_allow_html=True)
         else:
             # History is already ordered by timestamp desc (latest first) from helper.get_detection_history()
-            st.markdown(f"**Total Riwayat:** {len(history)} deteksi")
+            st.markdown(f"**Total Riwayat:** {helper.get_detection_count()} deteksi")
+            st.markdown(helper.format_category_counts(helper.get_category_totals()), unsafe_allow_html=True)
+            reuse = ingest.stats()
+            if reuse["reused"]:
+                st.caption(f"♻️ {reuse['reused']} unggahan ulang dilayani dari riwayat tanpa inferensi "
+                           f"(hemat {reuse['bytes_saved'] / (1024 * 1024):.1f} MB penyimpanan)")
             
             for i, record in enumerate(history):
                 with st.container():
@@ -564,9 +716,13 @@ elif page == "📚 Riwayat":
                         st.markdown(f"""
                         - **ID Deteksi:** #{record.id}
                         - **Tipe Sumber:** {record.source_type}
+                        - **Hash Konten:** `{(record.content_hash or '-')[:12]}`
+                        - **Dipakai Ulang:** {record.reuse_count or 0}x
                         - **Status:** ✅ Berhasil dideteksi
                         - **Kualitas:** Baik
                         """)
+                        if record.detections:
+                            st.markdown(helper.format_category_counts(helper.record_category_counts(record)), unsafe_allow_html=True)
                         
                         # Delete individual record button
                         if st.button(f'🗑️ Hapus Deteksi #{i+1}', key=f'delete_{record.id}'):
@@ -583,6 +739,79 @@ elif page == "📚 Riwayat":
         st.error("Error saat memuat riwayat deteksi.")
         st.error(ex)
 
+# Analytics Page
+elif page == "📊 Analitik":
+    st.title("📊 Analitik Deteksi")
+
+    col1, col2, col3 = st.columns([2, 2, 1])
+    with col1:
+        date_range = st.date_input(
+            "Rentang Tanggal",
+            value=(datetime.now().date() - timedelta(days=30), datetime.now().date()),
+            key="analytics_range"
+        )
+    with col2:
+        granularity = st.radio("Per", ["day", "hour"], format_func=lambda g: "Hari" if g == "day" else "Jam", horizontal=True, key="analytics_granularity")
+    with col3:
+        if st.button("🔄 Bangun Ulang", help="Hitung ulang ringkasan dari tabel riwayat, mulai hari riwayat tertua yang tersimpan"):
+            helper.rebuild_detection_rollup()
+            st.rerun()
+    st.caption("Ringkasan tetap mencakup riwayat yang sudah dihapus retensi. Bangun Ulang hanya menghitung ulang "
+               "mulai hari riwayat tertua yang tersimpan; riwayat yang dihapus manual dalam rentang itu tidak lagi terhitung.")
+
+    if isinstance(date_range, (list, tuple)) and len(date_range) == 2:
+        start = datetime.combine(date_range[0], datetime.min.time())
+        end = datetime.combine(date_range[1], datetime.min.time()) + timedelta(days=1)
+        try:
+            analytics = helper.get_detection_analytics(start, end, granularity)
+            total_objects = sum(row["count"] for row in analytics["per_class"])
+
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Gambar Dideteksi", analytics["records"])
+            with col2:
+                st.metric("Objek Terdeteksi", total_objects)
+            with col3:
+                organic = analytics["categories"].get(settings.ORGANIC, 0)
+                st.metric("Porsi Organik", f"{organic / total_objects:.0%}" if total_objects else "-")
+
+            if total_objects:
+                st.markdown("### 📈 Deteksi per Kelas")
+                per_period = pd.DataFrame(analytics["per_period"]).pivot_table(
+                    index="period", columns="class_name", values="count", aggfunc="sum", fill_value=0
+                )
+                st.bar_chart(per_period)
+
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.markdown("### ♻️ Organik vs Anorganik")
+                    st.bar_chart(pd.Series(analytics["categories"], name="Jumlah"))
+                with col2:
+                    st.markdown("### 🎯 Distribusi Kepercayaan")
+                    st.bar_chart(pd.DataFrame(analytics["confidence"]).set_index("range"))
+
+                st.markdown("### 📋 Ringkasan per Kelas")
+                st.dataframe(
+                    [
+                        {
+                            "Kelas": row["class_name"],
+                            "Kategori": helper.get_waste_category(row["class_name"]),
+                            "Jumlah": row["count"],
+                            "Rata-rata Kepercayaan": round(row["mean_confidence"], 3),
+                        }
+                        for row in analytics["per_class"]
+                    ],
+                    hide_index=True,
+                    use_container_width=True,
+                )
+            else:
+                st.info("📭 Belum ada deteksi pada rentang tanggal ini.")
+        except Exception as ex:
+            st.error("Error saat memuat analitik.")
+            st.error(ex)
+    else:
+        st.info("Pilih tanggal awal dan akhir.")
+
 # Footer
 st.markdown("---")
 st.markdown("""
@@ -0,0 +1,129 @@
+"""Process-wide cache for the static images shown on the Beranda and Deteksi pages.
+
+Images are decoded and resized once per (path, mtime, target height) and kept
+as encoded JPEG bytes, shared by all sessions, so a rerun neither reopens nor
+re-encodes them. When Streamlit's static serving is on, each variant is also
+written to static/assets/ under a content-hashed name and rendered by URL:
+the browser then fetches it once and revalidates it (ETag/Last-Modified)
+instead of receiving the bytes again through the media endpoint.
+
+    st.image(assets.image("images/kertas.jpg", 200), caption="...")
+"""
+import hashlib
+import io
+import os
+import threading
+from pathlib import Path
+
+import PIL.Image
+
+import settings
+
+STATIC_URL = "/app/static/assets"
+
+_cache = {}  # (path, mtime_ns, height) -> Asset
+_lock = threading.Lock()
+
+
+class Asset:
+    def __init__(self, path, height, data, size):
+        self.path = path
+        self.height = height
+        self.data = data
+        self.size = size  # (width, height) of the encoded image
+        self.digest = hashlib.sha1(data).hexdigest()[:12]
+        self.url = None
+
+
+def resize_to_fixed_height(image, height):
+    """Resize image to fixed height while maintaining aspect ratio"""
+    aspect_ratio = image.width / image.height
+    width = int(height * aspect_ratio)
+    return image.resize((width, height))
+
+
+def _build(path, height):
+    if height is None:
+        # Original size: the file bytes are sent as they are, without decoding
+        data = Path(path).read_bytes()
+        with PIL.Image.open(io.BytesIO(data)) as image:
+            return Asset(path, height, data, image.size)
+    with PIL.Image.open(path) as image:
+        # Let the JPEG decoder downscale by a power of two before resizing
+        image.draft("RGB", (1, height))
+        resized = resize_to_fixed_height(image.convert("RGB"), height)
+    buffer = io.BytesIO()
+    resized.save(buffer, format="JPEG", quality=settings.ASSET_JPEG_QUALITY)
+    return Asset(path, height, buffer.getvalue(), resized.size)
+
+
+def _publish(asset, static_dir):
+    """Write the variant under a content-hashed name; returns its /app/static URL"""
+    stem = Path(asset.path).stem
+    suffix = f"_h{asset.height}" if asset.height else ""
+    name = f"{stem}{suffix}_{asset.digest}.jpg"
+    target = Path(static_dir) / name
+    if not target.exists():
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_suffix(".tmp")
+        tmp.write_bytes(asset.data)
+        os.replace(tmp, target)
+    return f"{STATIC_URL}/{name}"
+
+
+def load(path, height=None):
+    """Cached Asset for `path` resized to `height` (original size if None)"""
+    path = str(path)
+    key = (path, os.stat(path).st_mtime_ns, height)
+    asset = _cache.get(key)
+    if asset is None:
+        with _lock:
+            asset = _cache.get(key)
+            if asset is None:
+                asset = _build(path, height)
+                # Drop variants of an older version of the same file
+                for stale in [k for k in _cache if k[0] == path and k[2] == height]:
+                    del _cache[stale]
+                _cache[key] = asset
+    return asset
+
+
+def static_serving_enabled():
+    try:
+        import streamlit as st
+        return bool(st.get_option("server.enableStaticServing"))
+    except Exception:
+        return False
+
+
+def image(path, height=None, static=None):
+    """What to pass to st.image: a static URL when served statically, else the cached bytes"""
+    asset = load(path, height)
+    if static is None:
+        static = static_serving_enabled()
+    if not static:
+        return asset.data
+    if asset.url is None:
+        try:
+            asset.url = _publish(asset, settings.ASSET_STATIC_DIR)
+        except OSError as e:
+            # Read-only deployment: fall back to the media endpoint
+            print(f"Error publishing asset {path}: {e}")
+            return asset.data
+    return asset.url
+
+
+def prepare(variants):
+    """Pre-generate (path, height) variants, e.g. at startup; skips missing files"""
+    static = static_serving_enabled()
+    for path, height in variants:
+        try:
+            image(path, height, static=static)
+        except (OSError, PIL.UnidentifiedImageError) as e:
+            print(f"Error preparing asset {path}: {e}")
+
+
+def stats():
+    with _lock:
+        entries = list(_cache.values())
+    return {"entries": len(entries), "bytes": sum(len(a.data) for a in entries)}
@@ -0,0 +1,7 @@
+"""Benchmark suite for EcoDetect.
+
+Run from the repository root:
+
+    python -m benchmarks.run --output bench_results.json
+    python -m benchmarks.compare old.json new.json
+"""
@@ -0,0 +1,42 @@
+"""Analytics queries over months of synthetic rollup data in the scratch DB."""
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from benchmarks.common import summarize
+
+CLASSES = ["biodegradable", "cardboard", "glass", "metal", "paper", "plastic"]
+
+
+def run(days=180, detections_per_hour=20, repeat=20):
+    import helper
+    from database import SessionLocal
+
+    rng = np.random.default_rng(0)
+    # Whole-day ranges, as selected on the Analitik page
+    end = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    start = end - timedelta(days=days)
+
+    db = SessionLocal()
+    try:
+        hour = start
+        while hour < end:
+            names = rng.choice(CLASSES, detections_per_hour)
+            confs = rng.uniform(0.25, 1.0, detections_per_hour)
+            detections = [{"name": str(n), "confidence": float(c)} for n, c in zip(names, confs)]
+            helper.update_detection_rollup(db, "Image", hour, detections)
+            hour += timedelta(hours=1)
+        db.commit()
+    finally:
+        db.close()
+
+    results = {}
+    for granularity, span in (("day", days), ("hour", 7)):
+        samples = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            helper.get_detection_analytics(end - timedelta(days=span), end, granularity)
+            samples.append(time.perf_counter() - t0)
+        results[f"analytics.{span}d.per_{granularity}"] = summarize(samples)
+    return results
@@ -0,0 +1,93 @@
+"""Beranda page images: per-rerun PIL open/resize (previous code) vs the asset cache.
+
+Each variant renders the page's seven images through Streamlit's AppTest and
+reports the rerun time plus the image bytes the server had to hand to the
+media endpoint for that run (with static serving the images are sent as
+/app/static URLs, fetched once by the browser and then revalidated).
+"""
+import time
+
+import settings
+from benchmarks.common import SCRATCH_DIR, summarize
+
+LEGACY = """
+import PIL.Image
+import streamlit as st
+import settings
+
+def resize_to_fixed_height(image, height):
+    aspect_ratio = image.width / image.height
+    width = int(height * aspect_ratio)
+    return image.resize((width, height))
+
+for path in (settings.DEFAULT_IMAGE, settings.DEFAULT_DETECT_IMAGE):
+    PIL.Image.open(path)
+    st.image(str(path), use_container_width=True)
+for name in settings.HOME_EXAMPLE_IMAGES:
+    image = PIL.Image.open(settings.IMAGES_DIR / name)
+    st.image(resize_to_fixed_height(image, settings.HOME_EXAMPLE_HEIGHT), use_container_width=False)
+"""
+
+CACHED = """
+import streamlit as st
+import assets
+import settings
+
+STATIC = {static}
+for path in (settings.DEFAULT_IMAGE, settings.DEFAULT_DETECT_IMAGE):
+    st.image(assets.image(path, static=STATIC), use_container_width=True)
+for name in settings.HOME_EXAMPLE_IMAGES:
+    st.image(assets.image(settings.IMAGES_DIR / name, settings.HOME_EXAMPLE_HEIGHT, static=STATIC), use_container_width=False)
+"""
+
+
+def _render(script, repeat):
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.testing.v1 import AppTest
+
+    sent = []
+    original = MemoryMediaFileStorage.load_and_get_id
+
+    def counting(self, *args, **kwargs):
+        file_id = original(self, *args, **kwargs)
+        sent.append(len(self.get_file(file_id).content))
+        return file_id
+
+    samples = []
+    MemoryMediaFileStorage.load_and_get_id = counting
+    try:
+        for i in range(repeat + 1):
+            app = AppTest.from_string(script)
+            sent.clear()
+            t0 = time.perf_counter()
+            app.run()
+            elapsed = time.perf_counter() - t0
+            if app.exception:
+                raise RuntimeError(app.exception[0].message)
+            if i > 0:  # the first run is a warm-up (imports, first decode)
+                samples.append(elapsed)
+    finally:
+        MemoryMediaFileStorage.load_and_get_id = original
+    return samples, sum(sent)
+
+
+def run(repeat=20):
+    import assets
+
+    settings.ASSET_STATIC_DIR = SCRATCH_DIR / "static" / "assets"
+    assets.prepare(
+        [(settings.DEFAULT_IMAGE, None), (settings.DEFAULT_DETECT_IMAGE, None)]
+        + [(settings.IMAGES_DIR / name, settings.HOME_EXAMPLE_HEIGHT) for name in settings.HOME_EXAMPLE_IMAGES]
+    )
+
+    results = {}
+    for name, script in (
+        ("assets.legacy", LEGACY),
+        ("assets.cached_bytes", CACHED.format(static=False)),
+        ("assets.cached_static", CACHED.format(static=True)),
+    ):
+        samples, sent = _render(script, repeat)
+        results[name] = summarize(samples)
+        results[name]["media_bytes_per_run"] = sent
+        print(f"{name}: media bytes per rerun {sent / 1024:.1f} KiB")
+    return results
@@ -0,0 +1,60 @@
+"""Cascade mode (cascade.py) vs the full model on every frame.
+
+With real weights the pair is CASCADE_FAST_MODEL + best.pt. Without them the
+stand-ins are yolo11n.yaml (fast) and yolo11m.yaml (full): random weights,
+so their confidences stay far below the uncertain band and only audits and
+new classes escalate, but the cost of each path is representative.
+"""
+import time
+from pathlib import Path
+
+import cascade
+import postprocess
+import settings
+from benchmarks.bench_webcam import synthetic_frames
+from benchmarks.common import summarize
+from model_registry import registry
+
+
+def _models():
+    if Path(settings.DETECTION_MODEL).exists() and Path(settings.CASCADE_FAST_MODEL).exists():
+        return str(settings.CASCADE_FAST_MODEL), registry.load(settings.DETECTION_MODEL)
+    return "yolo11n.yaml", registry.load("yolo11m.yaml")
+
+
+def run(iterations=60, confidence=0.4):
+    fast_model, full_model = _models()
+    images = [f.to_ndarray(format="bgr24") for f in synthetic_frames(iterations)]
+    full_model.predict(images[0], conf=confidence, verbose=False)
+    registry.load(fast_model).predict(images[0], conf=confidence, verbose=False)
+
+    samples = []
+    start = time.perf_counter()
+    for image in images:
+        t0 = time.perf_counter()
+        postprocess.process(full_model.predict(image, conf=confidence, verbose=False)[0], confidence)
+        samples.append(time.perf_counter() - t0)
+    results = {"cascade.full_only": summarize(samples, time.perf_counter() - start)}
+
+    for audit_every in (30, 5):
+        name = f"cascade.audit{audit_every}"
+        config = cascade.CascadeConfig(fast_model, audit_every=audit_every)
+        stream = cascade.Cascade(config)
+        cascade.reset_stats()
+        samples = []
+        start = time.perf_counter()
+        for image in images:
+            t0 = time.perf_counter()
+            result, reason = stream.predict(image, confidence, full_model)
+            postprocess.process(result, confidence)
+            elapsed = time.perf_counter() - t0
+            cascade.record(reason, elapsed)
+            samples.append(elapsed)
+        results[name] = summarize(samples, time.perf_counter() - start)
+        stats = cascade.stats()
+        results[name]["escalated_fraction"] = stats["escalated_fraction"]
+        results[name]["escalated_reasons"] = stats["reasons"]
+        results[name]["fast_path_p50_ms"] = stats["latency"][cascade.FAST]["p50_ms"]
+        results[name]["escalated_path_p50_ms"] = stats["latency"]["escalated"]["p50_ms"]
+    cascade.reset_stats()
+    return results
@@ -0,0 +1,36 @@
+import io
+import time
+
+import PIL.Image
+
+from benchmarks.common import SAMPLE_IMAGES, measure, summarize
+
+
+def _png_bytes(path):
+    buf = io.BytesIO()
+    PIL.Image.open(path).convert("RGB").save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def run(iterations=200, history_reads=10):
+    """save_detection / get_detection_history against the scratch SQLite file"""
+    import helper
+
+    blobs = [_png_bytes(p) for p in SAMPLE_IMAGES]
+    inputs = [(f"bench_{i}.png", blobs[i % len(blobs)]) for i in range(iterations)]
+
+    def save(item):
+        name, blob = item
+        helper.save_detection("Image", name, blob)
+
+    results = {"db.save_detection": measure(save, inputs, warmup=0)}
+
+    samples = []
+    start = time.perf_counter()
+    for _ in range(history_reads):
+        t0 = time.perf_counter()
+        helper.get_detection_history()
+        samples.append(time.perf_counter() - t0)
+    results["db.get_detection_history"] = summarize(samples, time.perf_counter() - start)
+    results["db.get_detection_history"]["rows"] = helper.get_detection_count()
+    return results
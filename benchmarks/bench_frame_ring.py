@@ -0,0 +1,114 @@
+"""Frame handoff to worker processes: frame_ring.py vs pickling through queues.
+
+Both sides do the same stand-in work in one worker process (copy the frame
+to an output, draw a box), so the numbers are the transport: a 640x480 BGR
+frame out, an annotated frame and its boxes back. roundtrip keeps one frame
+in flight; pipelined keeps up to FRAME_RING_SLOTS in flight.
+"""
+import multiprocessing
+import pickle
+import time
+
+import numpy as np
+
+import frame_ring
+import settings
+from benchmarks import frame_ring_workers
+from benchmarks.bench_webcam import synthetic_frames
+from benchmarks.common import summarize
+
+
+def _pickle_run(ctx, images, window, confidence):
+    requests, results = ctx.Queue(), ctx.Queue()
+    worker = ctx.Process(target=frame_ring_workers.pickle_worker, args=(requests, results), daemon=True)
+    worker.start()
+    try:
+        sent = {}
+        samples = []
+        output = np.empty_like(images[0])
+        # Warm-up round trip (process start, first pickles)
+        requests.put((-1, images[0], confidence))
+        results.get()
+        start = time.perf_counter()
+        for seq, image in enumerate(images):
+            if len(sent) >= window:
+                done, result, _ = results.get()
+                np.copyto(output, result)
+                samples.append(time.perf_counter() - sent.pop(done))
+            sent[seq] = time.perf_counter()
+            requests.put((seq, image, confidence))
+        while sent:
+            done, result, _ = results.get()
+            np.copyto(output, result)
+            samples.append(time.perf_counter() - sent.pop(done))
+        return summarize(samples, time.perf_counter() - start)
+    finally:
+        requests.put(None)
+        worker.join(5)
+
+
+def _ring_run(ctx, images, window, confidence):
+    height, width = images[0].shape[:2]
+    ring = frame_ring.FrameRing(width, height, slots=max(window, 1))
+    requests = ctx.Queue()
+    worker = ctx.Process(target=frame_ring_workers.ring_worker, args=(requests,), daemon=True)
+    worker.start()
+    try:
+        sent = {}
+        samples = []
+        output = np.empty_like(images[0])
+
+        def wait_one():
+            while True:
+                done = ring.collect()
+                if done is not None:
+                    break
+                time.sleep(0.0001)
+            slot, seq, _ = done
+            np.copyto(output, ring.output(slot))
+            ring.release(slot)
+            now = time.perf_counter()
+            samples.append(now - sent.pop(seq))
+            # One worker goes in order, so earlier frames are done too (collect() freed them as superseded)
+            for older in [s for s in sent if s < seq]:
+                samples.append(now - sent.pop(older))
+
+        # Warm-up round trip (process start, first attach)
+        slot = ring.acquire()
+        np.copyto(ring.input(slot), images[0])
+        sent[ring.submit(slot, requests, confidence)] = time.perf_counter()
+        wait_one()
+        samples.clear()
+
+        start = time.perf_counter()
+        for image in images:
+            slot = ring.acquire()
+            while slot is None:
+                wait_one()
+                slot = ring.acquire()
+            np.copyto(ring.input(slot), image)
+            sent[ring.submit(slot, requests, confidence)] = time.perf_counter()
+        while sent:
+            wait_one()
+        result = summarize(samples, time.perf_counter() - start)
+        result["superseded"] = ring.superseded
+        return result
+    finally:
+        requests.put(None)
+        worker.join(5)
+        ring.close()
+
+
+def run(iterations=200, confidence=0.4):
+    ctx = multiprocessing.get_context("spawn")
+    images = [f.to_ndarray(format="bgr24") for f in synthetic_frames(iterations)]
+    descriptor = ("psm_00000000", (640, 480, settings.FRAME_RING_SLOTS), 0, 1, confidence)
+    results = {}
+    for mode, window in (("roundtrip", 1), ("pipelined", settings.FRAME_RING_SLOTS)):
+        pickled = _pickle_run(ctx, images, window, confidence)
+        pickled["pickled_bytes_per_frame"] = len(pickle.dumps((0, images[0], confidence), pickle.HIGHEST_PROTOCOL))
+        results[f"frame_ring.pickle_{mode}"] = pickled
+        ring = _ring_run(ctx, images, window, confidence)
+        ring["pickled_bytes_per_frame"] = len(pickle.dumps(descriptor, pickle.HIGHEST_PROTOCOL))
+        results[f"frame_ring.shm_{mode}"] = ring
+    return results
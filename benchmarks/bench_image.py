@@ -0,0 +1,21 @@
+import PIL.Image
+
+from benchmarks.common import SAMPLE_IMAGES, measure
+
+
+def run(model, iterations=20, confidence=0.4):
+    """helper.load_model + predict/plot on the sample images, like the Deteksi page"""
+    images = [PIL.Image.open(p).convert("RGB") for p in SAMPLE_IMAGES]
+    inputs = [images[i % len(images)] for i in range(iterations)]
+
+    def predict(image):
+        return model.predict(image, conf=confidence, verbose=False)
+
+    def predict_and_plot(image):
+        res = model.predict(image, conf=confidence, verbose=False)
+        return res[0].plot()[:, :, ::-1]
+
+    return {
+        "image.predict": measure(predict, inputs),
+        "image.predict_plot": measure(predict_and_plot, inputs),
+    }
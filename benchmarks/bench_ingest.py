@@ -0,0 +1,105 @@
+"""Replay an upload log with and without deduplicated ingestion (ingest.py).
+
+The log is a text file with one uploaded image path per line, in upload
+order (`--ingest-log`). Without one, a synthetic log is built from the sample
+images: a few popular images uploaded again and again, plus double clicks
+that repeat the previous upload straight away.
+
+Both modes run the same path as the Deteksi page (hash, lookup, predict,
+plot, PNG encode, save) and report how many predict calls and how many
+stored image bytes the log costs.
+"""
+import io
+import time
+
+import numpy as np
+import PIL.Image
+
+import ingest
+import postprocess
+import settings
+from benchmarks.common import SAMPLE_IMAGES, summarize
+
+
+def synthetic_log(events=60, double_click=0.15, seed=0):
+    """Paths drawn with a Zipf-like skew; some uploads are repeated right away"""
+    rng = np.random.default_rng(seed)
+    weights = 1.0 / np.arange(1, len(SAMPLE_IMAGES) + 1)
+    weights /= weights.sum()
+    log = []
+    while len(log) < events:
+        path = SAMPLE_IMAGES[rng.choice(len(SAMPLE_IMAGES), p=weights)]
+        log.append(path)
+        if rng.random() < double_click and len(log) < events:
+            log.append(path)
+    return log
+
+
+def read_log(path):
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def _stored_bytes():
+    from database import DetectionHistory, SessionLocal
+    from sqlalchemy import func
+
+    db = SessionLocal()
+    try:
+        rows, size = db.query(func.count(DetectionHistory.id), func.sum(func.length(DetectionHistory.detected_image))).one()
+        return rows, size or 0
+    finally:
+        db.close()
+
+
+def _replay(model, log, confidence, dedup):
+    import helper
+
+    settings.INGEST_DEDUP = dedup
+    rows_before, bytes_before = _stored_bytes()
+    predict_calls = 0
+    samples = []
+    start = time.perf_counter()
+    for i, path in enumerate(log):
+        t0 = time.perf_counter()
+        with open(path, "rb") as f:
+            data = f.read()
+        digest = ingest.content_hash(data)
+        key = ingest.result_key(digest, model, confidence=confidence, tiles=None)
+        # Each log line is its own user action, so the idempotency key never matches here
+        idempotency_key = ingest.idempotency_key("replay", dedup, i, key or digest) if dedup else None
+        if ingest.lookup(key, idempotency_key) is None:
+            image = PIL.Image.open(io.BytesIO(data))
+            res = model.predict(image, conf=confidence, verbose=False)
+            predict_calls += 1
+            dets = postprocess.process(res[0], confidence)
+            buf = io.BytesIO()
+            PIL.Image.fromarray(postprocess.plot(res[0], dets)[:, :, ::-1]).save(buf, format="PNG")
+            helper.save_detection("Image", str(path), buf.getvalue(), dets.to_dicts(),
+                                  content_hash=digest, result_key=key, idempotency_key=idempotency_key)
+        samples.append(time.perf_counter() - t0)
+    result = summarize(samples, time.perf_counter() - start)
+    rows_after, bytes_after = _stored_bytes()
+    result.update({
+        "events": len(log),
+        "predict_calls": predict_calls,
+        "rows_stored": rows_after - rows_before,
+        "stored_mb": (bytes_after - bytes_before) / (1024 * 1024),
+    })
+    return result
+
+
+def run(model, confidence=0.4, log_path=None, events=60):
+    log = read_log(log_path) if log_path else synthetic_log(events)
+    dedup_setting = settings.INGEST_DEDUP
+    try:
+        results = {
+            "ingest.baseline": _replay(model, log, confidence, dedup=False),
+            "ingest.dedup": _replay(model, log, confidence, dedup=True),
+        }
+    finally:
+        settings.INGEST_DEDUP = dedup_setting
+    for name, r in results.items():
+        print(f"{name}: {r['events']} uploads -> {r['predict_calls']} predict calls, "
+              f"{r['rows_stored']} rows, {r['stored_mb']:.2f} MB of images")
+    return results
@@ -0,0 +1,89 @@
+"""Live history: deque-of-dicts (previous implementation) vs the columnar ring buffer."""
+import time
+import tracemalloc
+from collections import deque
+
+import numpy as np
+
+from benchmarks.common import summarize
+from live_history import DetectionRingBuffer
+
+NAMES = {0: "biodegradable", 1: "cardboard", 2: "glass", 3: "metal", 4: "paper", 5: "plastic"}
+
+
+def _frames(events, per_frame, fps=15.0):
+    """Synthetic frames: (class ids, confidences, boxes, timestamp), 15 fps ending now"""
+    rng = np.random.default_rng(0)
+    n_frames = events // per_frame
+    now = time.time()
+    for i in range(n_frames):
+        cls = rng.integers(0, len(NAMES), per_frame).astype(np.float32)
+        conf = rng.uniform(0.25, 1.0, per_frame).astype(np.float32)
+        boxes = rng.uniform(0, 640, (per_frame, 4)).astype(np.float32)
+        yield cls, conf, boxes, now - (n_frames - i) / fps
+
+
+def _fill_deque(capacity, frames):
+    history = deque(maxlen=capacity)
+    for cls, conf, boxes, ts in frames:
+        for c, p, b in zip(cls, conf, boxes):
+            history.append({"name": NAMES[int(c)], "confidence": float(p), "time": ts, "box": b.tolist()})
+    return history
+
+
+def _fill_ring(capacity, frames):
+    history = DetectionRingBuffer(capacity)
+    for cls, conf, boxes, ts in frames:
+        history.append(cls, conf, boxes, NAMES, timestamp=ts)
+    return history
+
+
+def _deque_window_max(history, seconds, now):
+    recent = [d for d in history if now - d["time"] <= seconds]
+    groups = {}
+    for d in recent:
+        if d["name"] not in groups or d["confidence"] > groups[d["name"]]["confidence"]:
+            groups[d["name"]] = d
+    return groups
+
+
+def _allocated(fill, capacity, frames):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    obj = fill(capacity, frames)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, after - before
+
+
+def _time_query(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return summarize(samples)
+
+
+def run(capacity=100_000, per_frame=5, repeat=50):
+    frames = list(_frames(capacity, per_frame))
+    now = time.time()
+    results = {}
+
+    dq, dq_bytes = _allocated(_fill_deque, capacity, frames)
+    ring, ring_bytes = _allocated(_fill_ring, capacity, frames)
+
+    results["history.deque.window_max"] = _time_query(lambda: _deque_window_max(dq, 10, now), repeat)
+    results["history.deque.window_max"]["memory_bytes"] = dq_bytes
+    results["history.ring.window_max"] = _time_query(lambda: ring.window_max_per_class(10, now), repeat)
+    results["history.ring.window_max"]["memory_bytes"] = ring_bytes
+
+    append_frames = frames[:1000]
+    fresh = DetectionRingBuffer(capacity)
+    results["history.ring.append"] = _time_query(
+        lambda: [fresh.append(c, p, b, NAMES, timestamp=t) for c, p, b, t in append_frames], 10
+    )
+    results["history.ring.append"]["frames_per_call"] = len(append_frames)
+
+    print(f"Memory for {len(ring)} events: deque-of-dicts {dq_bytes / 1e6:.1f} MB, ring buffer {ring_bytes / 1e6:.1f} MB")
+    return results
@@ -0,0 +1,61 @@
+"""Post-processing: the per-box Python loop (previous app.py code) vs postprocess.py arrays."""
+import time
+
+import numpy as np
+import torch
+from ultralytics.engine.results import Results
+
+import postprocess
+from benchmarks.common import summarize
+
+NAMES = {0: "biodegradable", 1: "cardboard", 2: "glass", 3: "metal", 4: "paper", 5: "plastic"}
+
+
+def _result(n, rng):
+    xy = rng.uniform(0, 600, (n, 2))
+    wh = rng.uniform(10, 120, (n, 2))
+    data = np.column_stack([
+        xy, xy + wh,
+        rng.uniform(0.25, 1.0, n),
+        rng.integers(0, len(NAMES), n),
+    ]).astype(np.float32)
+    return Results(np.zeros((720, 720, 3), np.uint8), path="", names=NAMES, boxes=torch.from_numpy(data))
+
+
+def _legacy(result, confidence):
+    detected_waste = []
+    boxes = result.boxes
+    if boxes:
+        for box in boxes:
+            class_id = int(box.cls)
+            class_name = result.names[class_id]
+            conf_value = float(box.conf)
+            detected_waste.append({"name": class_name, "confidence": conf_value})
+        detected_waste.sort(key=lambda x: x["confidence"], reverse=True)
+    return detected_waste
+
+
+def _time(fn, result, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(result)
+        samples.append(time.perf_counter() - t0)
+    return summarize(samples)
+
+
+def run(box_counts=(10, 100, 300), repeat=50, confidence=0.25):
+    rng = np.random.default_rng(0)
+    results = {}
+    for n in box_counts:
+        result = _result(n, rng)
+        results[f"post.loop.{n}"] = _time(lambda r: _legacy(r, confidence), result, repeat)
+        # Same output as the loop: threshold + sort, Python dicts at the end
+        results[f"post.arrays.{n}"] = _time(
+            lambda r: postprocess.process(r, confidence, nms_iou=None, top_k=None).to_dicts(), result, repeat
+        )
+        # Full pipeline: per-class thresholds, agnostic NMS, top-k, category counts
+        results[f"post.arrays_nms.{n}"] = _time(
+            lambda r: postprocess.process(r, confidence).category_counts(), result, repeat
+        )
+    return results
@@ -0,0 +1,115 @@
+"""Tiled inference: latency vs recall on synthetic high-resolution "waste pile" images.
+
+Each sample is a mosaic of the bundled images shrunk into a grid, so every
+object is small relative to the whole picture. The reference boxes come from
+running the model on each cell at its normal scale and mapping them into
+mosaic coordinates; recall is then the share of those boxes a method finds
+again (same class, IoU >= 0.5). With the stand-in model there are usually no
+reference boxes at a normal confidence, so run with the real weights
+(--model weights/best.pt) for meaningful recall numbers.
+"""
+import time
+
+import numpy as np
+import PIL.Image
+
+import tiling
+from benchmarks.common import SAMPLE_IMAGES, summarize
+
+GRID = 4
+CELL = (960, 720)
+CONFIGS = [
+    # name, predict_tiled kwargs
+    ("tiling.tile640_nms", {"tile_size": 640, "overlap": 0.2, "method": tiling.NMS}),
+    ("tiling.tile640_wbf", {"tile_size": 640, "overlap": 0.2, "method": tiling.WBF}),
+    ("tiling.tile640_no_overlap", {"tile_size": 640, "overlap": 0.0, "method": tiling.NMS}),
+    ("tiling.tile640_tiles_only", {"tile_size": 640, "overlap": 0.2, "method": tiling.NMS, "include_full": False}),
+    ("tiling.tile960_nms", {"tile_size": 960, "overlap": 0.2, "method": tiling.NMS}),
+]
+
+
+def _mosaics(count):
+    cells = [PIL.Image.open(p).convert("RGB").resize(CELL) for p in SAMPLE_IMAGES]
+    rng = np.random.default_rng(0)
+    for _ in range(count):
+        mosaic = PIL.Image.new("RGB", (CELL[0] * GRID, CELL[1] * GRID))
+        placed = []
+        for i in range(GRID * GRID):
+            cell = cells[rng.integers(len(cells))]
+            x, y = (i % GRID) * CELL[0], (i // GRID) * CELL[1]
+            mosaic.paste(cell, (x, y))
+            placed.append((cell, x, y))
+        yield mosaic, placed
+
+
+def _reference(model, placed, conf):
+    boxes, classes = [], []
+    for cell, x, y in placed:
+        b = model.predict(cell, conf=conf, verbose=False)[0].boxes
+        if len(b):
+            boxes.append(b.xyxy.cpu().numpy() + np.array([x, y, x, y], np.float32))
+            classes.append(b.cls.cpu().numpy())
+    if not boxes:
+        return np.zeros((0, 4), np.float32), np.zeros(0, np.float32)
+    return np.concatenate(boxes), np.concatenate(classes)
+
+
+def _matched(ref_boxes, ref_classes, result):
+    """Number of reference boxes found again (greedy, one prediction per reference)"""
+    b = result.boxes
+    pred_boxes = b.xyxy.cpu().numpy()
+    pred_classes = b.cls.cpu().numpy()
+    used = np.zeros(len(pred_boxes), bool)
+    found = 0
+    for box, cls in zip(ref_boxes, ref_classes):
+        candidates = np.flatnonzero((pred_classes == cls) & ~used)
+        if candidates.size == 0:
+            continue
+        iou = tiling._overlap(box, pred_boxes[candidates], tiling.IOU)
+        best = int(np.argmax(iou))
+        if iou[best] >= 0.5:
+            used[candidates[best]] = True
+            found += 1
+    return found
+
+
+def run(model, confidence, samples=3):
+    data = [(mosaic, _reference(model, placed, confidence)) for mosaic, placed in _mosaics(samples)]
+    width, height = data[0][0].size
+    methods = [
+        ("tiling.single_pass", lambda im: model.predict(im, conf=confidence, verbose=False)),
+        # Upscaled alternative: the whole image at native resolution in one pass
+        ("tiling.native_res", lambda im: model.predict(im, conf=confidence, imgsz=max(width, height), verbose=False)),
+    ] + [
+        (name, lambda im, kw=kw: tiling.predict_tiled(model, im, confidence, **kw))
+        for name, kw in CONFIGS
+    ]
+
+    results = {}
+    total_ref = sum(len(ref[0]) for _, ref in data)
+    for name, predict in methods:
+        predict(data[0][0])  # warm-up
+        latencies, found, boxes = [], 0, 0
+        for mosaic, (ref_boxes, ref_classes) in data:
+            t0 = time.perf_counter()
+            res = predict(mosaic)
+            latencies.append(time.perf_counter() - t0)
+            found += _matched(ref_boxes, ref_classes, res[0])
+            boxes += len(res[0].boxes)
+        results[name] = summarize(latencies)
+        results[name]["boxes"] = boxes
+        results[name]["recall"] = found / total_ref if total_ref else None
+        results[name]["reference_boxes"] = total_ref
+
+    # Tiling looks at every region the single pass does (and more): finding nothing
+    # where the single pass finds boxes means predict_tiled is broken, not slow
+    if results["tiling.single_pass"]["boxes"]:
+        empty = [name for name, _ in CONFIGS if not results[name]["boxes"]]
+        if empty:
+            raise RuntimeError(f"Tiled inference found no boxes where the single pass did: {', '.join(empty)}")
+
+    print(f"\nTiling on {samples} mosaics of {width}x{height} ({total_ref} reference boxes):")
+    for name, r in results.items():
+        recall = f"{r['recall']:.3f}" if r["recall"] is not None else "-"
+        print(f"  {name:<28} p50 {r['p50_ms']:8.1f} ms   recall {recall}")
+    return results
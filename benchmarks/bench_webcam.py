@@ -0,0 +1,100 @@
+import tracemalloc
+
+import av
+import numpy as np
+import PIL.Image
+
+import postprocess
+from benchmarks.common import SAMPLE_IMAGES, measure
+
+
+def synthetic_frames(count, width=640, height=480):
+    """yuv420p frames (what WebRTC delivers) built from the sample images"""
+    base = []
+    for p in SAMPLE_IMAGES:
+        rgb = np.asarray(PIL.Image.open(p).convert("RGB").resize((width, height)))
+        frame = av.VideoFrame.from_ndarray(np.ascontiguousarray(rgb[:, :, ::-1]), format="bgr24")
+        base.append(frame.reformat(format="yuv420p"))
+    frames = []
+    for i in range(count):
+        frame = base[i % len(base)]
+        frame.pts = i
+        frames.append(frame)
+    return frames
+
+
+def _legacy_convert(frame, result, dets):
+    """Previous frame path around the model: to_ndarray, plot copy, from_ndarray"""
+    image = frame.to_ndarray(format="bgr24")
+    plotted = postprocess.plot(result, dets)
+    return av.VideoFrame.from_ndarray(plotted, format="bgr24"), image
+
+
+def _pipeline_convert(pipeline, frame, dets):
+    image = pipeline.to_bgr(frame)
+    return pipeline.output_frame(image, lambda canvas: postprocess.draw(canvas, dets), like=frame)
+
+
+def _peak_kib(fn, frames):
+    """Mean peak of traced memory allocated during one call, in KiB.
+    NumPy buffers are traced by tracemalloc; FFmpeg's own frame buffers are not."""
+    fn(frames[0])
+    tracemalloc.start()
+    total = 0
+    for frame in frames:
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        fn(frame)
+        total += tracemalloc.get_traced_memory()[1] - current
+    tracemalloc.stop()
+    return total / len(frames) / 1024
+
+
+def _legacy_processor(helper, confidence, model):
+    """VideoProcessorWaste with the previous per-frame conversions, for comparison"""
+
+    class LegacyProcessor(helper.VideoProcessorWaste):
+        def _process_with(self, frame, model):
+            image = frame.to_ndarray(format="bgr24")
+            res = model.predict(image, conf=self.confidence)
+            dets = postprocess.process(res[0], self.confidence)
+            plotted = postprocess.plot(res[0], dets)
+            with helper.detection_lock:
+                helper.detection_history.append(dets.class_id, dets.confidence, dets.xyxy, model.names)
+            return av.VideoFrame.from_ndarray(plotted, format="bgr24")
+
+    return LegacyProcessor(confidence, model)
+
+
+def run(model, iterations=60, confidence=0.4):
+    """VideoProcessorWaste.recv fed synthetic frames, like a webcam session,
+    plus the frame conversion alone (previous path vs frame_pipeline.py)"""
+    import helper
+    from frame_pipeline import FramePipeline
+
+    processor = helper.VideoProcessorWaste(confidence, model)
+    legacy_processor = _legacy_processor(helper, confidence, model)
+    frames = synthetic_frames(iterations)
+    results = {
+        "webcam.recv_legacy": measure(legacy_processor.recv, frames),
+        "webcam.recv": measure(processor.recv, frames),
+    }
+
+    # Conversion + drawing only, on one frame's detections, without the model
+    result = model.predict(frames[0].to_ndarray(format="bgr24"), conf=confidence, verbose=False)[0]
+    dets = postprocess.process(result, confidence)
+    pipeline = FramePipeline()
+    legacy = lambda f: _legacy_convert(f, result, dets)
+    reused = lambda f: _pipeline_convert(pipeline, f, dets)
+    results["webcam.convert_legacy"] = measure(legacy, frames)
+    results["webcam.convert_pipeline"] = measure(reused, frames)
+
+    sample = frames[:20]
+    for name, fn in (
+        ("webcam.recv_legacy", legacy_processor.recv),
+        ("webcam.recv", processor.recv),
+        ("webcam.convert_legacy", legacy),
+        ("webcam.convert_pipeline", reused),
+    ):
+        results[name]["traced_peak_kib_per_frame"] = _peak_kib(fn, sample)
+    return results
@@ -0,0 +1,128 @@
+import os
+import sys
+import time
+import json
+import platform
+import subprocess
+import tempfile
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Point the app at a scratch database *before* settings/helper are imported,
+# so benchmarks never touch the real history.db
+SCRATCH_DIR = Path(tempfile.mkdtemp(prefix="ecodetect_bench_"))
+SCRATCH_DB = SCRATCH_DIR / "bench_history.db"
+os.environ.setdefault("ECODETECT_DATABASE_URL", f"sqlite:///{SCRATCH_DB}")
+
+import numpy as np
+import settings
+
+SAMPLE_IMAGES = sorted(
+    p for p in Path(settings.IMAGES_DIR).iterdir()
+    if p.suffix.lower() in (".jpg", ".jpeg", ".png")
+)
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None if unsupported)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes on Linux
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def summarize(samples, wall_time=None):
+    """Turn a list of per-call latencies (seconds) into a result dict"""
+    arr = np.asarray(samples, dtype=np.float64) * 1000.0
+    if wall_time is None:
+        wall_time = float(arr.sum()) / 1000.0
+    return {
+        "n": int(arr.size),
+        "mean_ms": float(arr.mean()) if arr.size else None,
+        "p50_ms": float(np.percentile(arr, 50)) if arr.size else None,
+        "p95_ms": float(np.percentile(arr, 95)) if arr.size else None,
+        "p99_ms": float(np.percentile(arr, 99)) if arr.size else None,
+        "max_ms": float(arr.max()) if arr.size else None,
+        "throughput_per_s": (arr.size / wall_time) if wall_time > 0 else None,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def measure(fn, inputs, warmup=3):
+    """Call fn on each input, returning a summary of the per-call latencies"""
+    for item in inputs[:warmup]:
+        fn(item)
+    samples = []
+    start = time.perf_counter()
+    for item in inputs:
+        t0 = time.perf_counter()
+        fn(item)
+        samples.append(time.perf_counter() - t0)
+    return summarize(samples, time.perf_counter() - start)
+
+
+def load_benchmark_model(model_path=None):
+    """Load the real weights if present, otherwise the tiny stand-in model"""
+    import helper
+
+    if model_path is None:
+        model_path = settings.DETECTION_MODEL
+        if not Path(model_path).exists():
+            model_path = settings.STANDIN_MODEL
+    model = helper.load_model(model_path)
+    if model is None:
+        raise RuntimeError(f"Could not load benchmark model from {model_path}")
+    return model, str(model_path)
+
+
+def git_commit():
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        )
+        return out.stdout.strip()
+    except Exception:
+        return None
+
+
+def environment_info():
+    info = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    try:
+        import torch
+        info["torch"] = torch.__version__
+        info["cuda"] = torch.cuda.is_available()
+    except ImportError:
+        pass
+    return info
+
+
+def write_results(results, path):
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+
+
+def print_table(results):
+    header = f"{'benchmark':<28}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'ops/s':>10}{'rss MB':>9}"
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        def fmt(v, spec):
+            return format(v, spec) if v is not None else "-"
+        print(
+            f"{name:<28}{r['n']:>6}{fmt(r['p50_ms'], '>10.2f')}{fmt(r['p95_ms'], '>10.2f')}"
+            f"{fmt(r['p99_ms'], '>10.2f')}{fmt(r['throughput_per_s'], '>10.1f')}{fmt(r['peak_rss_mb'], '>9.1f')}"
+        )
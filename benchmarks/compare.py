@@ -0,0 +1,58 @@
+"""Compare two benchmark result files and flag regressions.
+
+    python -m benchmarks.compare baseline.json candidate.json --threshold 0.10
+
+Exits with status 1 when any p50/p95 latency regressed by more than the threshold.
+"""
+import argparse
+import json
+import sys
+
+METRICS = ["p50_ms", "p95_ms", "p99_ms", "throughput_per_s", "peak_rss_mb"]
+# For these a higher value is better; for the rest lower is better
+HIGHER_IS_BETTER = {"throughput_per_s"}
+GATED = {"p50_ms", "p95_ms"}
+
+
+def compare(baseline, candidate, threshold):
+    rows = []
+    regressed = False
+    for name, new in candidate["results"].items():
+        old = baseline["results"].get(name)
+        if old is None:
+            continue
+        for metric in METRICS:
+            a, b = old.get(metric), new.get(metric)
+            if not a or b is None:
+                continue
+            change = (b - a) / a
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            flag = worse > threshold
+            if flag and metric in GATED:
+                regressed = True
+            rows.append((name, metric, a, b, change, flag))
+    return rows, regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare EcoDetect benchmark results")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change treated as a regression")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    print(f"baseline:  {baseline['meta'].get('commit')}  candidate: {candidate['meta'].get('commit')}")
+    rows, regressed = compare(baseline, candidate, args.threshold)
+    for name, metric, a, b, change, flag in rows:
+        marker = "  <-- regression" if flag else ""
+        print(f"{name:<28}{metric:<18}{a:>10.2f} -> {b:>10.2f}  ({change:+.1%}){marker}")
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
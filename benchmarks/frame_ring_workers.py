@@ -0,0 +1,38 @@
+"""Worker process targets for bench_frame_ring.
+
+Kept apart from the benchmark module: spawned children import their target's
+module, and benchmarks.common creates a scratch directory on import.
+"""
+import cv2
+import numpy as np
+
+import frame_ring
+
+
+def _draw(image, output, boxes):
+    """Stand-in for predict + draw: copy the frame and draw one box on it"""
+    np.copyto(output, image)
+    cv2.rectangle(output, (40, 40), (200, 160), (0, 200, 0), 2)
+    boxes[0] = (40, 40, 200, 160, 0.9, 0)
+    return 1
+
+
+def draw_handler(image, output, boxes, confidence):
+    return _draw(image, output, boxes)
+
+
+def ring_worker(requests):
+    frame_ring.serve(requests, draw_handler, max_age=0)
+
+
+def pickle_worker(requests, results):
+    """The same work, with frames and results pickled through queues"""
+    boxes = np.zeros((frame_ring.MAX_BOXES, frame_ring.BOX_FIELDS), np.float32)
+    while True:
+        request = requests.get()
+        if request is None:
+            break
+        seq, image, confidence = request
+        output = np.empty_like(image)
+        count = _draw(image, output, boxes)
+        results.put((seq, output, boxes[:count].copy()))
@@ -0,0 +1,155 @@
+"""Load test for the HTTP inference API (api.py).
+
+Against a running instance:
+
+    python -m benchmarks.load_api --url http://127.0.0.1:8502 --concurrency 16 --requests 400
+
+Or let the script start a local instance on a scratch database first:
+
+    python -m benchmarks.load_api --spawn --model weights/best.pt
+
+Each worker thread posts the bundled sample images as raw JPEG bodies in a
+loop; the report covers latency percentiles, throughput, status codes, and
+the server's average micro-batch size (from /health before and after).
+"""
+import argparse
+import json
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from pathlib import Path
+
+from benchmarks import common
+import settings
+
+SAMPLE_BODIES = [p.read_bytes() for p in common.SAMPLE_IMAGES if p.suffix.lower() in (".jpg", ".jpeg")]
+
+
+def _get_json(url, timeout=5):
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as resp:
+            return resp.status, json.loads(resp.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b"{}")
+
+
+def _post(url, body, timeout):
+    req = urllib.request.Request(url, data=body, method="POST", headers={"Content-Type": "image/jpeg"})
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            resp.read()
+            return resp.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (urllib.error.URLError, TimeoutError):
+        return "timeout"
+
+
+def wait_healthy(url, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            status, body = _get_json(f"{url}/health")
+            if status == 200:
+                return body
+        except (urllib.error.URLError, ConnectionError):
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"API at {url} did not become healthy within {timeout}s")
+
+
+def run(url, concurrency=16, requests=400, conf=0.4, timeout=60):
+    before = wait_healthy(url)
+    endpoint = f"{url}/detect?conf={conf}"
+    latencies, statuses = [], Counter()
+    lock = threading.Lock()
+    counter = iter(range(requests))
+
+    def worker():
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            t0 = time.perf_counter()
+            status = _post(endpoint, SAMPLE_BODIES[i % len(SAMPLE_BODIES)], timeout)
+            elapsed = time.perf_counter() - t0
+            with lock:
+                statuses[status] += 1
+                if status == 200:
+                    latencies.append(elapsed)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+
+    after = wait_healthy(url)
+    batches = after["batches"] - before["batches"]
+    images = after["images"] - before["images"]
+    result = common.summarize(latencies, wall)
+    result["concurrency"] = concurrency
+    result["statuses"] = {str(k): v for k, v in statuses.items()}
+    result["mean_batch_size"] = images / batches if batches else None
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the EcoDetect HTTP API")
+    parser.add_argument("--url", default=None, help="base URL of a running instance")
+    parser.add_argument("--spawn", action="store_true", help="start a local instance on a scratch DB")
+    parser.add_argument("--model", default=None, help="weights for --spawn (default: best.pt, or the stand-in model)")
+    parser.add_argument("--port", type=int, default=18502, help="port for --spawn")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=200, help="requests per concurrency level")
+    parser.add_argument("--conf", type=float, default=0.4)
+    parser.add_argument("--output", default=None, help="write JSON results to this path")
+    args = parser.parse_args(argv)
+
+    server = None
+    url = args.url
+    if args.spawn:
+        model = args.model
+        if model is None:
+            model = str(settings.DETECTION_MODEL)
+            if not Path(model).exists():
+                model = settings.STANDIN_MODEL
+        # The child inherits ECODETECT_DATABASE_URL pointing at the scratch DB
+        server = subprocess.Popen([sys.executable, "api.py", "--port", str(args.port), "--model", model])
+        url = f"http://127.0.0.1:{args.port}"
+    elif url is None:
+        parser.error("pass --url or --spawn")
+
+    results = {}
+    try:
+        for concurrency in args.concurrency:
+            r = run(url, concurrency, args.requests, args.conf)
+            results[f"api.c{concurrency}"] = r
+            if r["n"]:
+                print(f"concurrency {concurrency}: {r['throughput_per_s']:.1f} req/s, "
+                      f"p50 {r['p50_ms']:.0f} ms, p99 {r['p99_ms']:.0f} ms, "
+                      f"mean batch {r['mean_batch_size'] or 0:.1f}, statuses {r['statuses']}")
+            else:
+                print(f"concurrency {concurrency}: no successful requests, statuses {r['statuses']}")
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        shutil.rmtree(common.SCRATCH_DIR, ignore_errors=True)
+
+    common.print_table(results)
+    if args.output:
+        common.write_results({"meta": common.environment_info(), "results": results}, args.output)
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+"""Load test simulating many concurrent users of one Streamlit server.
+
+    python -m benchmarks.load_sessions --users 1 2 4 8 --duration 30
+
+Everything runs in this process against a scratch database, the way one
+Streamlit server hosts all its sessions: one shared model (via the
+registry), the global helper.detection_lock and one SQLite file. Each
+simulated user picks actions by weight (--mix):
+
+    upload   the Deteksi image path: hash, lookup, predict, postprocess,
+             plot, PNG encode, helper.save_detection. Bytes are made unique
+             per upload (--repeat-uploads keeps them identical, so the
+             ingest deduplication answers instead)
+    history  a full AppTest run of the Riwayat page
+    stream   a VideoProcessorWaste fed synthetic yuv420p frames at --fps
+             for --stream-seconds, as streamlit-webrtc would
+
+Each ramp level reports per-action latency percentiles and error rates,
+the achieved stream fps, process CPU (in cores) and RSS, plus the p95 of
+webcam.lock_wait and the save step, which point at lock and SQLite
+contention. The last line names the highest level that met --slo-ms, the
+fps target and the error budget.
+"""
+import argparse
+import io
+import os
+import random
+import shutil
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from benchmarks import common
+
+try:
+    import psutil
+except ImportError:  # optional: RSS falls back to /proc
+    psutil = None
+
+ACTIONS = ["upload", "history", "stream"]
+APP_PATH = str(Path(__file__).resolve().parent.parent / "app.py")
+
+
+class ProcessSampler:
+    """Samples CPU (cores in use) and RSS of this process in the background"""
+
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.cpu = []
+        self.rss_mb = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _rss_mb(self):
+        if psutil is not None:
+            return psutil.Process().memory_info().rss / (1024 * 1024)
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+        except OSError:
+            return None
+
+    def _run(self):
+        last_cpu, last_wall = time.process_time(), time.perf_counter()
+        while not self._stop.wait(self.interval):
+            cpu, wall = time.process_time(), time.perf_counter()
+            self.cpu.append((cpu - last_cpu) / (wall - last_wall))
+            last_cpu, last_wall = cpu, wall
+            rss = self._rss_mb()
+            if rss is not None:
+                self.rss_mb.append(rss)
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+    def summary(self):
+        return {
+            "cpu_cores_mean": sum(self.cpu) / len(self.cpu) if self.cpu else None,
+            "cpu_cores_max": max(self.cpu) if self.cpu else None,
+            "rss_mb_max": max(self.rss_mb) if self.rss_mb else None,
+        }
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.error_samples = {}
+        self.frames = 0
+        self.stream_seconds = 0.0
+
+    def ok(self, name, seconds):
+        with self.lock:
+            self.latencies[name].append(seconds)
+
+    def error(self, name, exc):
+        with self.lock:
+            self.errors[name] += 1
+            self.error_samples.setdefault(name, f"{type(exc).__name__}: {exc}")
+
+
+def _upload_bytes(path, unique, rng):
+    """JPEG bytes of a sample image; with unique=True one pixel is changed so the hash differs"""
+    import PIL.Image
+
+    image = PIL.Image.open(path).convert("RGB")
+    if unique:
+        image.putpixel((0, 0), (rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+    buf = io.BytesIO()
+    image.save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+
+def do_upload(model, confidence, data, name, recorder):
+    """Same steps as the Deteksi page after 'Deteksi Objek' is clicked"""
+    import PIL.Image
+
+    import helper
+    import ingest
+    import postprocess
+    from model_registry import registry
+
+    t0 = time.perf_counter()
+    digest = ingest.content_hash(data)
+    key = ingest.result_key(digest, model, confidence=confidence, tiles=None)
+    if ingest.lookup(key) is None:
+        with registry.lease(model):
+            res = model.predict(PIL.Image.open(io.BytesIO(data)), conf=confidence, verbose=False)
+        dets = postprocess.process(res[0], confidence)
+        buf = io.BytesIO()
+        PIL.Image.fromarray(postprocess.plot(res[0], dets)[:, :, ::-1]).save(buf, format="PNG")
+        t_save = time.perf_counter()
+        helper.save_detection("Image", name, buf.getvalue(), dets.to_dicts(), content_hash=digest, result_key=key)
+        recorder.ok("upload.save", time.perf_counter() - t_save)
+    recorder.ok("upload", time.perf_counter() - t0)
+
+
+def do_history(recorder):
+    from streamlit.testing.v1 import AppTest
+
+    t0 = time.perf_counter()
+    at = AppTest.from_file(APP_PATH, default_timeout=120)
+    at.session_state["page_selector"] = "📚 Riwayat"
+    at.run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    recorder.ok("history", time.perf_counter() - t0)
+
+
+def do_stream(processor, frames, fps, seconds, recorder):
+    """Feed frames at `fps`; a slow processor just falls behind, like a real stream"""
+    interval = 1.0 / fps
+    start = time.perf_counter()
+    sent = 0
+    while time.perf_counter() - start < seconds:
+        t0 = time.perf_counter()
+        processor.recv(frames[sent % len(frames)])
+        recorder.ok("stream.frame", time.perf_counter() - t0)
+        sent += 1
+        delay = start + sent * interval - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    elapsed = time.perf_counter() - start
+    recorder.ok("stream", elapsed)
+    with recorder.lock:
+        recorder.frames += sent
+        recorder.stream_seconds += elapsed
+
+
+def _user(index, model, args, frames, deadline, recorder):
+    import helper
+
+    rng = random.Random(index)
+    weights = [args.mix[a] for a in ACTIONS]
+    processor = helper.VideoProcessorWaste(args.confidence, model)
+    samples = [p for p in common.SAMPLE_IMAGES if p.suffix.lower() in (".jpg", ".jpeg")] or common.SAMPLE_IMAGES
+    while time.perf_counter() < deadline:
+        action = rng.choices(ACTIONS, weights)[0]
+        try:
+            if action == "upload":
+                path = rng.choice(samples)
+                do_upload(model, args.confidence, _upload_bytes(path, not args.repeat_uploads, rng),
+                          f"user{index}_{path.name}", recorder)
+            elif action == "history":
+                do_history(recorder)
+            else:
+                do_stream(processor, frames, args.fps, args.stream_seconds, recorder)
+        except Exception as e:
+            recorder.error(action, e)
+        # Think time between actions
+        time.sleep(rng.uniform(0, args.think_time))
+
+
+def run_level(users, model, args, frames):
+    import helper
+    import metrics
+
+    metrics.reset()
+    with helper.detection_lock:
+        helper.detection_history.clear()
+    recorder = Recorder()
+    deadline = time.perf_counter() + args.duration
+    threads = [
+        threading.Thread(target=_user, args=(i, model, args, frames, deadline, recorder), daemon=True)
+        for i in range(users)
+    ]
+    with ProcessSampler() as sampler:
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        wall = time.perf_counter() - started
+
+    result = {"users": users, "wall_s": wall, **sampler.summary()}
+    for name in ["upload", "upload.save", "history", "stream.frame"]:
+        result[name] = common.summarize(recorder.latencies.get(name, []), wall)
+    result["errors"] = {}
+    for action in ACTIONS:
+        errors = recorder.errors.get(action, 0)
+        attempts = len(recorder.latencies.get(action, [])) + errors
+        result["errors"][action] = {"count": errors, "rate": errors / attempts if attempts else 0.0}
+    # recv() swallows failures and returns the input frame; count those too
+    counters = metrics.snapshot()["counters"]
+    result["dropped_frames"] = counters.get("webcam.dropped", 0)
+    result["stream_fps"] = recorder.frames / recorder.stream_seconds if recorder.stream_seconds else None
+    result["error_samples"] = recorder.error_samples
+    stages = metrics.snapshot()["stages"]
+    result["lock_wait_p95_ms"] = stages.get("webcam.lock_wait", {}).get("p95_ms")
+    return result
+
+
+def _meets_target(level, args):
+    for name in ("upload", "history"):
+        r = level[name]
+        if r["n"] and r["p95_ms"] > args.slo_ms:
+            return False
+    if any(e["rate"] > args.max_error_rate for e in level["errors"].values()):
+        return False
+    fps = level["stream_fps"]
+    return fps is None or fps >= 0.9 * args.fps
+
+
+def _fmt(value, spec):
+    return format(value, spec) if value is not None else "-"
+
+
+def print_report(levels, args):
+    header = (f"{'users':>5}{'upload p50/p95 ms':>20}{'history p50/p95 ms':>21}{'frame p95 ms':>13}"
+              f"{'fps':>6}{'save p95':>9}{'lock p95':>9}{'errors':>7}{'cpu':>6}{'rss MB':>8}")
+    print(header)
+    print("-" * len(header))
+    for level in levels:
+        errors = sum(e["count"] for e in level["errors"].values()) + level["dropped_frames"]
+        print(
+            f"{level['users']:>5}"
+            f"{_fmt(level['upload']['p50_ms'], '.0f'):>11}/{_fmt(level['upload']['p95_ms'], '.0f'):<8}"
+            f"{_fmt(level['history']['p50_ms'], '.0f'):>12}/{_fmt(level['history']['p95_ms'], '.0f'):<8}"
+            f"{_fmt(level['stream.frame']['p95_ms'], '.0f'):>13}"
+            f"{_fmt(level['stream_fps'], '.1f'):>6}"
+            f"{_fmt(level['upload.save']['p95_ms'], '.0f'):>9}"
+            f"{_fmt(level['lock_wait_p95_ms'], '.1f'):>9}"
+            f"{errors:>7}"
+            f"{_fmt(level['cpu_cores_mean'], '.1f'):>6}"
+            f"{_fmt(level['rss_mb_max'], '.0f'):>8}"
+        )
+        for action, sample in level["error_samples"].items():
+            print(f"      {action} error: {sample}")
+    passing = [level["users"] for level in levels if _meets_target(level, args)]
+    if passing:
+        print(f"\nHighest level within targets (p95 <= {args.slo_ms:.0f} ms, fps >= {0.9 * args.fps:.1f}, "
+              f"errors <= {args.max_error_rate:.0%}): {max(passing)} users")
+    else:
+        print("\nNo level met the targets")
+
+
+def _parse_mix(value):
+    mix = dict.fromkeys(ACTIONS, 0.0)
+    for part in value.split(","):
+        name, weight = part.split("=")
+        if name not in mix:
+            raise argparse.ArgumentTypeError(f"unknown action {name!r}, expected {ACTIONS}")
+        mix[name] = float(weight)
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError("at least one action needs a positive weight")
+    return mix
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate concurrent EcoDetect sessions")
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 2, 4, 8], help="ramp levels")
+    parser.add_argument("--duration", type=float, default=30, help="seconds per level")
+    parser.add_argument("--mix", type=_parse_mix, default=_parse_mix("upload=0.4,history=0.2,stream=0.4"))
+    parser.add_argument("--fps", type=float, default=10, help="frame rate of simulated webcams")
+    parser.add_argument("--stream-seconds", type=float, default=5, help="length of one streaming action")
+    parser.add_argument("--think-time", type=float, default=1.0, help="max pause between a user's actions")
+    parser.add_argument("--repeat-uploads", action="store_true", help="upload identical bytes (exercises deduplication)")
+    parser.add_argument("--model", default=None, help="weights (default: best.pt, or the stand-in model)")
+    parser.add_argument("--confidence", type=float, default=0.4)
+    parser.add_argument("--slo-ms", type=float, default=2000, help="p95 target for uploads and history views")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--output", default=None, help="write JSON results to this path")
+    args = parser.parse_args(argv)
+
+    import metrics
+    from benchmarks.bench_webcam import synthetic_frames
+
+    metrics.set_enabled(True)
+    levels = []
+    try:
+        model, model_path = common.load_benchmark_model(args.model)
+        frames = synthetic_frames(30)
+        # Warm up the model and the app script once before measuring
+        do_upload(model, args.confidence, _upload_bytes(common.SAMPLE_IMAGES[0], True, random.Random()), "warmup", Recorder())
+        do_history(Recorder())
+        for users in args.users:
+            print(f"Running {users} users for {args.duration:.0f}s...")
+            levels.append(run_level(users, model, args, frames))
+    finally:
+        shutil.rmtree(common.SCRATCH_DIR, ignore_errors=True)
+
+    print_report(levels, args)
+    if args.output:
+        meta = common.environment_info()
+        meta["model"] = model_path
+        meta["args"] = {k: v for k, v in vars(args).items() if k != "output"}
+        common.write_results({"meta": meta, "levels": levels}, args.output)
+    return levels
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Run the EcoDetect benchmarks and emit machine-readable results.
+
+Usage (from the repository root):
+
+    python -m benchmarks.run
+    python -m benchmarks.run --suites image webcam --output bench_results.json
+"""
+import argparse
+import shutil
+
+from benchmarks import common
+
+SUITES = ["image", "webcam", "db", "history", "analytics", "assets", "tiling", "postprocess", "ingest", "cascade", "frame_ring"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="EcoDetect benchmarks")
+    parser.add_argument("--suites", nargs="+", choices=SUITES, default=SUITES)
+    parser.add_argument("--model", default=None, help="weights to load (default: best.pt, or the stand-in model if missing)")
+    parser.add_argument("--iterations", type=int, default=30, help="predict calls per model benchmark")
+    parser.add_argument("--db-rows", type=int, default=200, help="rows inserted by the DB benchmark")
+    parser.add_argument("--confidence", type=float, default=0.4)
+    parser.add_argument("--ingest-log", default=None, help="upload log (one image path per line) replayed by the ingest suite")
+    parser.add_argument("--output", default=None, help="write JSON results to this path")
+    args = parser.parse_args(argv)
+
+    meta = common.environment_info()
+    results = {}
+    try:
+        if {"image", "webcam", "tiling", "ingest"} & set(args.suites):
+            model, model_path = common.load_benchmark_model(args.model)
+            meta["model"] = model_path
+            if "image" in args.suites:
+                from benchmarks import bench_image
+                results.update(bench_image.run(model, args.iterations, args.confidence))
+            if "webcam" in args.suites:
+                from benchmarks import bench_webcam
+                results.update(bench_webcam.run(model, args.iterations * 2, args.confidence))
+            if "tiling" in args.suites:
+                from benchmarks import bench_tiling
+                results.update(bench_tiling.run(model, args.confidence))
+            if "ingest" in args.suites:
+                from benchmarks import bench_ingest
+                results.update(bench_ingest.run(model, args.confidence, args.ingest_log))
+        if "db" in args.suites:
+            from benchmarks import bench_db
+            results.update(bench_db.run(args.db_rows))
+        if "history" in args.suites:
+            from benchmarks import bench_live_history
+            results.update(bench_live_history.run())
+        if "analytics" in args.suites:
+            from benchmarks import bench_analytics
+            results.update(bench_analytics.run())
+        if "assets" in args.suites:
+            from benchmarks import bench_assets
+            results.update(bench_assets.run())
+        if "cascade" in args.suites:
+            from benchmarks import bench_cascade
+            results.update(bench_cascade.run(args.iterations * 2, args.confidence))
+        if "frame_ring" in args.suites:
+            from benchmarks import bench_frame_ring
+            results.update(bench_frame_ring.run(args.iterations * 4, args.confidence))
+        if "postprocess" in args.suites:
+            from benchmarks import bench_postprocess
+            results.update(bench_postprocess.run())
+    finally:
+        shutil.rmtree(common.SCRATCH_DIR, ignore_errors=True)
+
+    common.print_table(results)
+    if args.output:
+        common.write_results({"meta": meta, "results": results}, args.output)
+        print(f"\nResults written to {args.output}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Cascade mode: a cheap model on every frame, the full model only when needed.
+
+The fast model (settings.CASCADE_FAST_MODEL, e.g. a nano model trained on
+the same classes) handles each frame first. The frame is escalated to the
+full model (the registry's active model, normally best.pt) when
+
+- uncertain: a fast-model box falls in [low, high) confidence;
+- new_class: a confident fast-model class wasn't seen in this stream's
+  last CASCADE_NEW_CLASS_WINDOW frames;
+- audit: every CASCADE_AUDIT_EVERY-th frame, regardless.
+
+Escalated frames return the full model's result; the others the fast
+model's. Callers report each frame's end-to-end latency with record();
+escalation counts and per-path latency are kept process-wide (stats())
+whether or not metrics.py is enabled.
+
+One Cascade holds one stream's state (VideoProcessorWaste keeps its own);
+the image page shares for_images().
+"""
+import threading
+from collections import deque
+from pathlib import Path
+
+import class_config
+import metrics
+import settings
+from model_registry import registry
+
+FAST = "fast"
+UNCERTAIN = "uncertain"
+NEW_CLASS = "new_class"
+AUDIT = "audit"
+REASONS = [UNCERTAIN, NEW_CLASS, AUDIT]
+
+_stats_lock = threading.Lock()
+_frames = 0
+_escalations = dict.fromkeys(REASONS, 0)
+_latency = {FAST: metrics.StageHistogram(), "escalated": metrics.StageHistogram()}
+_image_cascade = None
+
+
+class CascadeConfig:
+    def __init__(self, fast_model=settings.CASCADE_FAST_MODEL, low=settings.CASCADE_UNCERTAIN_LOW,
+                 high=settings.CASCADE_UNCERTAIN_HIGH, audit_every=settings.CASCADE_AUDIT_EVERY,
+                 new_class_window=settings.CASCADE_NEW_CLASS_WINDOW):
+        if not 0.0 <= low <= high <= 1.0:
+            raise ValueError("Uncertain band must satisfy 0 <= low <= high <= 1")
+        self.fast_model = str(fast_model)
+        self.low = low
+        self.high = high
+        self.audit_every = audit_every
+        self.new_class_window = new_class_window
+
+    def key(self):
+        """Settings that change results, e.g. for ingest.result_key"""
+        return [self.fast_model, self.low, self.high, self.audit_every, self.new_class_window]
+
+
+def fast_model_available(config):
+    # A trained weights file on disk: an architecture file (*.yaml) would build a model
+    # with random weights, and a missing name makes YOLO() try to download a release asset.
+    # (benchmarks/bench_cascade.py uses a *.yaml stand-in directly, bypassing this check.)
+    path = Path(config.fast_model)
+    return path.suffix != ".yaml" and path.is_file()
+
+
+class Cascade:
+    def __init__(self, config=None):
+        self.config = config or CascadeConfig()
+        self.frames = 0
+        self.recent = deque(maxlen=max(self.config.new_class_window, 1))
+        self.lock = threading.Lock()
+
+    def _reason(self, result):
+        """Why this fast-model result needs the full model, or None"""
+        config = self.config
+        boxes = result.boxes
+        conf = boxes.conf.cpu().numpy() if boxes is not None else ()
+        cls = boxes.cls.cpu().numpy().astype(int) if boxes is not None else ()
+        confident = {result.names[c] for c, p in zip(cls, conf) if p >= config.high}
+        with self.lock:
+            self.frames += 1
+            frame = self.frames
+            seen = set().union(*self.recent) if self.recent else set()
+            if config.new_class_window:
+                self.recent.append(confident)
+        if any(config.low <= p < config.high for p in conf):
+            return UNCERTAIN
+        if config.new_class_window and confident - seen:
+            return NEW_CLASS
+        if config.audit_every and frame % config.audit_every == 0:
+            return AUDIT
+        return None
+
+    def predict(self, image, conf, full_model, **kwargs):
+        """(Results, escalation reason or None); the caller holds a lease on full_model"""
+        class_cfg = class_config.current()
+        fast = registry.load(self.config.fast_model)
+        with registry.lease(fast), metrics.stage("cascade.fast_predict"):
+            # Down to the band's lower edge, so uncertain boxes are visible
+            result = fast.predict(image, conf=min(conf, self.config.low), verbose=False,
+                                  **class_cfg.predict_kwargs(fast.names), **kwargs)[0]
+        reason = self._reason(result)
+        if reason is not None:
+            with metrics.stage("cascade.full_predict"):
+                result = full_model.predict(image, conf=conf, verbose=False,
+                                            **class_cfg.predict_kwargs(full_model.names), **kwargs)[0]
+        return result, reason
+
+
+def record(reason, seconds):
+    """Count one frame and its end-to-end latency on the fast or escalated path"""
+    global _frames
+    path = FAST if reason is None else "escalated"
+    _latency[path].observe(seconds)
+    metrics.observe(f"cascade.{path}_path", seconds)
+    metrics.incr("cascade.frames")
+    with _stats_lock:
+        _frames += 1
+        if reason is not None:
+            _escalations[reason] += 1
+    if reason is not None:
+        metrics.incr(f"cascade.escalated.{reason}")
+
+
+def stats():
+    """Frames seen, fraction escalated (total and per reason) and per-path latency"""
+    def ms(v):
+        return v * 1000.0 if v is not None else None
+
+    with _stats_lock:
+        frames = _frames
+        escalations = dict(_escalations)
+    escalated = sum(escalations.values())
+    return {
+        "frames": frames,
+        "escalated": escalated,
+        "escalated_fraction": escalated / frames if frames else None,
+        "reasons": {r: n / frames if frames else None for r, n in escalations.items()},
+        "latency": {
+            path: {"count": h.count, "mean_ms": ms(h.mean()), "p50_ms": ms(h.percentile(50)),
+                   "p95_ms": ms(h.percentile(95))}
+            for path, h in _latency.items()
+        },
+    }
+
+
+def reset_stats():
+    global _frames, _escalations, _latency
+    with _stats_lock:
+        _frames = 0
+        _escalations = dict.fromkeys(REASONS, 0)
+        _latency = {FAST: metrics.StageHistogram(), "escalated": metrics.StageHistogram()}
+
+
+def for_images(config):
+    """The image page's shared Cascade, restarted when its settings change"""
+    global _image_cascade
+    with _stats_lock:
+        if _image_cascade is None or _image_cascade.config.key() != config.key():
+            _image_cascade = Cascade(config)
+        return _image_cascade
@@ -0,0 +1,158 @@
+"""Per-class configuration: waste category, minimum confidence and display color.
+
+The configuration lives in classes.json (settings.CLASS_CONFIG_PATH):
+
+    {
+      "categories": {"Organik": {"color": "#4CAF50"}, ...},
+      "default": {"category": "Lainnya", "min_confidence": 0.0, "enabled": true},
+      "classes": {"glass": {"category": "Anorganik", "min_confidence": 0.5, "color": "#00BCD4"}, ...}
+    }
+
+Class names are matched case-insensitively. Classes missing from the file
+fall back to settings.WASTE_CATEGORIES and the "default" entry. Disabled
+classes are excluded in the predict call itself; per-class minimum
+confidences are applied by postprocess.py before anything is rendered or
+stored.
+
+current() picks up edits to the file without a restart (its mtime is checked
+at most every CLASS_CONFIG_CHECK_INTERVAL seconds). An invalid file is
+reported in last_error and the previous configuration stays in effect.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+import settings
+
+CATEGORIES = [settings.ORGANIC, settings.INORGANIC, settings.OTHER]
+DEFAULT_CATEGORY_COLORS = {settings.ORGANIC: "#4CAF50", settings.INORGANIC: "#2196F3", settings.OTHER: "#9E9E9E"}
+
+last_error = None
+_current = None
+_mtime = None
+_checked_at = 0.0
+_version = 0
+_lock = threading.Lock()
+
+
+def hex_to_bgr(value):
+    value = value.lstrip("#")
+    if len(value) != 6:
+        raise ValueError(f"Invalid color: #{value}")
+    r, g, b = (int(value[i:i + 2], 16) for i in (0, 2, 4))
+    return (b, g, r)
+
+
+class ClassConfig:
+    def __init__(self, data, version=0, source=None):
+        self.version = version
+        self.source = source
+        # Content digest; unlike version it is the same across processes and restarts
+        self.digest = hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()[:16]
+        self.category_colors = dict(DEFAULT_CATEGORY_COLORS)
+        for category, options in data.get("categories", {}).items():
+            self._check_category(category)
+            if "color" in options:
+                hex_to_bgr(options["color"])
+                self.category_colors[category] = options["color"]
+
+        default = data.get("default", {})
+        self.default = {
+            "category": default.get("category"),
+            "min_confidence": float(default.get("min_confidence", 0.0)),
+            "enabled": bool(default.get("enabled", True)),
+            "color": default.get("color"),
+        }
+        self.classes = {}
+        for name, options in data.get("classes", {}).items():
+            entry = {key: options[key] for key in ("category", "min_confidence", "enabled", "color") if key in options}
+            if "category" in entry:
+                self._check_category(entry["category"])
+            if "min_confidence" in entry:
+                entry["min_confidence"] = float(entry["min_confidence"])
+                if not 0.0 <= entry["min_confidence"] <= 1.0:
+                    raise ValueError(f"min_confidence of {name} must be between 0 and 1")
+            if entry.get("color"):
+                hex_to_bgr(entry["color"])
+            self.classes[name.lower()] = entry
+
+    @staticmethod
+    def _check_category(category):
+        if category not in CATEGORIES:
+            raise ValueError(f"Unknown category {category!r}, expected one of {CATEGORIES}")
+
+    def entry(self, name):
+        """Effective settings of one class"""
+        lowered = name.lower()
+        entry = self.classes.get(lowered, {})
+        category = (entry.get("category") or settings.WASTE_CATEGORIES.get(lowered)
+                    or self.default["category"] or settings.OTHER)
+        return {
+            "category": category,
+            "min_confidence": entry.get("min_confidence", self.default["min_confidence"]),
+            "enabled": entry.get("enabled", self.default["enabled"]),
+            "color": entry.get("color") or self.default["color"],
+        }
+
+    def category(self, name):
+        return self.entry(name)["category"]
+
+    def category_color(self, category):
+        return self.category_colors.get(category, DEFAULT_CATEGORY_COLORS[settings.OTHER])
+
+    def class_ids(self, names):
+        """Enabled class ids of a model, for predict(classes=...); None when all are enabled"""
+        enabled = [i for i, name in names.items() if self.entry(name)["enabled"]]
+        return None if len(enabled) == len(names) else enabled
+
+    def predict_kwargs(self, names):
+        ids = self.class_ids(names)
+        return {} if ids is None else {"classes": ids}
+
+
+def load(path=settings.CLASS_CONFIG_PATH, version=0):
+    with open(path, encoding="utf-8") as f:
+        return ClassConfig(json.load(f), version, str(path))
+
+
+def reload(path=settings.CLASS_CONFIG_PATH):
+    """Re-read the file now; on error the previous configuration stays active"""
+    global _current, _mtime, _checked_at, _version, last_error
+    with _lock:
+        _checked_at = time.monotonic()
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        try:
+            config = load(path, _version + 1) if mtime is not None else ClassConfig({}, _version + 1)
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            last_error = f"{path}: {e}"
+            print(f"Error loading class configuration: {last_error}")
+            _mtime = mtime
+            if _current is None:
+                _current = ClassConfig({}, _version + 1)
+                _version += 1
+            return _current
+        _version += 1
+        _current, _mtime, last_error = config, mtime, None
+        return config
+
+
+def current(path=settings.CLASS_CONFIG_PATH):
+    """The active configuration, reloaded if the file changed"""
+    global _checked_at
+    config = _current
+    if config is None:
+        return reload(path)
+    if time.monotonic() - _checked_at >= settings.CLASS_CONFIG_CHECK_INTERVAL:
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime != _mtime:
+            return reload(path)
+        _checked_at = time.monotonic()
+    return config
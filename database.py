@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, BLOB, DateTime, create_engine
+from sqlalchemy import Column, Integer, String, BLOB, Boolean, DateTime, Float, Text, UniqueConstraint, create_engine, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
@@ -15,6 +15,75 @@ class DetectionHistory(Base):
     source_type = Column(String, index=True)
     source_path = Column(String)
     detected_image = Column(BLOB)
-    timestamp = Column(DateTime, default=datetime.now)  # Added timestamp field
+    timestamp = Column(DateTime, default=datetime.now, index=True)  # Added timestamp field
+    detections = Column(Text)  # JSON list of {"name", "confidence"} per detected object
+    is_thumbnail = Column(Boolean, default=False)  # image downscaled by the retention policy
+    # Deduplicated ingestion (see ingest.py); NULL for rows saved before it existed
+    content_hash = Column(String, index=True)  # SHA-256 of the uploaded bytes
+    result_key = Column(String, unique=True, index=True)  # content hash + model + detection settings
+    idempotency_key = Column(String, unique=True, index=True)
+    reuse_count = Column(Integer, nullable=False, default=0)  # repeats served from this row
 
-Base.metadata.create_all(bind=engine)
\ No newline at end of file
+class DetectionRollup(Base):
+    """Per-class aggregates at hour and day grain, maintained on insert by helper.save_detection"""
+    __tablename__ = "detection_rollup"
+    __table_args__ = (UniqueConstraint("grain", "bucket", "source_type", "class_name"),)
+
+    id = Column(Integer, primary_key=True)
+    grain = Column(String, nullable=False)  # "hour" or "day"
+    bucket = Column(DateTime, nullable=False)  # start of the hour/day
+    source_type = Column(String, nullable=False)
+    class_name = Column(String, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+    confidence_sum = Column(Float, nullable=False, default=0.0)
+    # Confidence histogram: conf_0 counts 0.0-0.1, ..., conf_9 counts 0.9-1.0
+    conf_0 = Column(Integer, nullable=False, default=0)
+    conf_1 = Column(Integer, nullable=False, default=0)
+    conf_2 = Column(Integer, nullable=False, default=0)
+    conf_3 = Column(Integer, nullable=False, default=0)
+    conf_4 = Column(Integer, nullable=False, default=0)
+    conf_5 = Column(Integer, nullable=False, default=0)
+    conf_6 = Column(Integer, nullable=False, default=0)
+    conf_7 = Column(Integer, nullable=False, default=0)
+    conf_8 = Column(Integer, nullable=False, default=0)
+    conf_9 = Column(Integer, nullable=False, default=0)
+
+CONFIDENCE_BUCKETS = [f"conf_{i}" for i in range(10)]
+
+def _migrate():
+    """Add columns/indexes introduced after the first release (create_all doesn't alter tables)"""
+    with engine.begin() as conn:
+        columns = {c["name"] for c in inspect(conn).get_columns("detection_history")}
+        if "detections" not in columns:
+            conn.execute(text("ALTER TABLE detection_history ADD COLUMN detections TEXT"))
+        if "is_thumbnail" not in columns:
+            conn.execute(text("ALTER TABLE detection_history ADD COLUMN is_thumbnail BOOLEAN DEFAULT 0"))
+        for column, ddl in (
+            ("content_hash", "VARCHAR"),
+            ("result_key", "VARCHAR"),
+            ("idempotency_key", "VARCHAR"),
+            ("reuse_count", "INTEGER NOT NULL DEFAULT 0"),
+        ):
+            if column not in columns:
+                conn.execute(text(f"ALTER TABLE detection_history ADD COLUMN {column} {ddl}"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_detection_history_timestamp ON detection_history (timestamp)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_detection_history_content_hash ON detection_history (content_hash)"))
+        # ALTER TABLE can't add UNIQUE columns; same index names as create_all uses
+        conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ix_detection_history_result_key ON detection_history (result_key)"))
+        conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ix_detection_history_idempotency_key ON detection_history (idempotency_key)"))
+        # Rows thumbnailed before retention started clearing their result key
+        conn.execute(text("UPDATE detection_history SET result_key = NULL WHERE result_key IS NOT NULL AND is_thumbnail = 1"))
+
+def _init_auto_vacuum():
+    """New SQLite files start with incremental auto-vacuum (retention.compact relies on it);
+    it can only be set this cheaply before the first table exists"""
+    if engine.url.get_backend_name() != "sqlite":
+        return
+    with engine.connect() as conn:
+        if not inspect(conn).get_table_names():
+            conn.execute(text("PRAGMA auto_vacuum = INCREMENTAL"))
+            conn.commit()
+
+_init_auto_vacuum()
+Base.metadata.create_all(bind=engine)
+_migrate()
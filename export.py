@@ -0,0 +1,198 @@
+"""Streaming export of detection history to CSV, Parquet and ZIP.
+
+Rows are read in keyset-paginated chunks (WHERE id > last_id LIMIT n), so
+memory stays constant regardless of table size and no read transaction is
+held open across the export (in SQLite's rollback-journal mode a long-lived
+reader would block the app's writers).
+
+Command line:
+
+    python export.py --format csv --output history.csv
+    python export.py --format parquet --start 2025-01-01 --end 2025-02-01 --output jan.parquet
+    python export.py --format zip --output history.zip
+"""
+import argparse
+import csv
+import importlib.util
+import json
+import re
+import sys
+import tempfile
+import zipfile
+from datetime import datetime
+
+from sqlalchemy import func, select
+
+import settings
+from database import DetectionHistory, SessionLocal
+
+FORMATS = ["csv", "parquet", "zip"]
+METADATA_COLUMNS = [
+    "id", "source_type", "source_path", "timestamp", "is_thumbnail",
+    "object_count", "classes", "detections", "image_bytes",
+]
+
+
+def iter_rows(start=None, end=None, include_images=False, chunk_size=settings.EXPORT_CHUNK_SIZE):
+    """Yield chunks (lists) of history rows as dicts, oldest id first"""
+    columns = [
+        DetectionHistory.id,
+        DetectionHistory.source_type,
+        DetectionHistory.source_path,
+        DetectionHistory.timestamp,
+        DetectionHistory.is_thumbnail,
+        DetectionHistory.detections,
+        func.length(DetectionHistory.detected_image).label("image_bytes"),
+    ]
+    if include_images:
+        columns.append(DetectionHistory.detected_image)
+    last_id = 0
+    while True:
+        stmt = select(*columns).where(DetectionHistory.id > last_id)
+        if start is not None:
+            stmt = stmt.where(DetectionHistory.timestamp >= start)
+        if end is not None:
+            stmt = stmt.where(DetectionHistory.timestamp < end)
+        stmt = stmt.order_by(DetectionHistory.id).limit(chunk_size)
+        db = SessionLocal()
+        try:
+            chunk = [dict(row._mapping) for row in db.execute(stmt)]
+        finally:
+            db.close()
+        if not chunk:
+            return
+        last_id = chunk[-1]["id"]
+        yield chunk
+
+
+def _metadata(row):
+    detections = json.loads(row["detections"]) if row["detections"] else []
+    return {
+        "id": row["id"],
+        "source_type": row["source_type"],
+        "source_path": row["source_path"],
+        "timestamp": row["timestamp"],
+        "is_thumbnail": bool(row["is_thumbnail"]),
+        "object_count": len(detections),
+        "classes": ",".join(sorted({d["name"] for d in detections})),
+        "detections": row["detections"] or "[]",
+        "image_bytes": row["image_bytes"] or 0,
+    }
+
+
+def write_csv(fileobj, start=None, end=None):
+    """Write metadata as CSV to a text file object; returns the row count"""
+    writer = csv.DictWriter(fileobj, fieldnames=METADATA_COLUMNS)
+    writer.writeheader()
+    count = 0
+    for chunk in iter_rows(start, end):
+        writer.writerows(_metadata(row) for row in chunk)
+        count += len(chunk)
+    return count
+
+
+def available_formats():
+    """FORMATS whose writer can run here (Parquet needs pyarrow)"""
+    if importlib.util.find_spec("pyarrow") is None:
+        return [f for f in FORMATS if f != "parquet"]
+    return list(FORMATS)
+
+
+def write_parquet(sink, start=None, end=None):
+    """Write metadata as Parquet (one row group per chunk); returns the row count"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+
+    schema = pa.schema([
+        ("id", pa.int64()),
+        ("source_type", pa.string()),
+        ("source_path", pa.string()),
+        ("timestamp", pa.timestamp("us")),
+        ("is_thumbnail", pa.bool_()),
+        ("object_count", pa.int32()),
+        ("classes", pa.string()),
+        ("detections", pa.string()),
+        ("image_bytes", pa.int64()),
+    ])
+    count = 0
+    with pq.ParquetWriter(sink, schema) as writer:
+        for chunk in iter_rows(start, end):
+            rows = [_metadata(row) for row in chunk]
+            writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+            count += len(rows)
+    return count
+
+
+def _image_name(row):
+    data = row["detected_image"] or b""
+    ext = "jpg" if data[:2] == b"\xff\xd8" else "png"
+    stem = re.sub(r"[^A-Za-z0-9._-]", "_", (row["source_path"] or "image").rsplit(".", 1)[0])[:60]
+    return f"images/{row['id']:08d}_{stem}.{ext}"
+
+
+def write_zip(fileobj, start=None, end=None, chunk_size=settings.EXPORT_IMAGE_CHUNK_SIZE):
+    """Write images plus metadata.csv to a ZIP; works on unseekable streams"""
+    count = 0
+    # The metadata index spills to disk past 1 MB, keeping memory bounded
+    metadata = tempfile.SpooledTemporaryFile(max_size=1024 * 1024, mode="w+", newline="", encoding="utf-8")
+    writer = csv.DictWriter(metadata, fieldnames=METADATA_COLUMNS + ["file"])
+    writer.writeheader()
+    # Images are already compressed (PNG/JPEG), so store them as-is
+    with zipfile.ZipFile(fileobj, "w", compression=zipfile.ZIP_STORED) as archive:
+        for chunk in iter_rows(start, end, include_images=True, chunk_size=chunk_size):
+            for row in chunk:
+                name = _image_name(row)
+                if row["detected_image"]:
+                    archive.writestr(name, row["detected_image"])
+                writer.writerow({**_metadata(row), "file": name})
+            count += len(chunk)
+        metadata.seek(0)
+        info = zipfile.ZipInfo("metadata.csv", date_time=datetime.now().timetuple()[:6])
+        info.compress_type = zipfile.ZIP_DEFLATED
+        with archive.open(info, "w") as entry:
+            for block in iter(lambda: metadata.read(64 * 1024), ""):
+                entry.write(block.encode("utf-8"))
+    metadata.close()
+    return count
+
+
+def export(fmt, output, start=None, end=None):
+    """Export to a path, or to stdout when output is '-'"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if fmt == "csv":
+        if output == "-":
+            return write_csv(sys.stdout, start, end)
+        with open(output, "w", newline="", encoding="utf-8") as f:
+            return write_csv(f, start, end)
+    if output == "-":
+        output = sys.stdout.buffer
+    if fmt == "parquet":
+        return write_parquet(output, start, end)
+    if isinstance(output, str):
+        with open(output, "wb") as f:
+            return write_zip(f, start, end)
+    return write_zip(output, start, end)
+
+
+def _parse_date(value):
+    return datetime.fromisoformat(value) if value else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export EcoDetect detection history")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--start", help="inclusive, ISO date/time (e.g. 2025-01-01)")
+    parser.add_argument("--end", help="exclusive, ISO date/time")
+    parser.add_argument("--output", default="-", help="file path, or - for stdout")
+    args = parser.parse_args(argv)
+
+    count = export(args.format, args.output, _parse_date(args.start), _parse_date(args.end))
+    print(f"Exported {count} rows", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Reusable per-stream buffers for the webcam frame path.
+
+WebRTC delivers yuv420p frames. The default path, to_ndarray(format="bgr24"),
+runs swscale into a fresh VideoFrame and then copies that into a fresh
+ndarray. Results.plot() copies the frame again, and from_ndarray() allocates
+and fills another frame. Here instead:
+
+- the Y/U/V planes are copied into one preallocated I420 buffer, and
+  cv2.cvtColor writes BGR into a preallocated array (one conversion, no
+  allocation). That array is passed to the model as is;
+- annotations are drawn straight into the pixels of the outgoing bgr24
+  VideoFrame, or into a reused buffer when its rows are padded.
+
+The outgoing frame itself is still new for every frame: it is handed to the
+encoder on another thread, so reusing it could tear a frame still being
+encoded.
+
+The buffers are only valid until the next call; one FramePipeline serves one
+stream (VideoProcessorWaste keeps its own).
+"""
+import av
+import cv2
+import numpy as np
+
+
+def _copy_plane(plane, dst, width, height):
+    """Copy a (possibly row-padded) av plane into a contiguous (height, width) array"""
+    rows = np.frombuffer(plane, np.uint8).reshape(height, plane.line_size)
+    np.copyto(dst, rows[:, :width])
+
+
+class FramePipeline:
+    def __init__(self):
+        self.shape = None
+        self.yuv = None
+        self.bgr = None
+        self.canvas = None
+        self.reallocations = 0
+
+    def _ensure(self, width, height):
+        if self.shape == (height, width):
+            return
+        self.yuv = np.empty((height * 3 // 2, width), np.uint8)
+        self.bgr = np.empty((height, width, 3), np.uint8)
+        self.canvas = np.empty((height, width, 3), np.uint8)
+        self.shape = (height, width)
+        self.reallocations += 1
+
+    def to_bgr(self, frame, out=None):
+        """The frame as BGR in the reused buffer, or in `out` (e.g. a frame_ring slot)"""
+        width, height = frame.width, frame.height
+        self._ensure(width, height)
+        bgr = self.bgr if out is None else out
+        if frame.format.name == "yuv420p" and width % 2 == 0 and height % 2 == 0:
+            y, u, v = frame.planes
+            yuv = self.yuv
+            # I420 layout: full Y plane, then the quarter-size U and V planes back to back
+            _copy_plane(y, yuv[:height], width, height)
+            _copy_plane(u, yuv[height:height + height // 4].reshape(height // 2, width // 2), width // 2, height // 2)
+            _copy_plane(v, yuv[height + height // 4:].reshape(height // 2, width // 2), width // 2, height // 2)
+            cv2.cvtColor(yuv, cv2.COLOR_YUV2BGR_I420, dst=bgr)
+        else:
+            # Other formats (rare from browsers) take PyAV's conversion
+            np.copyto(bgr, frame.to_ndarray(format="bgr24"))
+        return bgr
+
+    def output_frame(self, image, draw, like=None):
+        """New bgr24 VideoFrame holding `image` with draw(canvas) applied on top"""
+        height, width = image.shape[:2]
+        out = av.VideoFrame(width, height, "bgr24")
+        plane = out.planes[0]
+        rows = np.frombuffer(plane, np.uint8).reshape(height, plane.line_size)
+        if plane.line_size == width * 3:
+            # Unpadded rows: draw directly into the frame's memory
+            canvas = rows.reshape(height, width, 3)
+            np.copyto(canvas, image)
+            draw(canvas)
+        else:
+            canvas = self.canvas
+            np.copyto(canvas, image)
+            draw(canvas)
+            np.copyto(rows[:, :width * 3], canvas.reshape(height, width * 3))
+        if like is not None:
+            out.pts = like.pts
+            if like.time_base is not None:
+                out.time_base = like.time_base
+        return out
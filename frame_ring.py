@@ -0,0 +1,321 @@
+"""Shared-memory frame handoff between webcam streams and inference worker processes.
+
+With settings.WEBCAM_INFERENCE_WORKERS > 0, webcam frames are predicted in
+separate processes (InferenceWorkers), so several streams aren't serialised
+on one interpreter. Frames never go through pickle:
+
+- each stream owns a FrameRing: one SharedMemory block with SLOTS input
+  frames, SLOTS annotated output frames, per-slot boxes and a small header
+  (sequence number, state, box count, capture time);
+- the stream converts the incoming frame straight into a free input slot
+  and puts a descriptor (ring name, layout, slot, seq, ...) on the workers'
+  queue; that tuple is all that's pickled;
+- a worker maps the ring, predicts on the input slot in place, draws the
+  kept boxes into the output slot, writes the boxes and flips the slot's
+  state to DONE (or SKIPPED/FAILED). The stream polls the states, so there
+  is no result queue.
+
+Live video semantics: a stream never waits for inference. recv() shows the
+newest completed output (older completed ones are dropped), and when every
+slot is still in flight the new frame is dropped (an overrun) rather than
+queued. Workers skip descriptors older than FRAME_RING_MAX_AGE, so a backlog
+after a stall drains quickly instead of being worked through. A slot still
+QUEUED after FRAME_RING_RECLAIM_AFTER lost its descriptor (a worker died or
+the pool was replaced); acquire() takes it back, and a worker finishing it
+late doesn't mark it done since the slot's seq has moved on.
+
+Slots only change owner through the state field: the stream writes a slot
+while it's FREE, the worker while it's QUEUED, so no lock is needed.
+"""
+import multiprocessing
+import time
+import weakref
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import settings
+
+FREE, QUEUED, DONE, SKIPPED, FAILED = range(5)
+# Header columns
+SEQ, STATE, COUNT = range(3)
+# Box columns: x1, y1, x2, y2, confidence, class id
+BOX_FIELDS = 6
+MAX_BOXES = settings.POSTPROCESS_TOP_K or 300
+
+
+def _layout(width, height, slots):
+    """Byte offsets of the ring's arrays, and the total size"""
+    offsets = {}
+    size = 0
+    for name, nbytes in (
+        ("header", slots * 3 * 8),
+        ("captured", slots * 8),
+        ("boxes", slots * MAX_BOXES * BOX_FIELDS * 4),
+        ("inputs", slots * height * width * 3),
+        ("outputs", slots * height * width * 3),
+    ):
+        offsets[name] = size
+        size += -(-nbytes // 64) * 64  # keep every array cache-line aligned
+    return offsets, size
+
+
+class _RingViews:
+    """NumPy views over a ring's shared memory (either side)"""
+
+    def __init__(self, shm, width, height, slots):
+        offsets, _ = _layout(width, height, slots)
+        buf = shm.buf
+        self.header = np.ndarray((slots, 3), np.int64, buf, offsets["header"])
+        self.captured = np.ndarray((slots,), np.float64, buf, offsets["captured"])
+        self.boxes = np.ndarray((slots, MAX_BOXES, BOX_FIELDS), np.float32, buf, offsets["boxes"])
+        self.inputs = np.ndarray((slots, height, width, 3), np.uint8, buf, offsets["inputs"])
+        self.outputs = np.ndarray((slots, height, width, 3), np.uint8, buf, offsets["outputs"])
+
+    def release(self):
+        # SharedMemory.close() fails while views still export its buffer
+        self.header = self.captured = self.boxes = self.inputs = self.outputs = None
+
+
+def _close(shm, views, unlink):
+    views.release()
+    shm.close()
+    if unlink:
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class FrameRing:
+    """One stream's slots (producer side); owns and unlinks the shared memory"""
+
+    def __init__(self, width, height, slots=settings.FRAME_RING_SLOTS,
+                 reclaim_after=settings.FRAME_RING_RECLAIM_AFTER):
+        self.reclaim_after = reclaim_after
+        self.width = width
+        self.height = height
+        self.slots = slots
+        _, size = _layout(width, height, slots)
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+        self.name = self.shm.name
+        self.views = _RingViews(self.shm, width, height, slots)
+        self.views.header[:] = 0
+        self.seq = 0
+        self.next_slot = 0
+        self.submitted = 0
+        self.overruns = 0
+        self.superseded = 0
+        self.reclaimed = 0
+        self._finalizer = weakref.finalize(self, _close, self.shm, self.views, True)
+
+    @property
+    def layout(self):
+        return (self.width, self.height, self.slots)
+
+    def matches(self, width, height):
+        return (self.width, self.height) == (width, height)
+
+    def acquire(self):
+        """Index of a free slot (round robin), or None when all are in flight (overrun)"""
+        state = self.views.header[:, STATE]
+        for attempt in range(2):
+            for i in range(self.slots):
+                slot = (self.next_slot + i) % self.slots
+                if state[slot] == FREE:
+                    self.next_slot = (slot + 1) % self.slots
+                    return slot
+            if attempt == 0 and not self._reclaim():
+                break
+        self.overruns += 1
+        return None
+
+    def _reclaim(self):
+        """Free QUEUED slots whose descriptor must have been lost; returns how many"""
+        if not self.reclaim_after:
+            return 0
+        header = self.views.header
+        lost = np.flatnonzero((header[:, STATE] == QUEUED)
+                              & (time.time() - self.views.captured > self.reclaim_after))
+        header[lost, STATE] = FREE
+        self.reclaimed += len(lost)
+        return len(lost)
+
+    def input(self, slot):
+        """The slot's input frame, (height, width, 3) BGR; write it before submit()"""
+        return self.views.inputs[slot]
+
+    def output(self, slot):
+        return self.views.outputs[slot]
+
+    def submit(self, slot, requests, confidence):
+        """Hand the slot to the workers; only the descriptor goes through the queue"""
+        self.seq += 1
+        header = self.views.header[slot]
+        header[SEQ] = self.seq
+        header[COUNT] = 0
+        self.views.captured[slot] = time.time()
+        header[STATE] = QUEUED
+        try:
+            requests.put_nowait((self.name, self.layout, slot, self.seq, confidence))
+        except Exception:
+            header[STATE] = FREE
+            raise
+        self.submitted += 1
+        return self.seq
+
+    def collect(self):
+        """Newest DONE slot as (slot, seq, boxes) or None. Every other completed slot
+        is freed; the returned one stays owned by the caller until release()."""
+        header = self.views.header
+        completed = np.flatnonzero(header[:, STATE] >= DONE)
+        newest = None
+        for slot in completed[np.argsort(header[completed, SEQ])]:
+            slot = int(slot)
+            if header[slot, STATE] != DONE:
+                header[slot, STATE] = FREE
+                continue
+            if newest is not None:
+                self.superseded += 1
+                header[newest, STATE] = FREE
+            newest = slot
+        if newest is None:
+            return None
+        count = int(header[newest, COUNT])
+        return newest, int(header[newest, SEQ]), self.views.boxes[newest, :count]
+
+    def release(self, slot):
+        self.views.header[slot, STATE] = FREE
+
+    def in_flight(self):
+        return int(np.count_nonzero(self.views.header[:, STATE] == QUEUED))
+
+    def stats(self):
+        return {"slots": self.slots, "submitted": self.submitted, "in_flight": self.in_flight(),
+                "overruns": self.overruns, "superseded": self.superseded, "reclaimed": self.reclaimed}
+
+    def close(self):
+        self._finalizer()
+
+
+class _Attached:
+    """A worker's mapping of a stream's ring"""
+
+    def __init__(self, name, layout):
+        self.shm = shared_memory.SharedMemory(name=name)
+        self.views = _RingViews(self.shm, *layout)
+
+    def close(self):
+        _close(self.shm, self.views, unlink=False)
+
+
+def _attach(rings, name, layout, limit=8):
+    ring = rings.pop(name, None)
+    if ring is None:
+        ring = _Attached(name, layout)
+        if len(rings) >= limit:
+            # Rings of ended streams: unmap the least recently used
+            rings.pop(next(iter(rings))).close()
+    rings[name] = ring
+    return ring
+
+
+def serve(requests, handle, max_age=settings.FRAME_RING_MAX_AGE):
+    """Worker loop: for each descriptor, handle(image, output, boxes, confidence) fills
+    the output slot and boxes in place and returns the box count. None stops the loop."""
+    rings = {}
+    try:
+        while True:
+            request = requests.get()
+            if request is None:
+                break
+            name, layout, slot, seq, confidence = request
+            try:
+                ring = _attach(rings, name, layout)
+            except FileNotFoundError:
+                continue  # the stream ended and unlinked its ring
+            views = ring.views
+            header = views.header[slot]
+            if header[SEQ] != seq or header[STATE] != QUEUED:
+                continue
+            if max_age and time.time() - views.captured[slot] > max_age:
+                header[STATE] = SKIPPED
+                continue
+            try:
+                count = handle(views.inputs[slot], views.outputs[slot], views.boxes[slot], confidence)
+                state = DONE
+            except Exception as e:
+                print(f"Frame ring worker error: {e}")
+                count, state = 0, FAILED
+            # The stream reclaimed and reused the slot meanwhile: it isn't ours to finish
+            if header[SEQ] == seq and header[STATE] == QUEUED:
+                header[COUNT] = count
+                header[STATE] = state
+    finally:
+        for ring in rings.values():
+            ring.close()
+
+
+def _predict_handler(model_path, names_out):
+    """handle() for serve(): the webcam path (predict, postprocess, draw) in a worker"""
+    import class_config
+    import postprocess
+    from ultralytics import YOLO
+
+    model = YOLO(model_path)
+    names_out.put(dict(model.names))
+
+    def handle(image, output, boxes, confidence):
+        config = class_config.current()
+        result = model.predict(image, conf=confidence, verbose=False, **config.predict_kwargs(model.names))[0]
+        dets = postprocess.process(result, confidence, config)
+        count = min(len(dets.class_id), MAX_BOXES)
+        boxes[:count, :4] = dets.xyxy[:count]
+        boxes[:count, 4] = dets.confidence[:count]
+        boxes[:count, 5] = dets.class_id[:count]
+        np.copyto(output, image)
+        postprocess.draw(output, dets)
+        return count
+
+    return handle
+
+
+def _worker_main(requests, names_out, model_path, threads):
+    if threads:
+        import torch
+        torch.set_num_threads(threads)
+    serve(requests, _predict_handler(model_path, names_out))
+
+
+class InferenceWorkers:
+    """Worker processes serving every stream's rings from one descriptor queue"""
+
+    def __init__(self, model_path, processes=settings.WEBCAM_INFERENCE_WORKERS,
+                 threads=settings.WEBCAM_INFERENCE_WORKER_THREADS, start_timeout=300):
+        if processes < 1:
+            raise ValueError("InferenceWorkers needs at least one process")
+        # spawn: forking a process that already runs torch/streamlit threads isn't safe
+        ctx = multiprocessing.get_context("spawn")
+        self.model_path = str(model_path)
+        self.requests = ctx.Queue()
+        names_out = ctx.Queue()
+        self.processes = [
+            ctx.Process(target=_worker_main, args=(self.requests, names_out, self.model_path, threads),
+                        name=f"ecodetect-inference-{i}", daemon=True)
+            for i in range(processes)
+        ]
+        for p in self.processes:
+            p.start()
+        names = [names_out.get(timeout=start_timeout) for _ in self.processes]
+        self.names = names[0]
+
+    def alive(self):
+        return all(p.is_alive() for p in self.processes)
+
+    def close(self, timeout=5):
+        for _ in self.processes:
+            self.requests.put(None)
+        for p in self.processes:
+            p.join(timeout)
+            if p.is_alive():
+                p.terminate()
@@ -6,79 +6,228 @@ import tempfile
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import create_engine
 from streamlit_webrtc import webrtc_streamer, VideoProcessorBase, WebRtcMode, RTCConfiguration
-import av
 import numpy as np
-from database import DetectionHistory, SessionLocal
+from database import DetectionHistory, DetectionRollup, CONFIDENCE_BUCKETS, SessionLocal
+from sqlalchemy import func, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+import json
+from pathlib import Path
 import time
-from collections import deque
 import threading
+import metrics
+import profiling
+import postprocess
+import class_config
+import cascade
+import frame_ring
+from model_registry import registry
+from live_history import DetectionRingBuffer
+from frame_pipeline import FramePipeline
 
-model_yolo = None
-
-# Global variables for detection tracking
-current_detections = []
-detection_history = deque(maxlen=50)
+# Global variables for detection tracking (columnar ring buffer, see live_history.py)
+detection_history = DetectionRingBuffer(settings.LIVE_HISTORY_CAPACITY)
 detection_lock = threading.Lock()
 
-def load_model(model_path=settings.DETECTION_MODEL):
-    global model_yolo
-    if model_yolo is None:
-        try:
-            model_yolo = YOLO(model_path)
-            print("Model loaded successfully")
-        except Exception as e:
-            print(f"Error loading model: {e}")
-            model_yolo = None
-    return model_yolo
+# Inference worker processes shared by all webcam streams (settings.WEBCAM_INFERENCE_WORKERS)
+_inference_workers = None
+_inference_workers_starting = None
+_inference_workers_failed = None
+_inference_workers_lock = threading.Lock()
+
+def load_model(model_path=None):
+    """Load a model through the registry; without a path, return the active model"""
+    try:
+        if model_path is None:
+            return registry.active_model()
+        model = registry.load(model_path)
+        if registry.active_info() is None:
+            registry.activate(model_path)
+        return model
+    except Exception as e:
+        print(f"Error loading model: {e}")
+        return None
 
 class VideoProcessorWaste(VideoProcessorBase):
-    def __init__(self, confidence, model):
+    def __init__(self, confidence, model=None):
         self.confidence = confidence
+        # None follows the registry's active model, so hot-swaps apply to running streams
         self.model = model
+        # Conversion and drawing buffers reused across this stream's frames
+        self.pipeline = FramePipeline()
+        # cascade.Cascade with this stream's state, or None for the single model
+        self.cascade = None
+        # With inference workers: this stream's shared-memory slots and the newest annotated frame
+        self.ring = None
+        self.ring_workers = None
+        self.last_output = None
+
+    def set_cascade(self, config):
+        """Switch cascade mode on (a cascade.CascadeConfig) or off (None); new settings start a fresh state"""
+        if config is None:
+            self.cascade = None
+        elif self.cascade is None or self.cascade.config.key() != config.key():
+            self.cascade = cascade.Cascade(config)
 
     def recv(self, frame):
-        global current_detections, detection_history, detection_lock
-        
-        image = frame.to_ndarray(format="bgr24")
+        metrics.mark_frame("webcam")
+        metrics.incr("webcam.frames")
+        metrics.gauge_add("webcam.inflight", 1)
+        try:
+            with metrics.stage("webcam.total"), profiling.profiled("webcam"):
+                return self._process(frame)
+        finally:
+            metrics.gauge_add("webcam.inflight", -1)
 
+    def on_ended(self):
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+
+    def _process(self, frame):
         try:
-            # Predict the objects in the image using the YOLOv11 model
-            res = self.model.predict(image, conf=self.confidence)
+            model = self.model if self.model is not None else registry.active_model()
+            # Cascade mode needs both models at hand, so it stays in this thread
+            workers = None
+            if settings.WEBCAM_INFERENCE_WORKERS and self.cascade is None:
+                workers = get_inference_workers(registry.path(model))
+        except Exception as e:
+            # No model to run (e.g. the active weights failed to load): pass the frame through
+            metrics.incr("webcam.dropped")
+            return frame
+        if workers is not None:
+            return self._process_remote(frame, workers)
+        with registry.lease(model):
+            return self._process_with(frame, model)
 
-            # Plot the detected objects on the video frame
-            res_plotted = res[0].plot()
-            
-            # Extract detection information
-            boxes = res[0].boxes
-            current_frame_detections = []
-            
-            if boxes:
-                for box in boxes:
-                    class_id = int(box.cls)
-                    class_name = self.model.names[class_id]
-                    conf_value = float(box.conf)
-                    current_frame_detections.append({
-                        'name': class_name,
-                        'confidence': conf_value,
-                        'time': time.time()
-                    })
-            
-            # Thread-safe update of global detection variables
-            with detection_lock:
-                current_detections = current_frame_detections
-                if current_frame_detections:
-                    detection_history.extend(current_frame_detections)
+    def _process_remote(self, frame, workers):
+        """Hand the frame to the worker processes through this stream's FrameRing and
+        return the newest annotated frame they finished (see frame_ring.py)"""
+        try:
+            ring = self.ring
+            # A replaced pool never sees the old pool's queued descriptors: start a fresh ring
+            if ring is None or self.ring_workers is not workers or not ring.matches(frame.width, frame.height):
+                if ring is not None:
+                    ring.close()
+                ring = self.ring = frame_ring.FrameRing(frame.width, frame.height)
+                self.ring_workers = workers
+                self.last_output = None
+
+            # Results written by the workers since the last frame; only the newest is shown
+            with metrics.stage("webcam.collect"):
+                done = ring.collect()
+                if done is not None:
+                    slot, _, boxes = done
+                    if self.last_output is None:
+                        self.last_output = np.empty_like(ring.output(slot))
+                    np.copyto(self.last_output, ring.output(slot))
+                    with detection_lock:
+                        detection_history.append(boxes[:, 5].astype(np.int64), boxes[:, 4], boxes[:, :4], workers.names)
+                    ring.release(slot)
+
+            # YUV -> BGR straight into a free slot; with none free the frame is dropped
+            slot = ring.acquire()
+            if slot is None:
+                metrics.incr("webcam.overruns")
+                shown = self.last_output
+            else:
+                with metrics.stage("webcam.to_bgr"):
+                    image = self.pipeline.to_bgr(frame, out=ring.input(slot))
+                ring.submit(slot, workers.requests, self.confidence)
+                shown = self.last_output if self.last_output is not None else image
+            if shown is None:
+                return frame
+
+            with metrics.stage("webcam.render"):
+                return self.pipeline.output_frame(shown, lambda canvas: None, like=frame)
+
+        except Exception as e:
+            metrics.incr("webcam.dropped")
+            return frame
+
+    def _process_with(self, frame, model):
+        started = time.perf_counter()
+        try:
+            # YUV -> BGR once, into the stream's reused buffer (fed to the model as is)
+            with metrics.stage("webcam.to_bgr"):
+                image = self.pipeline.to_bgr(frame)
+
+            # Predict the objects in the image using the YOLOv11 model; disabled classes are skipped.
+            # In cascade mode the fast model goes first and may hand the frame to `model`
+            config = class_config.current()
+            cascade_mode = self.cascade
+            with metrics.stage("webcam.predict"):
+                if cascade_mode is not None:
+                    result, reason = cascade_mode.predict(image, self.confidence, model)
+                else:
+                    result = model.predict(image, conf=self.confidence, **config.predict_kwargs(model.names))[0]
+
+            # Class thresholds, agnostic NMS and top-k on arrays
+            with metrics.stage("webcam.postprocess"):
+                dets = postprocess.process(result, self.confidence, config)
+
+            # Thread-safe update of the live history
+            with metrics.stage("webcam.lock_wait"):
+                detection_lock.acquire()
+            try:
+                detection_history.append(dets.class_id, dets.confidence, dets.xyxy, result.names)
+            finally:
+                detection_lock.release()
             
-            return av.VideoFrame.from_ndarray(res_plotted, format="bgr24")
+            # Draw only the kept boxes, in their class colors, straight into the outgoing frame
+            with metrics.stage("webcam.render"):
+                output = self.pipeline.output_frame(image, lambda canvas: postprocess.draw(canvas, dets), like=frame)
+            if cascade_mode is not None:
+                cascade.record(reason, time.perf_counter() - started)
+            return output
             
         except Exception as e:
             # If detection fails, return original frame
+            metrics.incr("webcam.dropped")
             return frame
 
+
+def get_inference_workers(model_path):
+    """The shared inference worker processes for `model_path`. None while they start
+    (in a background thread, so frames keep being predicted in-thread meanwhile),
+    after they failed to start, or when the model isn't a registry path."""
+    global _inference_workers_starting
+    if model_path is None:
+        return None
+    path = str(model_path)
+    with _inference_workers_lock:
+        workers = _inference_workers
+        if workers is not None and workers.model_path == path and workers.alive():
+            return workers
+        if path in (_inference_workers_failed, _inference_workers_starting):
+            return None
+        _inference_workers_starting = path
+    threading.Thread(target=_start_inference_workers, args=(path,),
+                     name="inference-workers-start", daemon=True).start()
+    return None
+
+
+def _start_inference_workers(path):
+    global _inference_workers, _inference_workers_starting, _inference_workers_failed
+    try:
+        workers = frame_ring.InferenceWorkers(path, settings.WEBCAM_INFERENCE_WORKERS)
+    except Exception as e:
+        print(f"Error starting inference workers: {e}")
+        with _inference_workers_lock:
+            _inference_workers_failed = path
+            if _inference_workers_starting == path:
+                _inference_workers_starting = None
+        return
+    with _inference_workers_lock:
+        previous, _inference_workers = _inference_workers, workers
+        if _inference_workers_starting == path:
+            _inference_workers_starting = None
+    if previous is not None:
+        previous.close()
+
+
 def display_detection_text():
     """Display current detections and history below webcam"""
-    global current_detections, detection_history, detection_lock
-    
     # Create containers for detection display
     detection_container = st.container()
     
@@ -107,47 +256,225 @@ def display_detection_text():
             if st.button("🗑️ Bersihkan Riwayat", key="clear_history"):
                 with detection_lock:
                     detection_history.clear()
-                    current_detections.clear()
                 st.success("Riwayat dibersihkan!")
                 
         with control_col3:
             show_confidence = st.checkbox("Tampilkan Confidence", value=True)
         
+        # Query the live history under the lock, render outside it
+        current_time = time.time()
+        with detection_lock:
+            current_detections = detection_history.last_frame()
+            has_history = len(detection_history) > 0
+            # Highest-confidence detection per waste type in the last 10 seconds
+            waste_groups = detection_history.window_max_per_class(10, current_time)
+            recent_counts = detection_history.counts_per_class(10, current_time)
+
         # Display current detections
         with current_placeholder.container():
-            with detection_lock:
-                if current_detections:
-                    for detection in current_detections:
-                        confidence_color = get_confidence_color(detection['confidence'])
-                        confidence_text = f" - {detection['confidence']:.2f}" if show_confidence else ""
-                        st.markdown(f"{confidence_color} **{detection['name'].upper()}**{confidence_text}")
-                else:
-                    st.info("🗑️ Tunjukkan sampah ke kamera untuk deteksi...")
+            if current_detections:
+                for name, confidence in current_detections:
+                    confidence_color = get_confidence_color(confidence)
+                    confidence_text = f" - {confidence:.2f}" if show_confidence else ""
+                    st.markdown(f"{confidence_color} **{name.upper()}**{confidence_text}")
+            else:
+                st.info("🗑️ Tunjukkan sampah ke kamera untuk deteksi...")
         
         # Display recent history
         with history_placeholder.container():
-            with detection_lock:
-                if detection_history:
-                    # Get unique recent detections (last 10 seconds)
-                    current_time = time.time()
-                    recent_detections = [d for d in detection_history if current_time - d['time'] <= 10]
-                    
-                    # Group by waste name and show most recent with highest confidence
-                    waste_groups = {}
-                    for detection in recent_detections:
-                        waste_name = detection['name']
-                        if waste_name not in waste_groups or detection['confidence'] > waste_groups[waste_name]['confidence']:
-                            waste_groups[waste_name] = detection
-                    
-                    if waste_groups:
-                        for waste_name, detection in waste_groups.items():
-                            time_ago = current_time - detection['time']
-                            confidence_text = f" ({detection['confidence']:.2f})" if show_confidence else ""
-                            st.write(f"• {waste_name.upper()}{confidence_text} - {time_ago:.1f}s ago")
-                    else:
-                        st.write("Tidak ada riwayat terkini")
+            if has_history:
+                if waste_groups:
+                    st.markdown(format_category_counts(count_categories(recent_counts)), unsafe_allow_html=True)
+                    for waste_name, confidence, detected_at in waste_groups:
+                        time_ago = current_time - detected_at
+                        confidence_text = f" ({confidence:.2f})" if show_confidence else ""
+                        st.write(f"• {waste_name.upper()}{confidence_text} - {time_ago:.1f}s ago")
                 else:
-                    st.write("Belum ada riwayat")
+                    st.write("Tidak ada riwayat terkini")
+            else:
+                st.write("Belum ada riwayat")
+
+def display_model_registry_panel():
+    """Sidebar section listing weight files and switching the active model for all sessions"""
+    with st.sidebar.expander("🧠 Registry Model"):
+        try:
+            weights = registry.list_weights()
+        except Exception as e:
+            st.error(f"Error membaca folder model: {e}")
+            return
+        if not weights:
+            st.info(f"Tidak ada file model di {settings.MODEL_DIR}")
+            return
+
+        active = registry.active_info()
+        if active:
+            st.markdown(f"**Aktif:** `{Path(active['path']).name}` (`{(active['sha256'] or '-')[:12]}`)")
+
+        st.dataframe(
+            [
+                {
+                    "Model": w["name"],
+                    "Ukuran (MB)": round(w["size_bytes"] / (1024 * 1024), 1),
+                    "SHA-256": w["sha256"][:12],
+                    "Kelas": ", ".join(w["names"].values()) if w["names"] else "-",
+                    "Status": "aktif" if w["active"] else ("dimuat" if w["loaded"] else ""),
+                }
+                for w in weights
+            ],
+            hide_index=True,
+            use_container_width=True,
+        )
+        choice = st.selectbox("Pilih model", [w["path"] for w in weights], format_func=lambda p: Path(p).name, key="registry_choice")
+        if st.button("🔁 Aktifkan Model", key="registry_activate"):
+            try:
+                with st.spinner("Memuat model..."):
+                    registry.activate(choice)
+                st.success(f"Model aktif: {Path(choice).name}")
+                st.rerun()
+            except Exception as e:
+                st.error(f"Gagal memuat model: {e}")
+
+def display_class_config_panel(model=None):
+    """Sidebar section with each class's category, minimum confidence and color from classes.json"""
+    with st.sidebar.expander("🏷️ Konfigurasi Kelas"):
+        config = class_config.current()
+        if class_config.last_error:
+            st.error(f"Konfigurasi tidak valid, memakai versi sebelumnya: {class_config.last_error}")
+        names = model.names.values() if model is not None else sorted(config.classes)
+        rows = []
+        for name in names:
+            entry = config.entry(name)
+            rows.append({
+                "Kelas": name,
+                "Kategori": entry["category"],
+                "Min. Kepercayaan": entry["min_confidence"],
+                "Aktif": entry["enabled"],
+                "Warna": entry["color"] or "-",
+            })
+        if rows:
+            st.dataframe(rows, hide_index=True, use_container_width=True)
+        st.caption(f"Sumber: `{config.source or 'bawaan'}` (v{config.version}). Perubahan file dimuat otomatis.")
+        if st.button("🔄 Muat Ulang", key="class_config_reload"):
+            class_config.reload()
+            st.rerun()
+
+def display_cascade_panel():
+    """Sidebar section for cascade mode; returns a cascade.CascadeConfig, or None when it is off"""
+    with st.sidebar.expander("⚡ Mode Kaskade (model cepat + model penuh)"):
+        enabled = st.checkbox("Aktifkan mode kaskade", value=settings.CASCADE_ENABLED, key="cascade_enabled")
+        options = [str(settings.CASCADE_FAST_MODEL)]
+        try:
+            options += [w["path"] for w in registry.list_weights() if w["path"] not in options]
+        except Exception as e:
+            st.error(f"Error membaca folder model: {e}")
+        fast_model = st.selectbox("Model cepat", options, format_func=lambda p: Path(p).name, key="cascade_fast_model")
+        low, high = st.slider("Rentang ragu (eskalasi)", 0.0, 1.0, (settings.CASCADE_UNCERTAIN_LOW, settings.CASCADE_UNCERTAIN_HIGH), 0.05, key="cascade_band")
+        audit_every = st.number_input("Audit model penuh setiap N frame (0 = mati)", 0, 10000, settings.CASCADE_AUDIT_EVERY, key="cascade_audit")
+        window = st.number_input("Kelas baru: jendela N frame (0 = mati)", 0, 10000, settings.CASCADE_NEW_CLASS_WINDOW, key="cascade_window")
+
+        stats = cascade.stats()
+        if stats["frames"]:
+            st.metric("Frame dieskalasi", f"{stats['escalated_fraction']:.0%}", help=f"{stats['escalated']} dari {stats['frames']} frame")
+            st.caption(" · ".join(f"{reason}: {fraction:.0%}" for reason, fraction in stats["reasons"].items()))
+            st.dataframe(
+                [
+                    {
+                        "Jalur": "Model cepat" if path == cascade.FAST else "Eskalasi",
+                        "n": latency["count"],
+                        "p50 (ms)": round(latency["p50_ms"], 1) if latency["p50_ms"] is not None else None,
+                        "p95 (ms)": round(latency["p95_ms"], 1) if latency["p95_ms"] is not None else None,
+                    }
+                    for path, latency in stats["latency"].items()
+                ],
+                hide_index=True,
+                use_container_width=True,
+            )
+            if st.button("🔄 Reset Statistik", key="cascade_reset"):
+                cascade.reset_stats()
+                st.rerun()
+
+        if not enabled:
+            return None
+        config = cascade.CascadeConfig(fast_model, low, high, int(audit_every), int(window))
+        if not cascade.fast_model_available(config):
+            st.warning(f"Model cepat tidak ditemukan: {fast_model}. Mode kaskade nonaktif.")
+            return None
+        return config
+
+def display_metrics_panel():
+    """Operator panel in the sidebar with per-stage latency, fps and counters"""
+    with st.sidebar.expander("📈 Metrik Performa"):
+        # The switch is process-wide: show its current state, change it only when clicked
+        st.session_state["metrics_enabled"] = metrics.is_enabled()
+        st.checkbox("Aktifkan instrumentasi", key="metrics_enabled",
+                    on_change=lambda: metrics.set_enabled(st.session_state["metrics_enabled"]))
+        enabled = metrics.is_enabled()
+        if not enabled:
+            st.caption("Instrumentasi nonaktif (tanpa overhead).")
+            return
+
+        snap = metrics.snapshot()
+        webcam_fps = snap["fps"].get("webcam")
+        counters = snap["counters"]
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric("FPS Webcam", f"{webcam_fps:.1f}" if webcam_fps is not None else "-")
+            st.metric("Frame Diproses", counters.get("webcam.frames", 0))
+        with col2:
+            st.metric("Antrian (in-flight)", snap["gauges"].get("webcam.inflight", 0))
+            st.metric("Frame Gagal", counters.get("webcam.dropped", 0))
+
+        if snap["stages"]:
+            st.dataframe(
+                [
+                    {
+                        "Tahap": name,
+                        "n": stats["count"],
+                        "p50 (ms)": round(stats["p50_ms"], 2),
+                        "p95 (ms)": round(stats["p95_ms"], 2),
+                    }
+                    for name, stats in snap["stages"].items()
+                ],
+                hide_index=True,
+                use_container_width=True,
+            )
+        else:
+            st.caption("Belum ada data. Jalankan deteksi terlebih dahulu.")
+
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button("JSON", metrics.to_json(), file_name="metrics.json", mime="application/json")
+        with col2:
+            st.download_button("Prometheus", metrics.to_prometheus(), file_name="metrics.prom", mime="text/plain")
+        if st.button("🔄 Reset Metrik", key="metrics_reset"):
+            metrics.reset()
+            st.rerun()
+
+def display_profiling_panel():
+    """Operator panel in the sidebar to profile the next N frames/detections"""
+    with st.sidebar.expander("🧪 Profiling"):
+        running = profiling.status()
+        for target, info in running.items():
+            st.info(f"⏳ {target}: {info['calls'] - info['remaining']}/{info['calls']} ({info['mode']})")
+            if st.button(f"⏹️ Hentikan {target}", key=f"profile_stop_{target}"):
+                profiling.disarm(target)
+                st.rerun()
+
+        target = st.selectbox("Target", profiling.TARGETS, format_func=lambda t: "Webcam (frame)" if t == "webcam" else "Gambar (deteksi)", key="profile_target")
+        mode = st.selectbox("Mode", profiling.MODES, format_func=lambda m: "Deterministik (cProfile)" if m == profiling.DETERMINISTIC else "Sampling", key="profile_mode")
+        calls = st.number_input("Jumlah frame/deteksi", min_value=1, max_value=10000, value=100 if target == "webcam" else 1, key="profile_calls")
+        capture_memory = st.checkbox("Rekam alokasi memori (tracemalloc)", key="profile_memory", help="Memperlambat inferensi selama profiling berjalan")
+        if st.button("▶️ Mulai Profiling", key="profile_start", disabled=target in running):
+            profiling.arm(target, int(calls), mode, capture_memory)
+            st.rerun()
+
+        artifacts = profiling.list_artifacts()
+        if artifacts:
+            st.markdown("**Artefak:**")
+            for path in artifacts[:20]:
+                # A callable is only read when the button is clicked, not on every rerun
+                st.download_button(f"⬇️ {path.name}", data=path.read_bytes, file_name=path.name,
+                                   key=f"profile_dl_{path.name}")
 
 def get_confidence_color(confidence):
     """Return emoji color based on confidence level"""
@@ -160,8 +487,8 @@ def get_confidence_color(confidence):
     else:
         return "🔴"  # Red - Very low confidence
 
-def play_webcam_waste_detection(conf, model):
-    """Enhanced webcam function with waste detection display"""
+def play_webcam_waste_detection(conf, model=None):
+    """Enhanced webcam function with waste detection display (model=None follows the active model)"""
     
     st.markdown("### 📹 Deteksi Sampah Real-time dari Kamera")
     
@@ -255,24 +582,28 @@ def play_webcam_waste_detection(conf, model):
     # Additional features
     with st.expander("📊 Statistik Deteksi Real-time"):
         with detection_lock:
-            if detection_history:
-                total_detections = len(detection_history)
-                unique_waste = len(set(d['name'] for d in detection_history))
-                avg_confidence = sum(d['confidence'] for d in detection_history) / len(detection_history)
-                
-                col1, col2, col3 = st.columns(3)
-                with col1:
-                    st.metric("Total Deteksi", total_detections)
-                with col2:
-                    st.metric("Jenis Sampah", unique_waste)
-                with col3:
-                    st.metric("Rata-rata Confidence", f"{avg_confidence:.2f}")
-            else:
-                st.info("📊 Belum ada deteksi. Tunjukkan sampah ke kamera!")
+            summary = detection_history.summary()
+            class_counts = detection_history.counts_per_class()
+        if summary["total"]:
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Total Deteksi", summary["total"])
+            with col2:
+                st.metric("Jenis Sampah", summary["unique"])
+            with col3:
+                st.metric("Rata-rata Confidence", f"{summary['mean_confidence']:.2f}")
+            st.markdown(format_category_counts(count_categories(class_counts)), unsafe_allow_html=True)
+        else:
+            st.info("📊 Belum ada deteksi. Tunjukkan sampah ke kamera!")
 
 # Update fungsi play_webcam_bisindo agar kompatibel
-def play_webcam_bisindo(conf, model):
+def play_webcam_bisindo(conf, model=None, cascade_config=None):
     """Enhanced webcam function for waste detection (keeping original name for compatibility)"""
+
+    def make_processor():
+        processor = VideoProcessorWaste(conf, model)
+        processor.set_cascade(cascade_config)
+        return processor
     
     st.markdown("### 📹 Deteksi Sampah Real-time dari Kamera")
     
@@ -297,7 +628,7 @@ def play_webcam_bisindo(conf, model):
             key="waste_detection_webcam",
             mode=WebRtcMode.SENDRECV,
             rtc_configuration=rtc_config,
-            video_processor_factory=lambda: VideoProcessorWaste(conf, model),
+            video_processor_factory=make_processor,
             media_stream_constraints={
                 "video": {
                     "width": {"ideal": 640},
@@ -312,6 +643,7 @@ def play_webcam_bisindo(conf, model):
         if webrtc_ctx.video_processor:
             webrtc_ctx.video_processor.confidence = conf
             webrtc_ctx.video_processor.model = model
+            webrtc_ctx.video_processor.set_cascade(cascade_config)
         
         # Status indicator
         if webrtc_ctx.state.playing:
@@ -334,40 +666,71 @@ def play_webcam_bisindo(conf, model):
     # Additional features
     with st.expander("📊 Statistik Deteksi Real-time"):
         with detection_lock:
-            if detection_history:
-                total_detections = len(detection_history)
-                unique_waste = len(set(d['name'] for d in detection_history))
-                avg_confidence = sum(d['confidence'] for d in detection_history) / len(detection_history)
-                
-                col1, col2, col3 = st.columns(3)
-                with col1:
-                    st.metric("Total Deteksi", total_detections)
-                with col2:
-                    st.metric("Jenis Sampah", unique_waste)
-                with col3:
-                    st.metric("Rata-rata Confidence", f"{avg_confidence:.2f}")
-            else:
-                st.info("📊 Belum ada deteksi. Tunjukkan sampah ke kamera!")
+            summary = detection_history.summary()
+            class_counts = detection_history.counts_per_class()
+        if summary["total"]:
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Total Deteksi", summary["total"])
+            with col2:
+                st.metric("Jenis Sampah", summary["unique"])
+            with col3:
+                st.metric("Rata-rata Confidence", f"{summary['mean_confidence']:.2f}")
+            st.markdown(format_category_counts(count_categories(class_counts)), unsafe_allow_html=True)
+        else:
+            st.info("📊 Belum ada deteksi. Tunjukkan sampah ke kamera!")
+
+def save_detection(source_type, source_path, detected_image, detections=None,
+                   content_hash=None, result_key=None, idempotency_key=None):
+    """Save a detection result; `detections` is a list of {'name', 'confidence'} dicts.
 
-def save_detection(source_type, source_path, detected_image):
+    With a result_key/idempotency_key (see ingest.py) a row that already holds
+    either key wins: nothing is inserted and that row's id is returned.
+    """
     from datetime import datetime
     db = SessionLocal()
     try:
+        timestamp = datetime.now()  # Add real timestamp
         new_record = DetectionHistory(
             source_type=source_type,
             source_path=source_path,
             detected_image=detected_image,
-            timestamp=datetime.now()  # Add real timestamp
+            timestamp=timestamp,
+            detections=json.dumps(detections) if detections is not None else None,
+            content_hash=content_hash,
+            result_key=result_key,
+            idempotency_key=idempotency_key,
         )
         db.add(new_record)
+        # Rollup rows are updated in the same transaction as the insert
+        update_detection_rollup(db, source_type, timestamp, detections or [])
         db.commit()
         return new_record.id
+    except IntegrityError:
+        # Lost a race against the same upload (another rerun, session or API request)
+        db.rollback()
+        existing = find_detection_by_keys(db, result_key, idempotency_key)
+        if existing is None:
+            raise
+        return existing.id
     except Exception as e:
         db.rollback()
         raise e
     finally:
         db.close()
 
+def find_detection_by_keys(db, result_key=None, idempotency_key=None):
+    """Row holding either ingestion key, or None. Thumbnailed rows (retention.py)
+    don't answer for a result key: their image is no longer the full result."""
+    conditions = []
+    if result_key is not None:
+        conditions.append((DetectionHistory.result_key == result_key) & DetectionHistory.is_thumbnail.isnot(True))
+    if idempotency_key is not None:
+        conditions.append(DetectionHistory.idempotency_key == idempotency_key)
+    if not conditions:
+        return None
+    return db.query(DetectionHistory).filter(or_(*conditions)).first()
+
 def get_detection_history():
     db = SessionLocal()
     try:
@@ -428,4 +791,151 @@ def get_detection_by_id(record_id):
     except Exception as e:
         raise e
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def get_waste_category(class_name):
+    """Map a model class name to Organik / Anorganik / Lainnya (see classes.json)"""
+    return class_config.current().category(class_name)
+
+def count_categories(class_counts):
+    """{category: count} for every category, from {class_name: count}"""
+    config = class_config.current()
+    counts = dict.fromkeys(class_config.CATEGORIES, 0)
+    for class_name, count in class_counts.items():
+        counts[config.category(class_name)] += count
+    return counts
+
+def count_detection_categories(detections):
+    """Category counts of a list of {'name', 'confidence'} dicts"""
+    class_counts = {}
+    for detection in detections:
+        class_counts[detection['name']] = class_counts.get(detection['name'], 0) + 1
+    return count_categories(class_counts)
+
+def record_category_counts(record):
+    """Category counts of one stored detection_history row"""
+    return count_detection_categories(json.loads(record.detections) if record.detections else [])
+
+def format_category_counts(counts):
+    """Markdown line with a colored dot per category, e.g. for st.markdown(..., unsafe_allow_html=True)"""
+    config = class_config.current()
+    return " · ".join(
+        f"<span style='color: {config.category_color(category)}'>●</span> **{category}**: {count}"
+        for category, count in counts.items()
+    )
+
+def get_category_totals():
+    """All-time {category: count} from the day rollup rows"""
+    db = SessionLocal()
+    try:
+        rows = db.query(DetectionRollup.class_name, func.sum(DetectionRollup.count)).filter(
+            DetectionRollup.grain == "day"
+        ).group_by(DetectionRollup.class_name).all()
+    except Exception as e:
+        raise e
+    finally:
+        db.close()
+    return count_categories(dict(rows))
+
+def update_detection_rollup(db, source_type, timestamp, detections):
+    """Add detections to the hour and day rollup rows (caller commits)"""
+    buckets = {
+        "hour": timestamp.replace(minute=0, second=0, microsecond=0),
+        "day": timestamp.replace(hour=0, minute=0, second=0, microsecond=0),
+    }
+    groups = {}
+    for detection in detections:
+        row = groups.setdefault(detection['name'], {"count": 0, "confidence_sum": 0.0})
+        row["count"] += 1
+        row["confidence_sum"] += detection['confidence']
+        conf_column = CONFIDENCE_BUCKETS[min(int(detection['confidence'] * 10), 9)]
+        row[conf_column] = row.get(conf_column, 0) + 1
+    for grain, bucket in buckets.items():
+        for class_name, values in groups.items():
+            stmt = sqlite_insert(DetectionRollup).values(
+                grain=grain, bucket=bucket, source_type=source_type, class_name=class_name, **values
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["grain", "bucket", "source_type", "class_name"],
+                set_={
+                    column: getattr(DetectionRollup, column) + getattr(stmt.excluded, column)
+                    for column in values
+                },
+            )
+            db.execute(stmt)
+
+def rebuild_detection_rollup():
+    """Recompute the rollup from the stored detection_history rows, from the day of
+    the oldest stored row on. Earlier buckets are kept: they may cover rows that
+    retention has since deleted. Rows deleted within the rebuilt span (e.g. by hand)
+    drop out of it. Returns the start of the rebuilt span, or None if history is empty."""
+    db = SessionLocal()
+    try:
+        oldest = db.query(func.min(DetectionHistory.timestamp)).scalar()
+        if oldest is None:
+            return None
+        since = oldest.replace(hour=0, minute=0, second=0, microsecond=0)
+        db.query(DetectionRollup).filter(DetectionRollup.bucket >= since).delete()
+        rows = db.query(DetectionHistory.source_type, DetectionHistory.timestamp, DetectionHistory.detections).filter(
+            DetectionHistory.detections.isnot(None), DetectionHistory.timestamp >= since
+        ).yield_per(1000)
+        for source_type, timestamp, detections in rows:
+            update_detection_rollup(db, source_type, timestamp, json.loads(detections))
+        db.commit()
+        return since
+    except Exception as e:
+        db.rollback()
+        raise e
+    finally:
+        db.close()
+
+def get_detection_analytics(start, end, granularity="day"):
+    """Aggregates over [start, end) from the rollup table.
+
+    Returns per-period class counts, per-class totals with mean confidence,
+    the organic/inorganic share and the confidence distribution.
+    """
+    period_format = "%Y-%m-%d %H:00" if granularity == "hour" else "%Y-%m-%d"
+    # Totals can use the coarser day rows when the range covers whole days
+    total_grain = "day" if start == start.replace(hour=0, minute=0, second=0, microsecond=0) \
+        and end == end.replace(hour=0, minute=0, second=0, microsecond=0) else "hour"
+
+    def in_range(grain):
+        return (DetectionRollup.grain == grain, DetectionRollup.bucket >= start, DetectionRollup.bucket < end)
+
+    db = SessionLocal()
+    try:
+        period = func.strftime(period_format, DetectionRollup.bucket)
+        per_period = db.query(
+            period, DetectionRollup.class_name, func.sum(DetectionRollup.count)
+        ).filter(*in_range(granularity)).group_by(DetectionRollup.bucket, DetectionRollup.class_name).order_by(DetectionRollup.bucket).all()
+        per_class = db.query(
+            DetectionRollup.class_name, func.sum(DetectionRollup.count), func.sum(DetectionRollup.confidence_sum)
+        ).filter(*in_range(total_grain)).group_by(DetectionRollup.class_name).all()
+        confidence = db.query(
+            *[func.sum(getattr(DetectionRollup, column)) for column in CONFIDENCE_BUCKETS]
+        ).filter(*in_range(total_grain)).one()
+        records = db.query(func.count(DetectionHistory.id)).filter(
+            DetectionHistory.timestamp >= start, DetectionHistory.timestamp < end
+        ).scalar()
+    except Exception as e:
+        raise e
+    finally:
+        db.close()
+
+    categories = {}
+    for class_name, count, _ in per_class:
+        category = get_waste_category(class_name)
+        categories[category] = categories.get(category, 0) + count
+    return {
+        "records": records,
+        "per_period": [{"period": p, "class_name": c, "count": n} for p, c, n in per_period],
+        "per_class": [
+            {"class_name": c, "count": n, "mean_confidence": conf_sum / n if n else None}
+            for c, n, conf_sum in sorted(per_class, key=lambda row: -row[1])
+        ],
+        "categories": categories,
+        "confidence": [
+            {"range": f"{b / 10:.1f}-{(b + 1) / 10:.1f}", "count": confidence[b] or 0} for b in range(10)
+        ],
+    }
@@ -0,0 +1,107 @@
+"""Deduplicated ingestion of uploaded images.
+
+Uploaded bytes are hashed once (SHA-256). Together with the model and the
+detection settings that hash forms a result key, stored under a unique index
+in detection_history:
+
+    digest = ingest.content_hash(data)
+    key = ingest.result_key(digest, model, confidence=0.4)
+    hit = ingest.lookup(key)        # stored row, or None
+    if hit is None:
+        ...predict and plot...
+        record_id = helper.save_detection("Image", name, png, detections,
+                                          content_hash=digest, result_key=key, idempotency_key=idem)
+
+A repeat of the same image under the same model and settings is answered
+from the stored row: no inference and no second copy of the image. The
+idempotency key names one user action (a Streamlit session + upload + key,
+or an API client's Idempotency-Key header), so replaying that action never
+inserts twice. Both keys are enforced by the database itself, which keeps
+concurrent writers (several sessions, the API) and retries after a crash
+from racing each other into duplicates.
+"""
+import hashlib
+import json
+
+from sqlalchemy import case, func
+
+import class_config
+import settings
+from database import DetectionHistory, SessionLocal
+from model_registry import registry
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _digest(payload):
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _result_inputs(content_digest, model, **params):
+    return {
+        "content": content_digest,
+        # Models outside the registry have no stable identity beyond this process
+        "model": registry.fingerprint(model) or f"unregistered:{id(model)}",
+        "classes": class_config.current().digest,
+        "nms_iou": settings.POSTPROCESS_AGNOSTIC_NMS_IOU,
+        "top_k": settings.POSTPROCESS_TOP_K,
+        # Rounded so float noise from sliders doesn't defeat the key
+        **{k: round(v, 4) if isinstance(v, float) else v for k, v in params.items()},
+    }
+
+
+def result_key(content_digest, model, **params):
+    """Key of one detection result; None (no deduplication) for models outside the registry"""
+    if not settings.INGEST_DEDUP or registry.fingerprint(model) is None:
+        return None
+    return _digest(_result_inputs(content_digest, model, **params))
+
+
+def inputs_digest(content_digest, model, **params):
+    """Digest of everything result_key covers, even when deduplication is off; part of
+    idempotency keys, so changing the model or a setting is a new action"""
+    return _digest(_result_inputs(content_digest, model, **params))
+
+
+def idempotency_key(*parts):
+    """Key naming one user action, e.g. idempotency_key(session_id, file_id, inputs_digest(...))"""
+    return _digest([str(p) for p in parts])
+
+
+def lookup(result_key=None, idempotency_key=None):
+    """The stored row for either key (reuse_count bumped), or None"""
+    if result_key is None and idempotency_key is None:
+        return None
+    import helper
+
+    db = SessionLocal()
+    try:
+        record = helper.find_detection_by_keys(db, result_key, idempotency_key)
+        if record is None:
+            return None
+        record.reuse_count = DetectionHistory.reuse_count + 1
+        db.commit()
+        db.refresh(record)
+        return record
+    except Exception as e:
+        db.rollback()
+        raise e
+    finally:
+        db.close()
+
+
+def stats():
+    """Repeats served from stored rows and the image bytes they didn't store again
+    (not counted for thumbnailed rows, whose full-size image is gone)"""
+    db = SessionLocal()
+    try:
+        full_size = case((DetectionHistory.is_thumbnail.is_(True), 0), else_=func.length(DetectionHistory.detected_image))
+        reused, bytes_saved = db.query(
+            func.sum(DetectionHistory.reuse_count),
+            func.sum(DetectionHistory.reuse_count * full_size),
+        ).one()
+        return {"reused": reused or 0, "bytes_saved": bytes_saved or 0}
+    finally:
+        db.close()
@@ -0,0 +1,138 @@
+"""Compact columnar ring buffer for live webcam detections.
+
+Each detection is stored as a row across preallocated NumPy columns
+(class id, confidence, timestamp, box) instead of a dict per detection,
+so 100k events take a few MB and window queries are vectorized.
+
+The buffer does no locking of its own; callers hold helper.detection_lock.
+"""
+import time
+
+import numpy as np
+
+# Class ids are stored as uint8; 255 marks an unused slot
+MAX_CLASSES = 255
+
+
+class DetectionRingBuffer:
+    def __init__(self, capacity):
+        self.capacity = int(capacity)
+        self.class_id = np.zeros(self.capacity, dtype=np.uint8)
+        self.confidence = np.zeros(self.capacity, dtype=np.float32)
+        self.timestamp = np.zeros(self.capacity, dtype=np.float64)
+        self.boxes = np.zeros((self.capacity, 4), dtype=np.float32)
+        self.head = 0  # next write position
+        self.size = 0
+        self.last_frame_count = 0
+        # Class names are interned to buffer-local ids, so ids stay stable
+        # when the active model (and its names mapping) changes
+        self.names = []
+        self._name_ids = {}
+        self._lut_cache = (None, None)
+
+    def __len__(self):
+        return self.size
+
+    def nbytes(self):
+        return self.class_id.nbytes + self.confidence.nbytes + self.timestamp.nbytes + self.boxes.nbytes
+
+    def clear(self):
+        self.head = 0
+        self.size = 0
+        self.last_frame_count = 0
+
+    def _intern(self, name):
+        idx = self._name_ids.get(name)
+        if idx is None:
+            if len(self.names) >= MAX_CLASSES:
+                raise ValueError(f"More than {MAX_CLASSES} distinct classes")
+            idx = len(self.names)
+            self.names.append(name)
+            self._name_ids[name] = idx
+        return idx
+
+    def _lookup_table(self, model_names):
+        """uint8 array mapping model class ids to buffer-local ids"""
+        cached_names, lut = self._lut_cache
+        if cached_names is not model_names:
+            size = max(model_names) + 1 if model_names else 0
+            lut = np.zeros(size, dtype=np.uint8)
+            for i, name in model_names.items():
+                lut[i] = self._intern(name)
+            self._lut_cache = (model_names, lut)
+        return lut
+
+    def append(self, class_ids, confidences, boxes, model_names, timestamp=None):
+        """Append one frame's detections (arrays from boxes.cls/conf/xyxy)"""
+        n = len(class_ids)
+        self.last_frame_count = min(n, self.capacity)
+        if n == 0:
+            return
+        if timestamp is None:
+            timestamp = time.time()
+        if n > self.capacity:
+            class_ids, confidences, boxes = class_ids[-self.capacity:], confidences[-self.capacity:], boxes[-self.capacity:]
+            n = self.capacity
+
+        lut = self._lookup_table(model_names)
+        ids = lut[np.asarray(class_ids, dtype=np.intp)]
+        idx = (self.head + np.arange(n)) % self.capacity
+        self.class_id[idx] = ids
+        self.confidence[idx] = confidences
+        self.timestamp[idx] = timestamp
+        self.boxes[idx] = boxes
+        self.head = (self.head + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+
+    def _ordered(self, count=None):
+        """Indices of the newest `count` rows (all rows by default), oldest first"""
+        count = self.size if count is None else min(count, self.size)
+        return (self.head - count + np.arange(count)) % self.capacity
+
+    def _window(self, seconds, now=None):
+        """Indices of rows newer than `seconds`, oldest first"""
+        if now is None:
+            now = time.time()
+        idx = self._ordered()
+        # Timestamps are appended in order, so the window is a suffix
+        start = np.searchsorted(self.timestamp[idx], now - seconds, side="left")
+        return idx[start:]
+
+    def last_frame(self):
+        """[(name, confidence)] for the detections of the most recent frame"""
+        idx = self._ordered(self.last_frame_count)
+        return [(self.names[c], float(conf)) for c, conf in zip(self.class_id[idx], self.confidence[idx])]
+
+    def window_max_per_class(self, seconds, now=None):
+        """[(name, max confidence, timestamp of that detection)] over the last `seconds`"""
+        idx = self._window(seconds, now)
+        if idx.size == 0:
+            return []
+        cls = self.class_id[idx]
+        conf = self.confidence[idx]
+        # Sort by class, then confidence descending; the first row per class is its max
+        order = np.lexsort((-conf, cls))
+        cls_sorted = cls[order]
+        first = np.flatnonzero(np.r_[True, cls_sorted[1:] != cls_sorted[:-1]])
+        best = idx[order[first]]
+        return [
+            (self.names[self.class_id[i]], float(self.confidence[i]), float(self.timestamp[i]))
+            for i in best
+        ]
+
+    def counts_per_class(self, seconds=None, now=None):
+        """{name: count} over the whole buffer or the last `seconds`"""
+        idx = self._ordered() if seconds is None else self._window(seconds, now)
+        counts = np.bincount(self.class_id[idx], minlength=len(self.names))
+        return {self.names[i]: int(c) for i, c in enumerate(counts) if c}
+
+    def summary(self):
+        """Total detections, distinct classes and mean confidence"""
+        idx = self._ordered()
+        if idx.size == 0:
+            return {"total": 0, "unique": 0, "mean_confidence": None}
+        return {
+            "total": int(idx.size),
+            "unique": int(np.unique(self.class_id[idx]).size),
+            "mean_confidence": float(self.confidence[idx].mean()),
+        }
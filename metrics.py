@@ -0,0 +1,263 @@
+"""Lightweight per-stage latency metrics for the image and webcam pipelines.
+
+Usage:
+
+    with metrics.stage("webcam.predict"):
+        res = model.predict(image)
+
+When metrics are disabled `stage()` returns a shared no-op context manager,
+so the instrumentation costs one function call and a flag check.
+"""
+import bisect
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+
+import settings
+
+# Histogram bucket upper bounds in seconds: 64 log-spaced buckets, 0.1 ms .. 10 s
+BUCKET_BOUNDS = [1e-4 * (1e5 ** (i / 63)) for i in range(64)]
+
+_NULL = nullcontext()
+_enabled = settings.METRICS_ENABLED
+_registry_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+_gauges = {}
+_frame_times = {}
+_started_at = time.time()
+
+
+class StageHistogram:
+    """Fixed-size latency histogram (log buckets), safe to update from any thread"""
+
+    __slots__ = ("counts", "count", "total", "max", "lock")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, seconds):
+        i = bisect.bisect_left(BUCKET_BOUNDS, seconds)
+        with self.lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def percentile(self, q):
+        """Estimate the q-th percentile (0-100) in seconds"""
+        with self.lock:
+            counts = list(self.counts)
+            count = self.count
+            top = self.max
+        if count == 0:
+            return None
+        rank = q / 100.0 * count
+        seen = 0
+        for i, c in enumerate(counts):
+            if c and seen + c >= rank:
+                lower = BUCKET_BOUNDS[i - 1] if i > 0 else 0.0
+                upper = BUCKET_BOUNDS[i] if i < len(BUCKET_BOUNDS) else top
+                # Interpolate within the bucket, never beyond the observed max
+                return min(lower + (upper - lower) * (rank - seen) / c, top)
+            seen += c
+        return top
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+
+class _StageTimer:
+    __slots__ = ("hist", "start")
+
+    def __init__(self, hist):
+        self.hist = hist
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.hist.observe(time.perf_counter() - self.start)
+        return False
+
+
+def is_enabled():
+    return _enabled
+
+
+def set_enabled(enabled):
+    global _enabled
+    _enabled = bool(enabled)
+
+
+def _histogram(name):
+    hist = _histograms.get(name)
+    if hist is None:
+        with _registry_lock:
+            hist = _histograms.setdefault(name, StageHistogram())
+    return hist
+
+
+def stage(name):
+    """Context manager timing one pipeline stage (no-op when disabled)"""
+    if not _enabled:
+        return _NULL
+    return _StageTimer(_histogram(name))
+
+
+def observe(name, seconds):
+    if _enabled:
+        _histogram(name).observe(seconds)
+
+
+def incr(name, value=1):
+    """Increment a counter (monotonic; use gauge_add() for values that go down)"""
+    if _enabled:
+        with _registry_lock:
+            _counters[name] = _counters.get(name, 0) + value
+
+
+def gauge_add(name, value):
+    """Adjust a gauge of live state (e.g. frames in flight). Counted even while disabled,
+    and kept across reset(), so a +1/-1 pair stays balanced when either happens mid-frame."""
+    with _registry_lock:
+        _gauges[name] = _gauges.get(name, 0) + value
+
+
+def mark_frame(name):
+    """Record that a frame was produced, for the fps estimate"""
+    if _enabled:
+        times = _frame_times.get(name)
+        if times is None:
+            with _registry_lock:
+                times = _frame_times.setdefault(name, deque(maxlen=120))
+        times.append(time.perf_counter())
+
+
+def fps(name):
+    times = list(_frame_times.get(name, ()))
+    if len(times) < 2 or times[-1] <= times[0]:
+        return None
+    # Stale if nothing arrived for a couple of seconds
+    if time.perf_counter() - times[-1] > 2.0:
+        return 0.0
+    return (len(times) - 1) / (times[-1] - times[0])
+
+
+def reset():
+    global _started_at
+    with _registry_lock:
+        _histograms.clear()
+        _counters.clear()
+        _frame_times.clear()
+        _started_at = time.time()
+
+
+def snapshot():
+    """Current metrics as a plain dict (milliseconds for latencies)"""
+    def ms(v):
+        return v * 1000.0 if v is not None else None
+
+    stages = {}
+    for name, hist in sorted(_histograms.items()):
+        stages[name] = {
+            "count": hist.count,
+            "mean_ms": ms(hist.mean()),
+            "p50_ms": ms(hist.percentile(50)),
+            "p95_ms": ms(hist.percentile(95)),
+            "p99_ms": ms(hist.percentile(99)),
+            "max_ms": ms(hist.max),
+        }
+    return {
+        "enabled": _enabled,
+        "since": _started_at,
+        "stages": stages,
+        "counters": dict(sorted(_counters.items())),
+        "gauges": dict(sorted(_gauges.items())),
+        "fps": {name: fps(name) for name in sorted(_frame_times)},
+    }
+
+
+def to_json():
+    return json.dumps(snapshot(), indent=2)
+
+
+def _prom_name(name):
+    return "".join(c if c.isalnum() else "_" for c in name)
+
+
+def to_prometheus():
+    """Prometheus text exposition format"""
+    lines = [
+        "# HELP ecodetect_stage_seconds Pipeline stage latency",
+        "# TYPE ecodetect_stage_seconds histogram",
+    ]
+    for name, hist in sorted(_histograms.items()):
+        with hist.lock:
+            counts = list(hist.counts)
+            count, total = hist.count, hist.total
+        cumulative = 0
+        for bound, c in zip(BUCKET_BOUNDS, counts):
+            cumulative += c
+            lines.append(f'ecodetect_stage_seconds_bucket{{stage="{name}",le="{bound:.6g}"}} {cumulative}')
+        lines.append(f'ecodetect_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {count}')
+        lines.append(f'ecodetect_stage_seconds_sum{{stage="{name}"}} {total:.6f}')
+        lines.append(f'ecodetect_stage_seconds_count{{stage="{name}"}} {count}')
+    # incr() counters only go up: Prometheus counters, named *_total
+    for name, value in sorted(_counters.items()):
+        metric = f"ecodetect_{_prom_name(name)}_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {value}")
+    for name, value in sorted(_gauges.items()):
+        metric = f"ecodetect_{_prom_name(name)}"
+        lines.append(f"# TYPE {metric} gauge")
+        lines.append(f"{metric} {value}")
+    for name in sorted(_frame_times):
+        value = fps(name)
+        if value is not None and not math.isnan(value):
+            metric = f"ecodetect_{_prom_name(name)}_fps"
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {value:.3f}")
+    return "\n".join(lines) + "\n"
+
+
+def dump(path):
+    """Write metrics to a file; .prom/.txt gets Prometheus text, anything else JSON"""
+    text = to_prometheus() if str(path).endswith((".prom", ".txt")) else to_json()
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        f.write(text)
+    # Atomic replace so scrapers never read a half-written file
+    os.replace(tmp, path)
+
+
+_dump_thread = None
+
+
+def start_file_dump(path, interval=10.0):
+    """Periodically dump metrics to `path` from a daemon thread (idempotent)"""
+    global _dump_thread
+    if _dump_thread is not None and _dump_thread.is_alive():
+        return
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            if _enabled:
+                try:
+                    dump(path)
+                except OSError as e:
+                    print(f"Error writing metrics dump: {e}")
+
+    _dump_thread = threading.Thread(target=loop, name="metrics-dump", daemon=True)
+    _dump_thread.start()
@@ -0,0 +1,263 @@
+"""Registry of YOLO weight files with side-by-side loading and hot-swap.
+
+The registry keeps several models loaded (bounded by count and by parameter
+memory), tracks which one is active, and reference-counts in-flight requests:
+
+    model = registry.active_model()
+    with registry.lease(model):
+        res = model.predict(image)
+
+Switching the active model never blocks running requests. A model evicted
+while still leased is only released after its last lease ends.
+"""
+import gc
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
+from ultralytics import YOLO
+
+import settings
+
+WEIGHT_SUFFIXES = (".pt", ".onnx", ".torchscript", ".engine")
+
+_hash_cache = {}
+_names_cache = {}
+
+
+def file_sha256(path):
+    """SHA-256 of a weight file, cached by (path, size, mtime)"""
+    path = Path(path)
+    stat = path.stat()
+    key = (str(path.resolve()), stat.st_size, stat.st_mtime_ns)
+    digest = _hash_cache.get(key)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+        _hash_cache[key] = digest
+    return digest
+
+
+def model_nbytes(model):
+    """Approximate memory held by a model's parameters and buffers"""
+    try:
+        module = model.model
+        tensors = list(module.parameters()) + list(module.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
+    except Exception:
+        # Exported formats (onnx, engine) don't expose torch parameters
+        return 0
+
+
+class ModelEntry:
+    def __init__(self, key, model, sha256):
+        self.key = key
+        self.model = model
+        self.sha256 = sha256
+        self.names = dict(model.names) if getattr(model, "names", None) else {}
+        self.nbytes = model_nbytes(model)
+        self.loaded_at = time.time()
+        self.refcount = 0
+        self.retired = False
+
+
+class ModelRegistry:
+    def __init__(self, model_dir=settings.MODEL_DIR, max_models=settings.MODEL_CACHE_MAX_MODELS,
+                 max_bytes=settings.MODEL_CACHE_MAX_BYTES):
+        self.model_dir = Path(model_dir)
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> ModelEntry, least recently used first
+        self._by_id = {}  # id(model) -> ModelEntry, includes retired entries
+        self._load_locks = {}
+        self._active = None
+
+    @staticmethod
+    def _key(path):
+        return str(Path(path))
+
+    def list_weights(self):
+        """Available weight files with size, hash and (if known) class names"""
+        paths = set()
+        if self.model_dir.exists():
+            paths.update(p for p in self.model_dir.iterdir() if p.suffix in WEIGHT_SUFFIXES)
+        if Path(settings.DETECTION_MODEL).exists():
+            paths.add(Path(settings.DETECTION_MODEL))
+        with self._lock:
+            loaded = dict(self._entries)
+            active = self._active
+        weights = []
+        for path in sorted(paths):
+            key = self._key(path)
+            sha = file_sha256(path)
+            entry = loaded.get(key)
+            weights.append({
+                "path": key,
+                "name": path.name,
+                "size_bytes": path.stat().st_size,
+                "sha256": sha,
+                "names": entry.names if entry else _names_cache.get(sha, {}),
+                "loaded": entry is not None,
+                "active": key == active,
+            })
+        return weights
+
+    def load(self, path):
+        """Return the model for `path`, loading it (outside the registry lock) if needed"""
+        key = self._key(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry.model
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Only one thread loads a given file; requests for other models carry on
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    return entry.model
+            model = YOLO(key)
+            sha = file_sha256(key) if Path(key).exists() else None
+            entry = ModelEntry(key, model, sha)
+            if sha:
+                _names_cache[sha] = entry.names
+            with self._lock:
+                self._entries[key] = entry
+                self._by_id[id(model)] = entry
+                released = self._evict_locked(keep=key)
+            self._release(released)
+            print(f"Model loaded successfully: {key}")
+            return model
+
+    def activate(self, path):
+        """Atomically make `path` the active model; the previous one stays cached until evicted"""
+        model = self.load(path)
+        with self._lock:
+            self._active = self._key(path)
+            released = self._evict_locked(keep=self._active)
+        self._release(released)
+        return model
+
+    def active_model(self):
+        with self._lock:
+            entry = self._entries.get(self._active) if self._active else None
+            if entry is not None:
+                return entry.model
+        # Nothing active yet: fall back to the configured default
+        return self.activate(settings.DETECTION_MODEL)
+
+    def active_info(self):
+        with self._lock:
+            entry = self._entries.get(self._active) if self._active else None
+            if entry is None:
+                return None
+            return {"path": entry.key, "sha256": entry.sha256, "names": entry.names}
+
+    def fingerprint(self, model):
+        """Stable identity of a loaded model: its file's SHA-256, else its path"""
+        with self._lock:
+            entry = self._by_id.get(id(model))
+        if entry is None:
+            return None
+        return entry.sha256 or entry.key
+
+    def path(self, model):
+        """Path a loaded model came from, or None if it isn't in the registry"""
+        with self._lock:
+            entry = self._by_id.get(id(model))
+        return entry.key if entry is not None else None
+
+    def unload(self, path):
+        """Drop a model from the cache; it's released once its in-flight requests finish"""
+        key = self._key(path)
+        with self._lock:
+            if key == self._active:
+                raise ValueError("Cannot unload the active model")
+            entry = self._entries.pop(key, None)
+            released = self._retire_locked(entry) if entry else []
+        self._release(released)
+
+    @contextmanager
+    def lease(self, model):
+        """Mark `model` as in use for the duration of one request"""
+        with self._lock:
+            entry = self._by_id.get(id(model))
+            if entry is not None:
+                entry.refcount += 1
+        try:
+            yield model
+        finally:
+            if entry is not None:
+                released = []
+                with self._lock:
+                    entry.refcount -= 1
+                    if entry.retired and entry.refcount == 0:
+                        released = self._forget_locked(entry)
+                self._release(released)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "active": self._active,
+                "loaded": [
+                    {"path": e.key, "nbytes": e.nbytes, "refcount": e.refcount}
+                    for e in self._entries.values()
+                ],
+                "retired": [
+                    {"path": e.key, "refcount": e.refcount}
+                    for e in self._by_id.values() if e.retired
+                ],
+                "total_bytes": sum(e.nbytes for e in self._by_id.values()),
+            }
+
+    def _evict_locked(self, keep):
+        """Evict least recently used models until within the count/memory budget"""
+        released = []
+        while True:
+            total = sum(e.nbytes for e in self._by_id.values())
+            if len(self._entries) <= self.max_models and total <= self.max_bytes:
+                break
+            victim = next(
+                (k for k in self._entries if k != keep and k != self._active), None
+            )
+            if victim is None:
+                break
+            released += self._retire_locked(self._entries.pop(victim))
+        return released
+
+    def _retire_locked(self, entry):
+        entry.retired = True
+        if entry.refcount == 0:
+            return self._forget_locked(entry)
+        return []
+
+    def _forget_locked(self, entry):
+        self._by_id.pop(id(entry.model), None)
+        return [entry]
+
+    @staticmethod
+    def _release(entries):
+        if not entries:
+            return
+        for entry in entries:
+            print(f"Model released: {entry.key}")
+            entry.model = None
+        gc.collect()
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
+
+
+registry = ModelRegistry()
@@ -0,0 +1,158 @@
+"""Vectorized post-processing of YOLO results.
+
+`cls`, `conf` and `xyxy` are pulled from a Results once, as NumPy arrays
+(a single device-to-host copy of boxes.data), and everything after that -- per-class
+confidence thresholds and categories from class_config, class-agnostic NMS,
+top-k, per-category counts -- is array operations instead of a Python loop calling
+int(box.cls) / float(box.conf) on every box:
+
+    dets = postprocess.process(res[0], confidence)
+    plotted = postprocess.plot(res[0], dets)   # only the kept boxes, in class colors
+    for name, conf in dets.rows(): ...
+
+Python objects are only built at the edges (rows(), to_dicts()).
+"""
+import numpy as np
+import torch
+import torchvision
+from ultralytics.utils.plotting import Annotator, colors
+
+import class_config
+import settings
+
+CATEGORIES = class_config.CATEGORIES
+
+
+class _ClassTables:
+    """Per-model lookup tables indexed by class id, built from the class configuration"""
+
+    def __init__(self, names, config):
+        self.source = names  # keeps id(names) valid as the cache key
+        size = max(names) + 1 if names else 0
+        self.names = [names.get(i, str(i)) for i in range(size)]
+        entries = [config.entry(n) for n in self.names]
+        # Disabled classes never pass the threshold
+        self.threshold = np.array(
+            [e["min_confidence"] if e["enabled"] else np.inf for e in entries], dtype=np.float32
+        )
+        self.category = np.array([CATEGORIES.index(e["category"]) for e in entries], dtype=np.intp)
+        # BGR box colors; classes without a configured color keep the ultralytics palette
+        self.color = np.array(
+            [class_config.hex_to_bgr(e["color"]) if e["color"] else colors(i, True) for i, e in enumerate(entries)],
+            dtype=np.uint8,
+        ).reshape(-1, 3)
+
+
+_tables_cache = {}
+
+
+def class_tables(names, config=None):
+    config = config or class_config.current()
+    key = (id(names), config.version)
+    tables = _tables_cache.get(key)
+    if tables is None:
+        if len(_tables_cache) > 32:
+            _tables_cache.clear()
+        tables = _tables_cache[key] = _ClassTables(names, config)
+    return tables
+
+
+class Detections:
+    """Column arrays for one image; `index` maps rows back to the source Results"""
+
+    def __init__(self, class_id, confidence, xyxy, names, index=None):
+        self.class_id = class_id
+        self.confidence = confidence
+        self.xyxy = xyxy
+        self.names = names
+        self.index = np.arange(len(class_id)) if index is None else index
+
+    @classmethod
+    def from_result(cls, result):
+        boxes = result.boxes
+        if boxes is None or len(boxes) == 0:
+            return cls(np.zeros(0, np.intp), np.zeros(0, np.float32), np.zeros((0, 4), np.float32), result.names)
+        # One transfer for all columns: data is (N, 6) = xyxy, conf, cls
+        data = boxes.data.cpu().numpy()
+        return cls(data[:, 5].astype(np.intp), data[:, 4].astype(np.float32), data[:, :4], result.names)
+
+    def __len__(self):
+        return len(self.class_id)
+
+    def select(self, mask_or_idx):
+        return Detections(self.class_id[mask_or_idx], self.confidence[mask_or_idx], self.xyxy[mask_or_idx],
+                          self.names, self.index[mask_or_idx])
+
+    def filter_confidence(self, confidence, config=None):
+        """Keep boxes above max(confidence, that class's min_confidence); drops disabled classes"""
+        tables = class_tables(self.names, config)
+        limit = np.maximum(tables.threshold[self.class_id], confidence)
+        return self.select(self.confidence >= limit)
+
+    def nms(self, iou_threshold):
+        """Class-agnostic NMS: overlapping boxes of different classes keep only the best"""
+        n = len(self)
+        if n < 2:
+            return self
+        # torchvision's NMS kernel (an ultralytics dependency): no n x n matrix or per-box loop here
+        boxes = torch.from_numpy(np.ascontiguousarray(self.xyxy, dtype=np.float32))
+        scores = torch.from_numpy(np.ascontiguousarray(self.confidence, dtype=np.float32))
+        keep = torchvision.ops.nms(boxes, scores, iou_threshold)
+        return self.select(np.sort(keep.numpy()))
+
+    def top_k(self, k):
+        """The k most confident boxes, most confident first"""
+        order = np.argsort(-self.confidence, kind="stable")
+        return self.select(order[:k] if k else order)
+
+    def sorted(self):
+        return self.top_k(None)
+
+    def class_names(self):
+        names = class_tables(self.names).names
+        return [names[c] for c in self.class_id.tolist()]
+
+    def categories(self):
+        """Category index (see CATEGORIES) per box"""
+        return class_tables(self.names).category[self.class_id]
+
+    def category_counts(self):
+        counts = np.bincount(self.categories(), minlength=len(CATEGORIES))
+        return dict(zip(CATEGORIES, counts.tolist()))
+
+    def rows(self):
+        """[(name, confidence)] as Python values, for rendering"""
+        return list(zip(self.class_names(), self.confidence.tolist()))
+
+    def to_dicts(self):
+        """[{'name', 'confidence'}] as stored by helper.save_detection"""
+        return [{"name": n, "confidence": c} for n, c in self.rows()]
+
+
+def process(result, confidence, config=None, nms_iou=settings.POSTPROCESS_AGNOSTIC_NMS_IOU,
+            top_k=settings.POSTPROCESS_TOP_K):
+    """Detections of one Results after class thresholds, agnostic NMS and top-k, most confident first"""
+    dets = Detections.from_result(result).filter_confidence(confidence, config)
+    if nms_iou:
+        dets = dets.nms(nms_iou)
+    return dets.top_k(top_k)
+
+
+def draw(image, dets, line_width=None):
+    """Draw the kept boxes in their configured colors into `image` (BGR, contiguous) in place"""
+    if not len(dets):
+        return image
+    annotator = Annotator(image, line_width, example=str(dets.names))
+    box_colors = class_tables(dets.names).color[dets.class_id].tolist()
+    # Least confident first, so the most confident labels end up on top
+    for box, (name, conf), color in reversed(list(zip(dets.xyxy.tolist(), dets.rows(), box_colors))):
+        annotator.box_label(box, f"{name} {conf:.2f}", color=tuple(color))
+    if annotator.pil:
+        # Non-ASCII class names switch Annotator to PIL, which draws on its own copy
+        np.copyto(image, annotator.result())
+    return image
+
+
+def plot(result, dets, line_width=None):
+    """Annotated copy of the result's image; returns a BGR image like Results.plot()"""
+    return draw(result.orig_img.copy(), dets, line_width)
@@ -0,0 +1,253 @@
+"""Opt-in profiling of the webcam and image detection paths.
+
+An operator arms a target ("webcam" or "image") for the next N calls:
+
+    profiling.arm("webcam", calls=100, mode=profiling.SAMPLING, capture_memory=True)
+
+and the hot path wraps its work in `profiling.profiled(target)`. When nothing
+is armed that returns a shared no-op context manager. After the N calls the
+artifacts (pstats, collapsed stacks, speedscope JSON, tracemalloc snapshot)
+are written to settings.PROFILE_DIR.
+"""
+import cProfile
+import json
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import nullcontext
+from pathlib import Path
+
+import settings
+
+DETERMINISTIC = "cprofile"
+SAMPLING = "sampling"
+MODES = [DETERMINISTIC, SAMPLING]
+TARGETS = ["webcam", "image"]
+
+_NULL = nullcontext()
+_sessions = {}
+_sessions_lock = threading.Lock()
+# tracemalloc is process-wide: refcount the sessions that need it
+_tracemalloc_users = 0
+_tracemalloc_owned = False
+_tracemalloc_lock = threading.Lock()
+
+
+def _acquire_tracemalloc():
+    global _tracemalloc_users, _tracemalloc_owned
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(settings.PROFILE_TRACEMALLOC_FRAMES)
+            _tracemalloc_owned = True
+        _tracemalloc_users += 1
+
+
+def _release_tracemalloc():
+    global _tracemalloc_users, _tracemalloc_owned
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0 and _tracemalloc_owned:
+            tracemalloc.stop()
+            _tracemalloc_owned = False
+
+
+class ProfileSession:
+    """Profiles the next `calls` invocations of one target, then writes artifacts"""
+
+    def __init__(self, target, calls, mode=DETERMINISTIC, capture_memory=False,
+                 interval=settings.PROFILE_SAMPLE_INTERVAL, out_dir=settings.PROFILE_DIR):
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiling mode: {mode}")
+        self.target = target
+        self.mode = mode
+        self.calls = calls
+        self.remaining = calls
+        self.interval = interval
+        self.out_dir = Path(out_dir)
+        self.started_at = time.time()
+        self.busy = threading.Lock()
+        self.profile = cProfile.Profile() if mode == DETERMINISTIC else None
+        self.samples = Counter()
+        self.sample_count = 0
+        if capture_memory:
+            _acquire_tracemalloc()
+        self.capture_memory = capture_memory
+        self.artifacts = []
+
+    def _sample_loop(self, thread_id, stop):
+        while not stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                frame = frame.f_back
+            if stack:
+                stack.reverse()
+                self.samples[tuple(stack)] += 1
+                self.sample_count += 1
+
+    def call_finished(self):
+        # Called with self.busy held, so calls are counted one at a time
+        self.remaining -= 1
+        if self.remaining <= 0:
+            with _sessions_lock:
+                # disarm() may have claimed the session already
+                owned = _sessions.get(self.target) is self
+                if owned:
+                    del _sessions[self.target]
+            if owned:
+                self.finalize()
+
+    def finalize(self):
+        """Write artifacts and release tracemalloc; returns the artifact paths"""
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        stem = f"{self.target}_{self.mode}_{time.strftime('%Y%m%d_%H%M%S')}"
+
+        if self.profile is not None:
+            path = self.out_dir / f"{stem}.pstats"
+            self.profile.dump_stats(str(path))
+            self.artifacts.append(path)
+        if self.samples:
+            self.artifacts.append(self._write_collapsed(self.out_dir / f"{stem}.collapsed.txt"))
+            self.artifacts.append(self._write_speedscope(self.out_dir / f"{stem}.speedscope.json", stem))
+        if self.capture_memory and tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            path = self.out_dir / f"{stem}.tracemalloc"
+            snapshot.dump(str(path))
+            self.artifacts.append(path)
+            path = self.out_dir / f"{stem}.tracemalloc.txt"
+            with open(path, "w") as f:
+                for stat in snapshot.statistics("lineno")[:50]:
+                    f.write(f"{stat}\n")
+            self.artifacts.append(path)
+        if self.capture_memory:
+            _release_tracemalloc()
+        print(f"Profiling of {self.target} finished: {[p.name for p in self.artifacts]}")
+        return self.artifacts
+
+    def _write_collapsed(self, path):
+        # Brendan Gregg's collapsed format, readable by flamegraph.pl and speedscope
+        with open(path, "w") as f:
+            for stack, count in self.samples.most_common():
+                f.write(";".join(f"{name} ({Path(file).name}:{line})" for name, file, line in stack))
+                f.write(f" {count}\n")
+        return path
+
+    def _write_speedscope(self, path, name):
+        frames, index = [], {}
+        samples, weights = [], []
+        for stack, count in self.samples.items():
+            ids = []
+            for frame in stack:
+                if frame not in index:
+                    index[frame] = len(frames)
+                    frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+                ids.append(index[frame])
+            samples.append(ids)
+            weights.append(count * self.interval)
+        doc = {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "ecodetect",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+        with open(path, "w") as f:
+            json.dump(doc, f)
+        return path
+
+
+class _ProfiledCall:
+    __slots__ = ("session", "active", "stop", "sampler")
+
+    def __init__(self, session):
+        self.session = session
+        self.active = False
+
+    def __enter__(self):
+        session = self.session
+        # One profiled call at a time; concurrent calls simply run unprofiled
+        if not session.busy.acquire(blocking=False):
+            return self
+        self.active = True
+        if session.profile is not None:
+            session.profile.enable()
+        else:
+            self.stop = threading.Event()
+            self.sampler = threading.Thread(
+                target=session._sample_loop, args=(threading.get_ident(), self.stop), daemon=True
+            )
+            self.sampler.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if not self.active:
+            return False
+        session = self.session
+        if session.profile is not None:
+            session.profile.disable()
+        else:
+            self.stop.set()
+            self.sampler.join()
+        try:
+            session.call_finished()
+        finally:
+            session.busy.release()
+        return False
+
+
+def profiled(target):
+    """Context manager profiling this call if `target` is armed (no-op otherwise)"""
+    if not _sessions:
+        return _NULL
+    session = _sessions.get(target)
+    if session is None:
+        return _NULL
+    return _ProfiledCall(session)
+
+
+def arm(target, calls, mode=DETERMINISTIC, capture_memory=False):
+    if target not in TARGETS:
+        raise ValueError(f"Unknown profiling target: {target}")
+    with _sessions_lock:
+        if target in _sessions:
+            raise RuntimeError(f"Profiling of {target} is already running")
+        session = ProfileSession(target, calls, mode, capture_memory)
+        _sessions[target] = session
+    return session
+
+
+def disarm(target):
+    """Stop profiling early and write whatever was collected"""
+    with _sessions_lock:
+        session = _sessions.pop(target, None)
+    if session is None:
+        return []
+    # Wait for an in-flight profiled call to finish
+    with session.busy:
+        return session.finalize()
+
+
+def status():
+    return {
+        target: {"mode": s.mode, "remaining": s.remaining, "calls": s.calls, "memory": s.capture_memory}
+        for target, s in list(_sessions.items())
+    }
+
+
+def list_artifacts(out_dir=settings.PROFILE_DIR):
+    out_dir = Path(out_dir)
+    if not out_dir.exists():
+        return []
+    return sorted((p for p in out_dir.iterdir() if p.is_file()), key=lambda p: p.stat().st_mtime, reverse=True)
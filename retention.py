@@ -0,0 +1,330 @@
+"""Retention policies and compaction for history.db.
+
+Policies (see settings.RETENTION_*) are applied oldest-first in small
+batches, each in its own short transaction, so the app's writers are never
+blocked for long. Freed pages are then returned to the filesystem with
+SQLite's incremental vacuum.
+
+Incremental vacuum needs auto_vacuum=INCREMENTAL. New databases get it when
+they're created (database.py); an older database needs one full VACUUM to
+switch, which locks it for the whole rewrite, so that is left to the
+operator (Riwayat page, or the command line below). Until then compact()
+does nothing and freed pages are reused by later inserts.
+
+Command line:
+
+    python retention.py --run
+    python retention.py --enable-incremental-vacuum
+
+The rollup table (detection_rollup) is left untouched: analytics keep
+covering detections whose images have expired.
+"""
+import argparse
+import io
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+import PIL.Image
+from sqlalchemy import bindparam, delete, func, text, update
+
+import settings
+from database import DetectionHistory, SessionLocal, engine
+
+last_report = None
+_run_lock = threading.Lock()
+_worker = None
+
+
+def default_policy():
+    return {
+        "max_age_days": settings.RETENTION_MAX_AGE_DAYS,
+        "max_rows": settings.RETENTION_MAX_ROWS,
+        "max_bytes": settings.RETENTION_MAX_BYTES,
+        "thumbnail_after_days": settings.RETENTION_THUMBNAIL_AFTER_DAYS,
+    }
+
+
+def database_file():
+    """Path of the SQLite file behind the engine (None for in-memory/other databases)"""
+    path = engine.url.database
+    if engine.url.get_backend_name() != "sqlite" or not path or path == ":memory:":
+        return None
+    return path
+
+
+def file_size():
+    path = database_file()
+    return os.path.getsize(path) if path and os.path.exists(path) else 0
+
+
+def _pragma(conn, name):
+    return conn.execute(text(f"PRAGMA {name}")).scalar()
+
+
+def live_bytes():
+    """Bytes in use inside the database file (excluding free pages)"""
+    with engine.connect() as conn:
+        page_size = _pragma(conn, "page_size")
+        return (_pragma(conn, "page_count") - _pragma(conn, "freelist_count")) * page_size
+
+
+def _delete_batch(ids):
+    db = SessionLocal()
+    try:
+        db.execute(delete(DetectionHistory).where(DetectionHistory.id.in_(ids)))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise e
+    finally:
+        db.close()
+
+
+def _oldest_ids(limit, before=None):
+    db = SessionLocal()
+    try:
+        query = db.query(DetectionHistory.id)
+        if before is not None:
+            query = query.filter(DetectionHistory.timestamp < before)
+        rows = query.order_by(DetectionHistory.timestamp, DetectionHistory.id).limit(limit).all()
+        return [row.id for row in rows]
+    finally:
+        db.close()
+
+
+def _row_count():
+    db = SessionLocal()
+    try:
+        return db.query(func.count(DetectionHistory.id)).scalar()
+    finally:
+        db.close()
+
+
+def _expire_older_than(cutoff, batch_size, pause):
+    deleted = 0
+    while True:
+        ids = _oldest_ids(batch_size, before=cutoff)
+        if not ids:
+            return deleted
+        _delete_batch(ids)
+        deleted += len(ids)
+        time.sleep(pause)
+
+
+def _trim_to_rows(max_rows, batch_size, pause):
+    deleted = 0
+    excess = _row_count() - max_rows
+    while excess > 0:
+        ids = _oldest_ids(min(batch_size, excess))
+        if not ids:
+            break
+        _delete_batch(ids)
+        deleted += len(ids)
+        excess -= len(ids)
+        time.sleep(pause)
+    return deleted
+
+
+def _trim_to_bytes(max_bytes, batch_size, pause):
+    deleted = 0
+    excess = live_bytes() - max_bytes
+    while excess > 0:
+        db = SessionLocal()
+        try:
+            rows = db.query(DetectionHistory.id, func.length(DetectionHistory.detected_image)).order_by(
+                DetectionHistory.timestamp, DetectionHistory.id
+            ).limit(batch_size).all()
+        finally:
+            db.close()
+        if not rows:
+            break
+        # Delete only as many of the oldest rows as needed to cover the excess
+        ids = []
+        for record_id, size in rows:
+            ids.append(record_id)
+            excess -= size or 0
+            if excess <= 0:
+                break
+        _delete_batch(ids)
+        deleted += len(ids)
+        time.sleep(pause)
+    return deleted
+
+
+def make_thumbnail(image_bytes, size=settings.RETENTION_THUMBNAIL_SIZE):
+    image = PIL.Image.open(io.BytesIO(image_bytes)).convert("RGB")
+    image.thumbnail((size, size))
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=80)
+    return buffer.getvalue()
+
+
+def _thumbnail_older_than(cutoff, batch_size, pause):
+    converted = 0
+    last_id = 0
+    while True:
+        db = SessionLocal()
+        try:
+            rows = db.query(DetectionHistory.id, DetectionHistory.detected_image).filter(
+                DetectionHistory.timestamp < cutoff,
+                DetectionHistory.is_thumbnail.isnot(True),
+                DetectionHistory.id > last_id,
+            ).order_by(DetectionHistory.id).limit(batch_size).all()
+        finally:
+            db.close()
+        if not rows:
+            return converted
+        last_id = rows[-1].id
+
+        # Encode outside any transaction; only the UPDATEs hold the write lock
+        thumbnails = []
+        for row in rows:
+            try:
+                thumbnails.append({"record_id": row.id, "image": make_thumbnail(row.detected_image)})
+            except Exception as e:
+                # Unreadable image: leave it alone rather than lose it
+                print(f"Error creating thumbnail for record {row.id}: {e}")
+        del rows
+
+        if thumbnails:
+            db = SessionLocal()
+            try:
+                stmt = update(DetectionHistory).where(DetectionHistory.id == bindparam("record_id")).values(
+                    # A thumbnail can't stand in for the full result: later uploads predict again
+                    detected_image=bindparam("image"), is_thumbnail=True, result_key=None
+                )
+                db.connection().execute(stmt, thumbnails)
+                db.commit()
+                converted += len(thumbnails)
+            except Exception as e:
+                db.rollback()
+                raise e
+            finally:
+                db.close()
+        time.sleep(pause)
+
+
+def incremental_vacuum_enabled():
+    if database_file() is None:
+        return False
+    with engine.connect() as conn:
+        return _pragma(conn, "auto_vacuum") == 2
+
+
+def enable_incremental_vacuum():
+    """Switch the database to auto_vacuum=INCREMENTAL with one full VACUUM.
+    Blocks every other reader and writer until the file has been rewritten;
+    returns the number of free pages that were released."""
+    if database_file() is None:
+        return 0
+    with _run_lock, engine.connect() as conn:
+        if _pragma(conn, "auto_vacuum") == 2:
+            return 0
+        free_pages = _pragma(conn, "freelist_count")
+        conn.execute(text("PRAGMA auto_vacuum = INCREMENTAL"))
+        conn.execute(text("VACUUM"))
+        conn.commit()
+        return free_pages
+
+
+def compact(max_pages=settings.RETENTION_VACUUM_PAGES, pause=settings.RETENTION_BATCH_PAUSE):
+    """Return free pages to the filesystem with incremental vacuum; returns the number
+    of pages freed (0 until enable_incremental_vacuum() has been run once)"""
+    if not incremental_vacuum_enabled():
+        return 0
+    freed = 0
+    while True:
+        with engine.connect() as conn:
+            free_pages = _pragma(conn, "freelist_count")
+            if free_pages == 0:
+                return freed
+            # The pragma frees one page per step, so drain it on the raw DB-API cursor
+            cursor = conn.connection.dbapi_connection.cursor()
+            try:
+                cursor.execute(f"PRAGMA incremental_vacuum({min(free_pages, max_pages)})").fetchall()
+            finally:
+                cursor.close()
+            conn.commit()
+            remaining = _pragma(conn, "freelist_count")
+        if remaining >= free_pages:
+            return freed
+        freed += free_pages - remaining
+        time.sleep(pause)
+
+
+def apply_retention(policy=None, batch_size=settings.RETENTION_BATCH_SIZE, pause=settings.RETENTION_BATCH_PAUSE):
+    """Apply all configured policies, then compact. Returns a report dict."""
+    global last_report
+    policy = policy or default_policy()
+    with _run_lock:
+        started = time.perf_counter()
+        bytes_before = file_size()
+        now = datetime.now()
+        report = {"started_at": now.isoformat(timespec="seconds"), "policy": policy}
+
+        report["expired_rows"] = 0
+        if policy.get("max_age_days"):
+            report["expired_rows"] = _expire_older_than(
+                now - timedelta(days=policy["max_age_days"]), batch_size, pause
+            )
+        report["thumbnailed_rows"] = 0
+        if policy.get("thumbnail_after_days"):
+            # Smaller batches here: each row's full-size image is held in memory
+            report["thumbnailed_rows"] = _thumbnail_older_than(
+                now - timedelta(days=policy["thumbnail_after_days"]), max(1, batch_size // 4), pause
+            )
+        report["trimmed_rows"] = 0
+        if policy.get("max_rows"):
+            report["trimmed_rows"] += _trim_to_rows(policy["max_rows"], batch_size, pause)
+        if policy.get("max_bytes"):
+            report["trimmed_rows"] += _trim_to_bytes(policy["max_bytes"], batch_size, pause)
+
+        report["vacuumed_pages"] = compact(pause=pause)
+        report["bytes_before"] = bytes_before
+        report["bytes_after"] = file_size()
+        report["bytes_reclaimed"] = bytes_before - report["bytes_after"]
+        report["seconds"] = round(time.perf_counter() - started, 3)
+        last_report = report
+        print(f"Retention finished: {report}")
+        return report
+
+
+def start_retention_worker(interval=settings.RETENTION_INTERVAL):
+    """Run apply_retention periodically from a daemon thread (idempotent)"""
+    global _worker
+    if _worker is not None and _worker.is_alive():
+        return
+
+    def loop():
+        # Let the app finish starting up before the first pass
+        time.sleep(60)
+        while True:
+            try:
+                apply_retention()
+            except Exception as e:
+                print(f"Error applying retention: {e}")
+            time.sleep(interval)
+
+    _worker = threading.Thread(target=loop, name="retention", daemon=True)
+    _worker.start()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="EcoDetect history retention and compaction")
+    parser.add_argument("--run", action="store_true", help="apply the configured policies once, then compact")
+    parser.add_argument("--enable-incremental-vacuum", action="store_true",
+                        help="one full VACUUM so compaction can work incrementally (locks the database meanwhile)")
+    args = parser.parse_args(argv)
+    if not (args.run or args.enable_incremental_vacuum):
+        parser.error("nothing to do: pass --run and/or --enable-incremental-vacuum")
+
+    if args.enable_incremental_vacuum:
+        print(f"Incremental vacuum enabled, {enable_incremental_vacuum()} free pages released")
+    if args.run:
+        apply_retention()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 from pathlib import Path
+import os
 import sys
 from pathlib import Path
 from sqlalchemy import create_engine
@@ -24,14 +25,132 @@ SOURCES_LIST = [IMAGE, WEBCAM]
 IMAGES_DIR = ROOT / 'images'
 DEFAULT_IMAGE = IMAGES_DIR / 'sebelumdeteksi.jpg'
 DEFAULT_DETECT_IMAGE = IMAGES_DIR / 'hasildeteksi.jpg'
+# Beranda example images, shown at a fixed height
+HOME_EXAMPLE_HEIGHT = 200
+HOME_EXAMPLE_IMAGES = ['biodegradable.jpg', 'kertas.jpg', 'kaleng.jpeg', 'kaca.jpg', 'botol.jpg']
+# Asset cache: pre-generated variants are written here and served from
+# /app/static/ when server.enableStaticServing is on
+ASSET_STATIC_DIR = ROOT / 'static' / 'assets'
+ASSET_JPEG_QUALITY = 90
 
 # ML Model config
 MODEL_DIR = ROOT / 'weights'
 DETECTION_MODEL = MODEL_DIR / 'best.pt'
+# Model registry: how many weight files may stay loaded side by side
+MODEL_CACHE_MAX_MODELS = 3
+MODEL_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+# Architecture-only YOLO config (random weights, no download) used when best.pt is absent
+STANDIN_MODEL = 'yolo11n.yaml'
+
+# Cascade mode (cascade.py): a cheap model on every frame, the full model only
+# for frames with a box in [LOW, HIGH) confidence, a class not seen in the last
+# NEW_CLASS_WINDOW frames, or every AUDIT_EVERY-th frame (0 disables either)
+CASCADE_ENABLED = False
+CASCADE_FAST_MODEL = MODEL_DIR / 'nano.pt'
+CASCADE_UNCERTAIN_LOW = 0.25
+CASCADE_UNCERTAIN_HIGH = 0.6
+CASCADE_NEW_CLASS_WINDOW = 30
+CASCADE_AUDIT_EVERY = 30
+
+# Tiled (SAHI-style) inference for high-resolution images
+TILE_SIZE = 640
+TILE_OVERLAP = 0.2
+TILE_BATCH_SIZE = 8
+# "auto" tiling kicks in when the longer side reaches this many pixels
+TILE_AUTO_MIN_SIDE = 1600
+# Also run one full-image pass so objects larger than a tile are kept
+TILE_INCLUDE_FULL = True
+# Cross-tile merge: 'nms' or 'wbf', matched by 'iou' or 'ios' (intersection over smaller)
+TILE_MERGE = 'nms'
+TILE_MATCH_METRIC = 'ios'
+TILE_MATCH_THRESHOLD = 0.5
+
+# Waste categories (model class names are matched case-insensitively)
+ORGANIC = 'Organik'
+INORGANIC = 'Anorganik'
+OTHER = 'Lainnya'
+WASTE_CATEGORIES = {
+    'biodegradable': ORGANIC, 'organic': ORGANIC, 'organik': ORGANIC,
+    'paper': ORGANIC, 'kertas': ORGANIC, 'cardboard': ORGANIC, 'kardus': ORGANIC,
+    'metal': INORGANIC, 'can': INORGANIC, 'kaleng': INORGANIC,
+    'glass': INORGANIC, 'kaca': INORGANIC,
+    'plastic': INORGANIC, 'plastik': INORGANIC, 'bottle': INORGANIC, 'botol': INORGANIC,
+}
+
+# Per-class category, minimum confidence and color (see class_config.py);
+# WASTE_CATEGORIES above is the fallback for classes not listed there
+CLASS_CONFIG_PATH = ROOT / 'classes.json'
+CLASS_CONFIG_CHECK_INTERVAL = 2.0
+
+# Post-processing (postprocess.py): class-agnostic NMS IoU (None disables); max boxes
+POSTPROCESS_AGNOSTIC_NMS_IOU = 0.7
+POSTPROCESS_TOP_K = 100
 
 # Webcam
 WEBCAM_PATH = 0
+# Live detections kept in memory (columnar ring buffer, ~29 bytes per detection)
+LIVE_HISTORY_CAPACITY = 100_000
+# Inference worker processes for webcam streams (frame_ring.py); 0 predicts in
+# the stream's own thread. Frames reach the workers through shared memory.
+WEBCAM_INFERENCE_WORKERS = int(os.environ.get("ECODETECT_INFERENCE_WORKERS", "0"))
+# Torch threads per worker (0 keeps torch's default)
+WEBCAM_INFERENCE_WORKER_THREADS = 1
+# Frames in flight per stream; a frame arriving with every slot busy is dropped
+FRAME_RING_SLOTS = 4
+# Workers skip frames that waited longer than this (seconds, 0 disables)
+FRAME_RING_MAX_AGE = 0.5
+# A slot still queued after this long lost its descriptor (dead or replaced worker) and is reused
+FRAME_RING_RECLAIM_AFTER = 5.0
+
+# Performance metrics (per-stage latency histograms)
+METRICS_ENABLED = os.environ.get("ECODETECT_METRICS", "0") == "1"
+# Optional file dump for scraping: *.prom/*.txt = Prometheus text, otherwise JSON
+METRICS_DUMP_PATH = os.environ.get("ECODETECT_METRICS_DUMP")
+METRICS_DUMP_INTERVAL = 10
+
+# Opt-in profiling artifacts (pstats, collapsed stacks, speedscope, tracemalloc)
+PROFILE_DIR = ROOT / 'profiles'
+PROFILE_SAMPLE_INTERVAL = 0.005
+# Stack depth recorded by tracemalloc; deeper stacks slow inference considerably
+PROFILE_TRACEMALLOC_FRAMES = 10
+
+# Database configuration (override with ECODETECT_DATABASE_URL, e.g. for a scratch DB)
+DATABASE_URL = os.environ.get("ECODETECT_DATABASE_URL", "sqlite:///history.db")
+engine = create_engine(DATABASE_URL)
+
+# History retention (None disables a policy). Applied in small batches by a
+# background thread, followed by an incremental VACUUM. The policies delete or
+# shrink stored detections for good, so the thread is opt-in (ECODETECT_RETENTION=1);
+# "Jalankan Sekarang" on the Riwayat page applies them once.
+RETENTION_ENABLED = os.environ.get("ECODETECT_RETENTION", "0") == "1"
+RETENTION_MAX_AGE_DAYS = 365
+RETENTION_MAX_ROWS = 50_000
+RETENTION_MAX_BYTES = 2 * 1024 * 1024 * 1024
+RETENTION_THUMBNAIL_AFTER_DAYS = 30
+RETENTION_THUMBNAIL_SIZE = 160
+RETENTION_BATCH_SIZE = 200
+RETENTION_BATCH_PAUSE = 0.05
+RETENTION_VACUUM_PAGES = 256
+RETENTION_INTERVAL = 6 * 60 * 60
+
+# Deduplicated ingestion (ingest.py): a repeat upload with the same model and
+# settings reuses the stored result instead of running inference again
+INGEST_DEDUP = True
+
+# History export: rows per chunk (metadata only / with images)
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_IMAGE_CHUNK_SIZE = 50
 
-# Database configuration
-DATABASE_URL = "sqlite:///history.db"
-engine = create_engine(DATABASE_URL)
\ No newline at end of file
+# HTTP inference API (api.py)
+API_HOST = '127.0.0.1'
+API_PORT = 8502
+# Micro-batching: wait up to this long for more images before running predict
+API_BATCH_WAIT_MS = 10
+API_MAX_BATCH = 8
+# Load shedding: requests beyond these limits get 503 + Retry-After
+API_MAX_QUEUE = 64
+API_MAX_CONCURRENT = 32
+API_REQUEST_TIMEOUT = 30
+API_MAX_UPLOAD_BYTES = 20 * 1024 * 1024
+API_MAX_IMAGES_PER_REQUEST = 16
+API_DEFAULT_CONFIDENCE = 0.4
@@ -0,0 +1,154 @@
+"""Tiled (SAHI-style) inference for high-resolution images.
+
+A single predict pass downscales the whole photo to the model's input size,
+so the many small items in a picture of a full bin or a landfill patch end up
+a few pixels wide. Here the image is sliced into overlapping tiles that are
+run at native resolution in batches, optionally together with one full-image
+pass for large objects, and the boxes are merged across tiles:
+
+    res = tiling.predict_tiled(model, image, conf=0.4)
+    boxes = res[0].boxes
+
+The result has the same shape as model.predict (a list with one ultralytics
+Results), so plotting and box handling stay unchanged.
+"""
+import numpy as np
+import PIL.Image
+import torch
+from ultralytics.engine.results import Results
+
+import settings
+
+NMS = "nms"
+WBF = "wbf"
+MERGE_METHODS = [NMS, WBF]
+# Overlap metric: IoU, or intersection over the smaller box, which also
+# matches a box cut off at a tile edge with the full box from a neighbour
+IOU = "iou"
+IOS = "ios"
+MATCH_METRICS = [IOU, IOS]
+
+AUTO = "auto"
+ON = "on"
+OFF = "off"
+MODES = [AUTO, ON, OFF]
+
+
+def tile_windows(width, height, tile_size=settings.TILE_SIZE, overlap=settings.TILE_OVERLAP):
+    """(x0, y0, x1, y1) windows covering the image; the last row/column is flush with the edge"""
+    stride = max(1, int(tile_size * (1 - overlap)))
+
+    def starts(length):
+        if length <= tile_size:
+            return [0]
+        positions = list(range(0, length - tile_size, stride))
+        positions.append(length - tile_size)
+        return positions
+
+    return [
+        (x, y, min(x + tile_size, width), min(y + tile_size, height))
+        for y in starts(height) for x in starts(width)
+    ]
+
+
+def should_tile(width, height, mode=AUTO, min_side=settings.TILE_AUTO_MIN_SIDE):
+    if mode == ON:
+        return True
+    if mode == OFF:
+        return False
+    return max(width, height) >= min_side
+
+
+def _overlap(box, boxes, metric):
+    x0 = np.maximum(box[0], boxes[:, 0])
+    y0 = np.maximum(box[1], boxes[:, 1])
+    x1 = np.minimum(box[2], boxes[:, 2])
+    y1 = np.minimum(box[3], boxes[:, 3])
+    inter = np.clip(x1 - x0, 0, None) * np.clip(y1 - y0, 0, None)
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    if metric == IOS:
+        denom = np.minimum(area, areas)
+    else:
+        denom = area + areas - inter
+    return inter / np.maximum(denom, 1e-9)
+
+
+def merge_boxes(boxes, scores, classes, method=settings.TILE_MERGE,
+                metric=settings.TILE_MATCH_METRIC, threshold=settings.TILE_MATCH_THRESHOLD):
+    """Class-aware greedy merge of overlapping boxes; returns (boxes, scores, classes)
+
+    NMS keeps the highest-scoring box of each cluster. WBF replaces it with the
+    confidence-weighted average of the cluster's boxes and their mean score.
+    """
+    if method not in MERGE_METHODS:
+        raise ValueError(f"Unknown merge method: {method}")
+    if metric not in MATCH_METRICS:
+        raise ValueError(f"Unknown match metric: {metric}")
+    out_boxes, out_scores, out_classes = [], [], []
+    for cls in np.unique(classes):
+        idx = np.flatnonzero(classes == cls)
+        idx = idx[np.argsort(-scores[idx], kind="stable")]
+        while idx.size:
+            best = idx[0]
+            matched = _overlap(boxes[best], boxes[idx], metric) >= threshold
+            matched[0] = True
+            cluster = idx[matched]
+            idx = idx[~matched]
+            if method == NMS:
+                out_boxes.append(boxes[best])
+                out_scores.append(scores[best])
+            else:
+                weights = scores[cluster]
+                out_boxes.append((boxes[cluster] * weights[:, None]).sum(axis=0) / weights.sum())
+                out_scores.append(weights.mean())
+            out_classes.append(cls)
+    if not out_boxes:
+        return np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, np.float32)
+    return np.asarray(out_boxes, np.float32), np.asarray(out_scores, np.float32), np.asarray(out_classes, np.float32)
+
+
+def _to_bgr(image):
+    """ultralytics works on BGR arrays; PIL images are RGB"""
+    if isinstance(image, PIL.Image.Image):
+        return np.ascontiguousarray(np.asarray(image.convert("RGB"))[:, :, ::-1])
+    return image
+
+
+def _collect(results, offsets, boxes, scores, classes):
+    for (x0, y0), r in zip(offsets, results):
+        b = r.boxes
+        if b is None or len(b) == 0:
+            continue
+        boxes.append(b.xyxy.cpu().numpy() + np.array([x0, y0, x0, y0], np.float32))
+        scores.append(b.conf.cpu().numpy())
+        classes.append(b.cls.cpu().numpy())
+
+
+def predict_tiled(model, image, conf, tile_size=settings.TILE_SIZE, overlap=settings.TILE_OVERLAP,
+                  batch_size=settings.TILE_BATCH_SIZE, include_full=settings.TILE_INCLUDE_FULL,
+                  method=settings.TILE_MERGE, metric=settings.TILE_MATCH_METRIC,
+                  threshold=settings.TILE_MATCH_THRESHOLD, classes=None):
+    """Drop-in for model.predict(image, conf=conf, classes=classes) that runs over overlapping tiles"""
+    frame = _to_bgr(image)
+    height, width = frame.shape[:2]
+    windows = tile_windows(width, height, tile_size, overlap)
+    boxes, scores, labels = [], [], []
+
+    for i in range(0, len(windows), batch_size):
+        batch = windows[i:i + batch_size]
+        # Crops are views into the frame; ultralytics letterboxes each one
+        crops = [frame[y0:y1, x0:x1] for x0, y0, x1, y1 in batch]
+        results = model.predict(crops, conf=conf, imgsz=tile_size, classes=classes, verbose=False)
+        _collect(results, [(x0, y0) for x0, y0, _, _ in batch], boxes, scores, labels)
+    if include_full and len(windows) > 1:
+        # One downscaled pass over the whole image keeps objects larger than a tile
+        _collect(model.predict(frame, conf=conf, classes=classes, verbose=False), [(0, 0)], boxes, scores, labels)
+
+    if boxes:
+        merged = merge_boxes(np.concatenate(boxes), np.concatenate(scores), np.concatenate(labels),
+                             method, metric, threshold)
+        data = torch.from_numpy(np.column_stack(merged))
+    else:
+        data = torch.zeros((0, 6))
+    return [Results(frame, path="", names=model.names, boxes=data)]